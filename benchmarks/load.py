@@ -0,0 +1,206 @@
+"""In-process load benchmark of the API.
+
+Drives the FastAPI app through an ASGI client, so no server or network is involved, with a mixed
+workload at a configurable concurrency and prints throughput and latency percentiles as JSON:
+
+    python -m benchmarks.load --backend sqlite-memory --backend sqlite-file --concurrency 16 --requests 5000
+
+The PostgreSQL backend uses the POSTGRESQL_* environment variables of the server.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from importlib.metadata import PackageNotFoundError, version
+from typing import AsyncIterator
+
+import click
+import httpx
+
+from event_handler import cli
+from event_handler.api import config
+from event_handler.logger import logger
+
+BACKENDS = ["sqlite-memory", "sqlite-file", "postgres"]
+
+WORKLOAD = {
+    "create_user": 0.15,
+    "create_event": 0.15,
+    "add_attendees_to_event": 0.2,
+    "get_event": 0.45,
+    "delete_event": 0.05,
+}
+"""The share of each operation in the mixed workload."""
+
+
+class Workload:
+    """A class that issues the operations of the mixed workload and records their latencies."""
+
+    def __init__(self, client: httpx.AsyncClient, seed: int):
+        """Initialize the workload for the given client."""
+        self._client = client
+        self._random = random.Random(seed)
+        self._user_ids: list[int] = []
+        self._event_ids: list[int] = []
+        self.latencies: dict[str, list[float]] = {operation: [] for operation in WORKLOAD}
+        self.errors: dict[str, int] = {operation: 0 for operation in WORKLOAD}
+
+    def _event(self) -> dict:
+        start = datetime(2024, 1, 1) + timedelta(minutes=self._random.randrange(525600))
+        return {"name": "Party", "time": start.isoformat(), "location": "Reeperbahn", "description": "Dance and drink"}
+
+    async def seed(self, users: int, events: int):
+        """Create the users and events the operations start with."""
+        user = {"first_name": "Son", "last_name": "Goku", "email": "SonGoku@email.com"}
+        response = await self._client.put("/api/v1.0/users/create_users", json=[user] * users)
+        self._user_ids = [key["id"] for key in response.json()]
+        response = await self._client.put("/api/v1.0/events/create_events", json=[self._event()] * events)
+        self._event_ids = [key["id"] for key in response.json()]
+
+    async def run_operation(self):
+        """Issue one randomly chosen operation and record its latency."""
+        operation = self._random.choices(list(WORKLOAD), weights=list(WORKLOAD.values()))[0]
+        if operation != "create_user" and operation != "create_event" and not self._event_ids:
+            operation = "create_event"
+
+        start = time.perf_counter()
+        if operation == "create_user":
+            user = {"first_name": "Son", "last_name": "Gohan", "email": "SonGohan@email.com"}
+            response = await self._client.put("/api/v1.0/users/create_user", json=user)
+            if response.is_success:
+                self._user_ids.append(response.json()["id"])
+        elif operation == "create_event":
+            response = await self._client.put("/api/v1.0/events/create_event", json=self._event())
+            if response.is_success:
+                self._event_ids.append(response.json()["id"])
+        elif operation == "add_attendees_to_event":
+            event_id = self._random.choice(self._event_ids)
+            attendees = self._random.sample(self._user_ids, min(3, len(self._user_ids)))
+            response = await self._client.put(f"/api/v1.0/events/add_attendees_to_event/{event_id}", json=attendees)
+        elif operation == "get_event":
+            response = await self._client.put(f"/api/v1.0/events/get_event/{self._random.choice(self._event_ids)}")
+        else:
+            event_id = self._event_ids.pop(self._random.randrange(len(self._event_ids)))
+            response = await self._client.put(f"/api/v1.0/events/delete_event/{event_id}")
+        elapsed_in_s = time.perf_counter() - start
+
+        self.latencies[operation].append(elapsed_in_s)
+        if not response.is_success:
+            self.errors[operation] += 1
+
+
+def percentiles(latencies: list[float]) -> dict[str, float]:
+    """Return the p50, p95 and p99 of the latencies in milliseconds using the nearest-rank method."""
+    if not latencies:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+    ordered = sorted(latencies)
+    result = {}
+    for percentile in (50, 95, 99):
+        rank = max(0, math.ceil(percentile * len(ordered) / 100) - 1)
+        result[f"p{percentile}"] = round(ordered[rank] * 1000, 3)
+    return result
+
+
+def configure_backend(backend: str, path: str) -> None:
+    """Point the cached settings of the app to the backend and drop the cached database."""
+    cli.set_environment()
+    config.get_database.cache_clear()
+    config.get_event_cache.cache_clear()
+    config.get_user_cache.cache_clear()
+    config.get_general_settings().use_postgres = backend == "postgres"
+    config.get_sqlite_settings().db_path = ":memory:" if backend == "sqlite-memory" else path
+    config.get_sqlite_settings().use_wal = backend == "sqlite-file"
+
+
+@asynccontextmanager
+async def app_client(backend: str) -> AsyncIterator[httpx.AsyncClient]:
+    """Start the app with its lifespan on the backend and yield a client calling it in process."""
+    with tempfile.TemporaryDirectory() as directory:
+        configure_backend(backend, os.path.join(directory, "benchmark.db"))
+        app = cli.create_app()
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                yield client
+
+
+async def run_backend(backend: str, concurrency: int, requests: int, seed_rows: int, seed: int) -> dict:
+    """Run the mixed workload against one backend and return its results."""
+    async with app_client(backend) as client:
+        workload = Workload(client, seed=seed)
+        await workload.seed(users=seed_rows, events=seed_rows)
+
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await workload.run_operation()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        duration_in_s = time.perf_counter() - start
+
+    latencies = [latency for operation in WORKLOAD for latency in workload.latencies[operation]]
+    return {
+        "backend": backend,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(workload.errors.values()),
+        "duration_in_s": round(duration_in_s, 3),
+        "throughput_per_s": round(len(latencies) / duration_in_s, 1),
+        "latency_ms": percentiles(latencies),
+        "operations": {
+            operation: {
+                "requests": len(workload.latencies[operation]),
+                "errors": workload.errors[operation],
+                "latency_ms": percentiles(workload.latencies[operation]),
+            }
+            for operation in WORKLOAD
+        },
+    }
+
+
+def _package_version() -> str:
+    try:
+        return version("event_handler")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+@click.command()
+@click.option(
+    "--backend", "backends", type=click.Choice(BACKENDS), multiple=True, default=["sqlite-memory", "sqlite-file"]
+)
+@click.option("--concurrency", type=click.IntRange(min=1), default=8, show_default=True, help="Concurrent clients.")
+@click.option("--requests", type=click.IntRange(min=1), default=2000, show_default=True, help="Requests per backend.")
+@click.option("--seed-rows", type=click.IntRange(min=1), default=1000, show_default=True, help="Initial users/events.")
+@click.option("--seed", type=int, default=42, show_default=True, help="Seed of the random workload.")
+@click.option("--output", type=click.File("w"), default="-", help="File the JSON results are written to.")
+def main(backends: tuple[str, ...], concurrency: int, requests: int, seed_rows: int, seed: int, output):
+    """Runs the mixed workload against each backend and writes the results as JSON."""
+    logger.setLevel(logging.WARNING)  # one log line per request would dominate the measurement
+    results = [asyncio.run(run_backend(backend, concurrency, requests, seed_rows, seed)) for backend in backends]
+    report = {
+        "version": _package_version(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "workload": WORKLOAD,
+        "results": results,
+    }
+    json.dump(report, output, indent=2)
+    output.write("\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
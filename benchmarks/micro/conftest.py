@@ -0,0 +1,115 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Iterator
+
+import pytest
+
+from event_handler.db.interface import Database
+from event_handler.db.postgresql import Postgresql
+from event_handler.db.sqlite import Sqlite
+from event_handler.repositories import migrations
+from event_handler.repositories.event_repo import to_timestamp
+
+ATTENDEES_PER_EVENT = 3
+_SEED_CHUNK_SIZE = 100000
+
+Run = Callable[[Callable[[], Awaitable[Any]]], Any]
+
+
+def pytest_addoption(parser: pytest.Parser):
+    parser.addoption(
+        "--table-sizes",
+        default="1000,10000,100000",
+        help="Comma-separated numbers of users and events the tables are filled with, e.g. 1000,1000000.",
+    )
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc):
+    if "table_size" in metafunc.fixturenames:
+        sizes = sorted(int(size) for size in metafunc.config.getoption("table_sizes").split(","))
+        metafunc.parametrize("table_size", sizes, scope="session", ids=[f"{size}rows" for size in sizes])
+
+
+@pytest.fixture(scope="session")
+def loop() -> Iterator[asyncio.AbstractEventLoop]:
+    # SetUp
+    loop = asyncio.new_event_loop()
+    # Entry
+    yield loop
+    # TearDown
+    loop.close()
+
+
+@pytest.fixture(scope="session", params=["sqlite", "postgres"])
+def backend(request: pytest.FixtureRequest) -> str:
+    if request.param == "postgres" and "POSTGRESQL_HOST" not in os.environ:
+        pytest.skip("Set the POSTGRESQL_* environment variables to benchmark an empty PostgreSQL database.")
+    return request.param
+
+
+def _create_database(backend: str) -> Database:
+    if backend == "sqlite":
+        return Sqlite(path=":memory:")
+    return Postgresql(
+        host=os.environ["POSTGRESQL_HOST"],
+        port=int(os.environ.get("POSTGRESQL_PORT", 5432)),
+        db_name=os.environ.get("POSTGRESQL_DB_NAME", "event_handler"),
+        user_name=os.environ.get("POSTGRESQL_USER_NAME", ""),
+        password=os.environ.get("POSTGRESQL_PASSWORD", ""),
+    )
+
+
+async def _seed(db: Database, table_size: int):
+    """Fill the tables with table_size users and events, each event attended by a few users.
+
+    Rows are inserted with their ids and existing rows are skipped, so a PostgreSQL database is grown
+    from one table size to the next.
+    """
+    start = datetime(2024, 1, 1)
+    for first in range(1, table_size + 1, _SEED_CHUNK_SIZE):
+        ids = range(first, min(first + _SEED_CHUNK_SIZE, table_size + 1))
+        users = [{"id": id, "first_name": "Son", "last_name": f"Goku{id}", "email": "goku@email.com"} for id in ids]
+        events = [
+            {
+                "id": id,
+                "name": f"Party{id}",
+                "time": to_timestamp(start + timedelta(minutes=id)),
+                "location": "Reeperbahn",
+                "description": "Dance and drink",
+            }
+            for id in ids
+        ]
+        attendees = [
+            {"event_id": id, "user_id": (id + offset) % table_size + 1}
+            for id in ids
+            for offset in range(ATTENDEES_PER_EVENT)
+        ]
+        await db.insert_many(table_name="Users", data=users, ignore_duplicates=True)
+        await db.insert_many(table_name="Events", data=events, ignore_duplicates=True)
+        await db.insert_many(table_name="EventAttendees", data=attendees, ignore_duplicates=True)
+    await db.advance_key_sequence(table_name="Users")
+    await db.advance_key_sequence(table_name="Events")
+
+
+@pytest.fixture(scope="session")
+def database(loop: asyncio.AbstractEventLoop, backend: str, table_size: int) -> Iterator[Database]:
+    # SetUp
+    db = _create_database(backend)
+    loop.run_until_complete(db.connect())
+    loop.run_until_complete(migrations.migrate(db))
+    loop.run_until_complete(_seed(db, table_size))
+    # Entry
+    yield db
+    # TearDown
+    loop.run_until_complete(db.disconnect())
+
+
+@pytest.fixture
+def run(loop: asyncio.AbstractEventLoop, benchmark) -> Run:
+    """Returns a function benchmarking a coroutine function on the event loop of the database."""
+
+    def run(function: Callable[[], Awaitable[Any]]) -> Any:
+        return benchmark(lambda: loop.run_until_complete(function()))
+
+    return run
@@ -0,0 +1,58 @@
+import random
+
+from benchmarks.micro.conftest import Run
+from event_handler.db.interface import Database
+
+
+def test_insert_data(run: Run, database: Database, table_size: int):
+    # Arrange
+    entry = {"name": "Party", "time": 0, "location": "Reeperbahn", "description": "Dance and drink"}
+
+    # Act
+    key = run(lambda: database.insert_data(table_name="Events", data=entry))
+
+    # Assert
+    assert key[0] > table_size
+
+
+def test_select_all_data_by_key_and_value(run: Run, database: Database, table_size: int):
+    # Arrange
+    ids = random.Random(0)
+
+    # Act
+    rows = run(
+        lambda: database.select_all_data_by_key_and_value(
+            table_name="Events", key="id", value=ids.randint(1, table_size)
+        )
+    )
+
+    # Assert
+    assert len(rows) == 1
+
+
+def test_select_by_keys(run: Run, database: Database, table_size: int):
+    # Arrange
+    ids = random.Random(0)
+
+    # Act
+    rows = run(
+        lambda: database.select_by_keys(table_name="Events", key="id", values=ids.sample(range(1, table_size + 1), 100))
+    )
+
+    # Assert
+    assert len(rows) == 100
+
+
+def test_select_page_by_range(run: Run, database: Database, table_size: int):
+    # Arrange
+    lower, upper = -(2**63), 2**63 - 1
+
+    # Act
+    rows = run(
+        lambda: database.select_page_by_range(
+            table_name="Events", key="time", lower=lower, upper=upper, tiebreak_key="id", limit=100
+        )
+    )
+
+    # Assert
+    assert len(rows) == 100
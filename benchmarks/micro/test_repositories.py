@@ -0,0 +1,72 @@
+import random
+from collections import namedtuple
+from datetime import datetime
+
+from benchmarks.micro.conftest import ATTENDEES_PER_EVENT, Run
+from event_handler.db.interface import Database
+from event_handler.models.event import Event
+from event_handler.repositories.event_repo import EventRepository, to_timestamp
+
+
+def test_get_event(run: Run, database: Database, table_size: int):
+    # Arrange
+    repo = EventRepository(db=database)
+    ids = random.Random(0)
+
+    # Act
+    event = run(lambda: repo.get_event(id=ids.randint(1, table_size)))
+
+    # Assert
+    assert len(event.attendees) == min(ATTENDEES_PER_EVENT, table_size)
+
+
+def test_get_events(run: Run, database: Database, table_size: int):
+    # Arrange
+    repo = EventRepository(db=database)
+    ids = random.Random(0)
+
+    # Act
+    events = run(lambda: repo.get_events(ids=ids.sample(range(1, table_size + 1), 100)))
+
+    # Assert
+    assert len(events) == 100
+
+
+def test_list_events(run: Run, database: Database, table_size: int):
+    # Arrange
+    repo = EventRepository(db=database)
+
+    # Act
+    page = run(lambda: repo.list_events(limit=100))
+
+    # Assert
+    assert len(page.events) == 100
+
+
+def test_to_event(benchmark):
+    """Maps a row of the events table and its attendees to the model, independent of the table size."""
+    # Arrange
+    Row = namedtuple("Row", ["id", "name", "time", "location", "description", "version"])
+    entry = Row(1, "Party", to_timestamp(datetime(2024, 1, 1)), "Reeperbahn", "Dance and drink", 1)
+    attendees = set(range(ATTENDEES_PER_EVENT))
+
+    # Act
+    event = benchmark(EventRepository._to_event, entry, attendees)
+
+    # Assert
+    assert event.attendees == attendees
+
+
+def test_parse_event_with_attendees(benchmark):
+    """Validates a request body with many attendees into the model, as the routes do."""
+    # Arrange
+    body = (
+        '{"name": "Party", "time": "2024-01-01T20:00:00Z", "location": "Reeperbahn", "description": "Dance",'
+        f' "attendees": {list(range(1000))}}}'
+    )
+
+    # Act
+    event = benchmark(Event.model_validate_json, body)
+
+    # Assert
+    assert len(event.attendees) == 1000
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from benchmarks.micro.conftest import Run
+from event_handler.api.responses import ModelResponse
+from event_handler.models.event import EventWithId
+
+
+@pytest.fixture(params=[10, 1000, 100000], ids=lambda count: f"{count}attendees")
+def client(request: pytest.FixtureRequest) -> httpx.AsyncClient:
+    """Returns a client of an app serving one event with the given number of attendees on both paths."""
+    event = EventWithId(
+        id=1,
+        name="Party",
+        time=datetime(2024, 1, 1, 20),
+        location="Reeperbahn",
+        description="Dance and drink",
+        attendees=set(range(request.param)),
+    )
+    app = FastAPI()
+
+    @app.get("/validated", response_model=EventWithId | None)
+    async def validated():
+        return event.__dict__
+
+    @app.get("/direct", response_model=EventWithId | None)
+    async def direct():
+        return ModelResponse(event)
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+
+@pytest.mark.parametrize("path", ["validated", "direct"])
+def test_get_event_response(run: Run, client: httpx.AsyncClient, path: str):
+    """Compares the default path, revalidating the event against the response model, to the direct dump."""
+    # Act
+    response = run(lambda: client.get(f"/{path}"))
+
+    # Assert
+    assert response.json()["id"] == 1
@@ -1,7 +1,12 @@
+import os
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings
 
+from event_handler.cache.interface import Cache
+from event_handler.cache.lru import LruCache
+from event_handler.db.instrumented import InstrumentedDatabase
 from event_handler.db.interface import Database
 from event_handler.db.postgresql import Postgresql
 from event_handler.db.sqlite import Sqlite
@@ -13,6 +18,21 @@ class SqliteSettings(BaseSettings):
     db_path: str = ":memory"
     """The path to the SQLite database file. Default is in-memory."""
 
+    use_wal: bool = False
+    """A flag to indicate whether to use WAL mode with separate reader connections. Requires a database file."""
+
+    reader_count: int = 4
+    """The number of read-only connections in WAL mode. Default is 4."""
+
+    use_group_commit: bool = False
+    """A flag to indicate whether writes of concurrent requests are committed together. Default is False."""
+
+    max_commit_delay_in_s: float = 0.002
+    """The maximum time in seconds a write waits for others to join its group commit. Default is 0.002."""
+
+    max_commit_batch_size: int = 100
+    """The maximum number of writes committed together in group commit mode. Default is 100."""
+
 
 class PostgresSettings(BaseSettings):
     """A class to store the settings for PostgreSQL database."""
@@ -32,6 +52,37 @@ class PostgresSettings(BaseSettings):
     password: str = ""
     """The password to authenticate with the PostgreSQL server."""
 
+    min_pool_size: int = 4
+    """The number of connections the pool keeps open. Default is 4."""
+
+    max_pool_size: int | None = None
+    """The maximum number of connections the pool opens under load. Default is the minimum pool size."""
+
+    max_waiting: int = 0
+    """The maximum number of requests queued for a connection before new ones fail. Default is 0 (unlimited)."""
+
+    max_idle_in_s: float = 600
+    """The time in seconds after which a connection idle above the minimum pool size is closed. Default is 600."""
+
+    max_lifetime_in_s: float = 3600
+    """The time in seconds after which a connection is replaced. Default is 3600."""
+
+    acquire_timeout_in_s: float = 30
+    """The time in seconds a request waits for a connection before it fails. Default is 30."""
+
+
+class CacheSettings(BaseSettings):
+    """A class to store the settings for the caches of events and users read by id."""
+
+    use_cache: bool = False
+    """A flag to indicate whether reads by id are cached in process. Default is False."""
+
+    max_size: int = 10000
+    """The maximum number of entries per cache. Default is 10000."""
+
+    ttl_in_s: float = 5
+    """The time in seconds until a cached entry expires. Default is 5."""
+
 
 class GeneralSettings(BaseSettings):
     """A class to store the general settings for the application."""
@@ -42,6 +93,48 @@ class GeneralSettings(BaseSettings):
     request_timeout_in_s: float = 5
     """The timeout in seconds for HTTP requests. Default is 5."""
 
+    use_instrumentation: bool = True
+    """A flag to indicate whether database calls are measured for metrics, traces and slow queries. Default is True."""
+
+    trace_path: str | None = None
+    """The file the traces of the requests are appended to as OTLP/JSON, or "-" for stdout. Default is None (off)."""
+
+    slow_query_threshold_in_s: float | None = 0.5
+    """The duration in seconds from which a database call is logged with its statement. Default is 0.5."""
+
+    export_chunk_size: int = 1000
+    """The number of rows read from the database at a time while streaming an export. Default is 1000."""
+
+    use_fast_responses: bool = False
+    """A flag to indicate whether read routes serialize their models directly, skipping the revalidation
+    against the response model. Default is False."""
+
+    cache_control: str = "no-cache"
+    """The Cache-Control header of the events and users read by id. Default is no-cache, which lets clients and
+    proxies store them but makes them revalidate their ETag on every use."""
+
+    log_level: str = "INFO"
+    """The lowest level that is logged. Default is INFO."""
+
+    log_sampling_rates: dict[str, float] = {}
+    """The share of records kept per message template below the warning level, e.g. {"Created user at id=%s.": 0.01}.
+    Default is {} (all records kept)."""
+
+    workers: int = 1
+    """The number of server processes, each with its own database connection or pool. Default is 1."""
+
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    """The event loop of the server. Default is auto, which uses uvloop if it is installed."""
+
+    http: Literal["auto", "h11", "httptools"] = "auto"
+    """The HTTP protocol implementation of the server. Default is auto, which uses httptools if it is installed."""
+
+    backlog: int = 2048
+    """The maximum number of connections waiting to be accepted. Default is 2048."""
+
+    keep_alive_timeout_in_s: int = 5
+    """The time in seconds an idle keep-alive connection is held open. Default is 5."""
+
 
 @lru_cache()
 def get_sqlite_settings() -> SqliteSettings:
@@ -63,6 +156,16 @@ def get_postgres_settings() -> PostgresSettings:
     return PostgresSettings()
 
 
+@lru_cache()
+def get_cache_settings() -> CacheSettings:
+    """A function to get the cache settings from the environment variables.
+
+    Returns:
+        CacheSettings: An instance of CacheSettings class.
+    """
+    return CacheSettings()
+
+
 @lru_cache()
 def get_general_settings() -> GeneralSettings:
     """A function to get the general settings from the environment variables.
@@ -78,17 +181,80 @@ def get_database() -> Database:
     """A function to get a database instance based on the general settings.
 
     Returns:
-        Database: An instance of Database class, either Postgresql or Sqlite.
+        Database: An instance of Database class, either Postgresql or Sqlite, wrapped to record the
+            latency of its calls if instrumentation is enabled.
     """
     if get_general_settings().use_postgres:
         settings = get_postgres_settings()
-        return Postgresql(
+        database = Postgresql(
             host=settings.host,
             port=settings.port,
             db_name=settings.db_name,
             user_name=settings.user_name,
             password=settings.password,
+            min_pool_size=settings.min_pool_size,
+            max_pool_size=settings.max_pool_size,
+            max_waiting=settings.max_waiting,
+            max_idle_in_s=settings.max_idle_in_s,
+            max_lifetime_in_s=settings.max_lifetime_in_s,
+            acquire_timeout_in_s=settings.acquire_timeout_in_s,
+        )
+    else:
+        settings = get_sqlite_settings()
+        database = Sqlite(
+            path=settings.db_path,
+            use_wal=settings.use_wal,
+            reader_count=settings.reader_count,
+            use_group_commit=settings.use_group_commit,
+            max_commit_delay_in_s=settings.max_commit_delay_in_s,
+            max_commit_batch_size=settings.max_commit_batch_size,
         )
 
-    settings = get_sqlite_settings()
-    return Sqlite(path=settings.db_path)
+    general_settings = get_general_settings()
+    if general_settings.use_instrumentation:
+        return InstrumentedDatabase(database, slow_query_threshold_in_s=general_settings.slow_query_threshold_in_s)
+    return database
+
+
+def _create_cache() -> Cache | None:
+    """A function to create a cache based on the cache settings.
+
+    Returns:
+        Cache | None: An instance of Cache class, or None if caching is disabled.
+    """
+    settings = get_cache_settings()
+    if settings.use_cache:
+        return LruCache(max_size=settings.max_size, ttl_in_s=settings.ttl_in_s)
+
+
+@lru_cache()
+def get_event_cache() -> Cache | None:
+    """A function to get the cache of events read by id.
+
+    Returns:
+        Cache | None: An instance of Cache class, or None if caching is disabled.
+    """
+    return _create_cache()
+
+
+@lru_cache()
+def get_user_cache() -> Cache | None:
+    """A function to get the cache of users read by id.
+
+    Returns:
+        Cache | None: An instance of Cache class, or None if caching is disabled.
+    """
+    return _create_cache()
+
+
+def _clear_process_state():
+    """A function to drop the database and caches inherited from a parent process.
+
+    Their connections, locks and event loop bindings belong to the parent, so a forked process creates its own.
+    """
+    get_database.cache_clear()
+    get_event_cache.cache_clear()
+    get_user_cache.cache_clear()
+
+
+os.register_at_fork(after_in_child=_clear_process_state)
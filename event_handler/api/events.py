@@ -1,24 +1,140 @@
 import asyncio
+from datetime import datetime
+from typing import AsyncIterator
 
-from fastapi import APIRouter, Depends, Response, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
 from typing_extensions import Annotated
 
-from event_handler.api.config import GeneralSettings, get_database, get_general_settings
+from event_handler.api.config import (
+    GeneralSettings,
+    get_database,
+    get_event_cache,
+    get_general_settings,
+)
+from event_handler.api.responses import (
+    ModelResponse,
+    cache_headers,
+    is_not_modified,
+    to_etag,
+    to_version,
+)
+from event_handler.cache.interface import Cache
 from event_handler.db.interface import Database
 from event_handler.logger import logger
-from event_handler.models.event import Event, EventId, EventKey, EventWithId
+from event_handler.models.event import (
+    Event,
+    EventCursor,
+    EventId,
+    EventKey,
+    EventPage,
+    EventUpdate,
+    EventWithId,
+)
 from event_handler.models.user import UserId
-from event_handler.repositories.event_repo import EventRepository
+from event_handler.repositories.event_repo import EventRepository, InvalidCursorError
 
 router = APIRouter(prefix="/api/v1.0/events", tags=["events"], responses={404: {"description": "Not found"}})
 
 
-async def get_repository(database: Annotated[Database, Depends(get_database)]) -> EventRepository:
-    if not database.is_connected():
-        await database.connect()
-    repo = EventRepository(db=database)
-    await repo.create_repository()
-    return repo
+async def get_repository(
+    database: Annotated[Database, Depends(get_database)],
+    cache: Annotated[Cache | None, Depends(get_event_cache)],
+) -> EventRepository:
+    """Returns a repository for the request. The database is connected and migrated by the app lifespan."""
+    return EventRepository(db=database, cache=cache)
+
+
+@router.get(
+    "",
+    status_code=status.HTTP_200_OK,
+    response_model=EventPage | None,
+    responses={
+        status.HTTP_200_OK: {"description": "Events successfully fetched."},
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid cursor."},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+    },
+)
+async def list_events(
+    response: Response,
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[EventRepository, Depends(get_repository)],
+    start: Annotated[datetime | None, Query(alias="from", description="Inclusive start of the time range.")] = None,
+    end: Annotated[datetime | None, Query(alias="to", description="Exclusive end of the time range.")] = None,
+    cursor: Annotated[EventCursor | None, Query(description="Cursor returned with the previous page.")] = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    try:
+        page = await asyncio.wait_for(
+            repo.list_events(start=start, end=end, cursor=cursor, limit=limit), settings.request_timeout_in_s
+        )
+        if settings.use_fast_responses:
+            return ModelResponse(page)
+        return page
+    except InvalidCursorError:
+        logger.error("Invalid cursor=%s.", cursor)
+        response.status_code = status.HTTP_400_BAD_REQUEST
+    except asyncio.TimeoutError:
+        logger.error("Timeout while calling list_events().")
+        response.status_code = status.HTTP_408_REQUEST_TIMEOUT
+
+
+@router.get(
+    "/search",
+    status_code=status.HTTP_200_OK,
+    response_model=EventPage | None,
+    responses={
+        status.HTTP_200_OK: {"description": "Matching events successfully fetched, the most relevant first."},
+        status.HTTP_400_BAD_REQUEST: {"description": "Invalid cursor."},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+    },
+)
+async def search_events(
+    response: Response,
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[EventRepository, Depends(get_repository)],
+    q: Annotated[str, Query(max_length=1000, description="Words to find in the name, description or location.")],
+    cursor: Annotated[EventCursor | None, Query(description="Cursor returned with the previous page.")] = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    try:
+        page = await asyncio.wait_for(
+            repo.search_events(query=q, cursor=cursor, limit=limit), settings.request_timeout_in_s
+        )
+        if settings.use_fast_responses:
+            return ModelResponse(page)
+        return page
+    except InvalidCursorError:
+        logger.error("Invalid cursor=%s.", cursor)
+        response.status_code = status.HTTP_400_BAD_REQUEST
+    except asyncio.TimeoutError:
+        logger.error("Timeout while calling search_events().")
+        response.status_code = status.HTTP_408_REQUEST_TIMEOUT
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "All events as newline delimited JSON, one event per line.",
+            "content": {"application/x-ndjson": {}},
+        },
+    },
+)
+async def export_events(
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[EventRepository, Depends(get_repository)],
+):
+    async def lines() -> AsyncIterator[str]:
+        count = 0
+        async for events in repo.iterate_events(chunk_size=settings.export_chunk_size):
+            yield "".join(event.model_dump_json() + "\n" for event in events)
+            count += len(events)
+        logger.info("Exported %d events.", count)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.put(
@@ -38,13 +154,48 @@ async def create_event(
 ):
     try:
         id = await asyncio.wait_for(repo.create_event(event), settings.request_timeout_in_s)
-        logger.info(f"Created new event at id={id}")
+        logger.info("Created new event at id=%s.", id, extra={"event_id": id})
         return {"id": str(id)}
     except asyncio.TimeoutError:
         logger.error("Timeout while calling create_event().")
         response.status_code = status.HTTP_408_REQUEST_TIMEOUT
 
 
+@router.put(
+    "/create_events",
+    status_code=status.HTTP_200_OK,
+    response_model=list[EventKey] | None,
+    responses={
+        status.HTTP_200_OK: {"description": "Events successfully created"},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+    },
+)
+async def create_events(
+    events: list[Event],
+    response: Response,
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[EventRepository, Depends(get_repository)],
+):
+    try:
+        ids = await asyncio.wait_for(repo.create_events(events), settings.request_timeout_in_s)
+        logger.info("Created %d new events.", len(ids))
+        return [{"id": str(id)} for id in ids]
+    except asyncio.TimeoutError:
+        logger.error("Timeout while calling create_events().")
+        response.status_code = status.HTTP_408_REQUEST_TIMEOUT
+
+
+@router.get(
+    "/get_event/{event_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=EventWithId | None,
+    responses={
+        status.HTTP_200_OK: {"description": "Event successfully fetched, with its version as ETag."},
+        status.HTTP_304_NOT_MODIFIED: {"description": "Event not modified since the version in If-None-Match."},
+        status.HTTP_404_NOT_FOUND: {"description": "Event not found."},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+    },
+)
 @router.put(
     "/get_event/{event_id}",
     status_code=status.HTTP_200_OK,
@@ -60,16 +211,97 @@ async def get_event(
     response: Response,
     settings: Annotated[GeneralSettings, Depends(get_general_settings)],
     repo: Annotated[EventRepository, Depends(get_repository)],
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     try:
+        if if_none_match is not None:
+            # The version is checked without looking up the attendees or building the event
+            version = await asyncio.wait_for(repo.get_event_version(event_id), settings.request_timeout_in_s)
+            if version is not None and is_not_modified(if_none_match, version):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(version, settings.cache_control)
+                )
+
         event = await asyncio.wait_for(repo.get_event(event_id), settings.request_timeout_in_s)
         if event is not None:
+            headers = cache_headers(event.version, settings.cache_control)
+            if settings.use_fast_responses:
+                return ModelResponse(event, headers=headers)
+            response.headers.update(headers)
             return event.__dict__
         else:
-            logger.error(f"Invalid event id={event_id}.")
+            logger.error("Invalid event id=%s.", event_id, extra={"event_id": event_id})
+            response.status_code = status.HTTP_404_NOT_FOUND
+    except asyncio.TimeoutError:
+        logger.error("Timeout while calling get_event(id=%s).", event_id, extra={"event_id": event_id})
+        response.status_code = status.HTTP_408_REQUEST_TIMEOUT
+
+
+@router.get(
+    "/get_events",
+    status_code=status.HTTP_200_OK,
+    response_model=list[EventWithId] | None,
+    responses={
+        status.HTTP_200_OK: {"description": "Events successfully fetched."},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+    },
+)
+async def get_events(
+    ids: Annotated[list[EventId], Query()],
+    response: Response,
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[EventRepository, Depends(get_repository)],
+):
+    try:
+        events = await asyncio.wait_for(repo.get_events(ids), settings.request_timeout_in_s)
+        if settings.use_fast_responses:
+            return ModelResponse(events)
+        return [event.__dict__ for event in events]
+    except asyncio.TimeoutError:
+        logger.error("Timeout while calling get_events(ids=%s).", ids)
+        response.status_code = status.HTTP_408_REQUEST_TIMEOUT
+
+
+@router.patch(
+    "/update_event/{event_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_204_NO_CONTENT: {"description": "Event successfully updated, with its new version as ETag."},
+        status.HTTP_404_NOT_FOUND: {"description": "Event not found."},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+        status.HTTP_412_PRECONDITION_FAILED: {"description": "Event modified since the version in If-Match."},
+        status.HTTP_428_PRECONDITION_REQUIRED: {"description": "If-Match with the ETag of the event required."},
+    },
+)
+async def update_event(
+    event_id: EventId,
+    event: EventUpdate,
+    response: Response,
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[EventRepository, Depends(get_repository)],
+    if_match: Annotated[str | None, Header()] = None,
+):
+    version = to_version(if_match) if if_match is not None else None
+    if version is None:
+        logger.error("Missing version to update event id=%s.", event_id, extra={"event_id": event_id})
+        response.status_code = status.HTTP_428_PRECONDITION_REQUIRED
+        return
+
+    try:
+        new_version = await asyncio.wait_for(
+            repo.update_event(event_id, event, version=version), settings.request_timeout_in_s
+        )
+        if new_version is not None:
+            logger.info("Updated event at id=%s.", event_id, extra={"event_id": event_id})
+            response.headers["ETag"] = to_etag(new_version)
+        elif await asyncio.wait_for(repo.get_event_version(event_id), settings.request_timeout_in_s) is None:
+            logger.error("Invalid event id=%s.", event_id, extra={"event_id": event_id})
             response.status_code = status.HTTP_404_NOT_FOUND
+        else:
+            logger.warning("Version conflict while updating event id=%s.", event_id, extra={"event_id": event_id})
+            response.status_code = status.HTTP_412_PRECONDITION_FAILED
     except asyncio.TimeoutError:
-        logger.error(f"Timeout while calling get_event(id={event_id}).")
+        logger.error("Timeout while calling update_event(id=%s).", event_id, extra={"event_id": event_id})
         response.status_code = status.HTTP_408_REQUEST_TIMEOUT
 
 
@@ -94,10 +326,10 @@ async def add_attendees_to_event(
             repo.add_attendees_to_event(event_id, user_ids), settings.request_timeout_in_s
         )
         if not is_succesful:
-            logger.error(f"Invalid event id={event_id}.")
+            logger.error("Invalid event id=%s.", event_id, extra={"event_id": event_id})
             response.status_code = status.HTTP_404_NOT_FOUND
     except asyncio.TimeoutError:
-        logger.error(f"Timeout while calling add_attendees_to_event(id={event_id}).")
+        logger.error("Timeout while calling add_attendees_to_event(id=%s).", event_id, extra={"event_id": event_id})
         response.status_code = status.HTTP_408_REQUEST_TIMEOUT
 
 
@@ -118,5 +350,5 @@ async def delete_event(
     try:
         await asyncio.wait_for(repo.delete_event(event_id), settings.request_timeout_in_s)
     except asyncio.TimeoutError:
-        logger.error(f"Timeout while calling add_attendees_to_event(id={event_id}).")
+        logger.error("Timeout while calling add_attendees_to_event(id=%s).", event_id, extra={"event_id": event_id})
         response.status_code = status.HTTP_408_REQUEST_TIMEOUT
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, status
+from pydantic import BaseModel
+from typing_extensions import Annotated
+
+from event_handler.api.config import get_database, get_event_cache, get_user_cache
+from event_handler.cache.interface import Cache, CacheStats
+from event_handler.db.interface import Database, PoolStats
+
+router = APIRouter(prefix="/api/v1.0/internal", tags=["internal"])
+
+
+class CachesStats(BaseModel):
+    events: CacheStats | None = None
+    users: CacheStats | None = None
+
+
+@router.get(
+    "/cache_stats",
+    status_code=status.HTTP_200_OK,
+    response_model=CachesStats,
+    responses={
+        status.HTTP_200_OK: {"description": "Counters of the event and user caches. Disabled caches are null."},
+    },
+)
+async def get_cache_stats(
+    event_cache: Annotated[Cache | None, Depends(get_event_cache)],
+    user_cache: Annotated[Cache | None, Depends(get_user_cache)],
+):
+    return CachesStats(
+        events=event_cache.stats() if event_cache is not None else None,
+        users=user_cache.stats() if user_cache is not None else None,
+    )
+
+
+@router.get(
+    "/pool_stats",
+    status_code=status.HTTP_200_OK,
+    response_model=PoolStats | None,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "State and counters of the database connection pool. Null if the database has no pool."
+        },
+    },
+)
+async def get_pool_stats(database: Annotated[Database, Depends(get_database)]):
+    return database.pool_stats()
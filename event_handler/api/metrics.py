@@ -0,0 +1,74 @@
+import os
+import time
+
+from fastapi import APIRouter, Response, status
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+router = APIRouter(tags=["internal"])
+
+REQUESTS = Counter(
+    "event_handler_requests_total", "Number of handled requests by route and status.", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "event_handler_request_duration_seconds", "Latency of the handled requests by route.", ["method", "route"]
+)
+TIMEOUTS = Counter(
+    "event_handler_request_timeouts_total",
+    "Number of requests that timed out with a 408 by route.",
+    ["method", "route"],
+)
+
+
+class MetricsMiddleware:
+    """An ASGI middleware that counts the requests and records their latency per route.
+
+    Routes are labelled with their path template, e.g. /api/v1.0/events/get_event/{event_id}, so the
+    number of series does not grow with the ids in the requests.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """Initialize the middleware around the given app."""
+        self._app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self._app(scope, receive, send)
+            return
+
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self._app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope
+            route = scope["route"].path if "route" in scope else "unmatched"
+            REQUEST_LATENCY.labels(scope["method"], route).observe(time.perf_counter() - start)
+            REQUESTS.labels(scope["method"], route, status_code).inc()
+            if status_code == status.HTTP_408_REQUEST_TIMEOUT:
+                TIMEOUTS.labels(scope["method"], route).inc()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    registry = REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Every worker writes its samples to the directory, so any of them reports the sum of all
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,75 @@
+from typing import Any
+
+from fastapi import Response
+from pydantic import BaseModel
+
+
+class ModelResponse(Response):
+    """A JSON response that serializes validated models directly.
+
+    Returning it from a route skips the validation of the content against the response model, which
+    the models built by the repositories have already passed, and serializes them in a single pass
+    of the pydantic serializer instead of encoding a dict first.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: BaseModel | list[BaseModel]) -> bytes:
+        if isinstance(content, BaseModel):
+            return _to_json(content)
+        return b"[" + b",".join(_to_json(model) for model in content) + b"]"
+
+
+def _to_json(model: Any) -> bytes:
+    return model.__pydantic_serializer__.to_json(model)
+
+
+def cache_headers(version: int, cache_control: str) -> dict[str, str]:
+    """Returns the headers that let clients and proxies store a row and revalidate it by its version.
+
+    Args:
+        version (int): The version of the row, which is incremented on every write.
+        cache_control (str): The value of the Cache-Control header.
+
+    Returns:
+        dict[str, str]: The ETag and Cache-Control headers.
+    """
+    return {"ETag": to_etag(version), "Cache-Control": cache_control}
+
+
+def is_not_modified(if_none_match: str | None, version: int) -> bool:
+    """Returns whether the If-None-Match header of a request matches the current version of a row.
+
+    Entity tags are compared weakly, so W/"1" matches the version 1 as well.
+
+    Args:
+        if_none_match (str | None): The If-None-Match header of the request.
+        version (int): The current version of the row.
+
+    Returns:
+        bool: True if the version the client already has is current, False otherwise.
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == to_etag(version) for tag in if_none_match.split(","))
+
+
+def to_etag(version: int) -> str:
+    """Returns the strong ETag of a version of a row."""
+    return f'"{version}"'
+
+
+def to_version(if_match: str) -> int | None:
+    """Returns the version in the If-Match header of a request.
+
+    Args:
+        if_match (str): The If-Match header of the request, the ETag of the version an update is based on.
+
+    Returns:
+        int | None: The version, or None if the header is not a single strong ETag of a version.
+    """
+    tag = if_match.strip()
+    if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdecimal():
+        return int(tag[1:-1])
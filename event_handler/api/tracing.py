@@ -0,0 +1,36 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from event_handler import tracing
+
+
+class TracingMiddleware:
+    """An ASGI middleware that runs every request in the root span of a new trace.
+
+    The span covers routing, validation, the handler and the serialization of the response. The time
+    not covered by the spans of the repositories and the database is spent in the framework.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """Initialize the middleware around the given app."""
+        self._app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self._app(scope, receive, send)
+            return
+
+        attributes = {"http.method": scope["method"], "http.target": scope["path"]}
+        with tracing.start_span(f"{scope['method']} {scope['path']}", **attributes) as span:
+
+            async def send_with_status(message: Message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            try:
+                await self._app(scope, receive, send_with_status)
+            finally:
+                # The router stores the matched route in the scope
+                if "route" in scope:
+                    span.name = f"{scope['method']} {scope['route'].path}"
+                    span.set_attribute("http.route", scope["route"].path)
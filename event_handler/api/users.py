@@ -1,23 +1,41 @@
 import asyncio
+from typing import AsyncIterator
 
-from fastapi import APIRouter, Depends, Response, status
+from fastapi import APIRouter, Depends, Header, Query, Response, status
+from fastapi.responses import StreamingResponse
 from typing_extensions import Annotated
 
-from event_handler.api.config import GeneralSettings, get_database, get_general_settings
+from event_handler.api.config import (
+    GeneralSettings,
+    get_database,
+    get_general_settings,
+    get_user_cache,
+)
+from event_handler.api.events import get_repository as get_event_repository
+from event_handler.api.responses import (
+    ModelResponse,
+    cache_headers,
+    is_not_modified,
+    to_etag,
+    to_version,
+)
+from event_handler.cache.interface import Cache
 from event_handler.db.interface import Database
 from event_handler.logger import logger
-from event_handler.models.user import User, UserId, UserKey, UserWithId
+from event_handler.models.event import EventId, EventWithId
+from event_handler.models.user import User, UserId, UserKey, UserUpdate, UserWithId
+from event_handler.repositories.event_repo import EventRepository
 from event_handler.repositories.user_repo import UserRepository
 
 router = APIRouter(prefix="/api/v1.0/users", tags=["users"], responses={404: {"description": "Not found"}})
 
 
-async def get_repository(database: Annotated[Database, Depends(get_database)]) -> UserRepository:
-    if not database.is_connected():
-        await database.connect()
-    repo = UserRepository(db=database)
-    await repo.create_repository()
-    return repo
+async def get_repository(
+    database: Annotated[Database, Depends(get_database)],
+    cache: Annotated[Cache | None, Depends(get_user_cache)],
+) -> UserRepository:
+    """Returns a repository for the request. The database is connected and migrated by the app lifespan."""
+    return UserRepository(db=database, cache=cache)
 
 
 @router.put(
@@ -37,13 +55,48 @@ async def create_user(
 ):
     try:
         id = await asyncio.wait_for(repo.create_user(user), settings.request_timeout_in_s)
-        logger.info("Created user at id={id}.")
+        logger.info("Created user at id=%s.", id, extra={"user_id": id})
         return {"id": str(id)}
     except asyncio.TimeoutError:
         logger.error("Timeout while calling create_user().")
         response.status_code = status.HTTP_408_REQUEST_TIMEOUT
 
 
+@router.put(
+    "/create_users",
+    status_code=status.HTTP_200_OK,
+    response_model=list[UserKey] | None,
+    responses={
+        status.HTTP_200_OK: {"description": "Users successfully created"},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+    },
+)
+async def create_users(
+    users: list[User],
+    response: Response,
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[UserRepository, Depends(get_repository)],
+):
+    try:
+        ids = await asyncio.wait_for(repo.create_users(users), settings.request_timeout_in_s)
+        logger.info("Created %d users.", len(ids))
+        return [{"id": str(id)} for id in ids]
+    except asyncio.TimeoutError:
+        logger.error("Timeout while calling create_users().")
+        response.status_code = status.HTTP_408_REQUEST_TIMEOUT
+
+
+@router.get(
+    "/get_user/{user_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=UserWithId | None,
+    responses={
+        status.HTTP_200_OK: {"description": "User successfully fetched, with its version as ETag."},
+        status.HTTP_304_NOT_MODIFIED: {"description": "User not modified since the version in If-None-Match."},
+        status.HTTP_404_NOT_FOUND: {"description": "User not found."},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+    },
+)
 @router.put(
     "/get_user/{user_id}",
     status_code=status.HTTP_200_OK,
@@ -59,16 +112,150 @@ async def get_user(
     response: Response,
     settings: Annotated[GeneralSettings, Depends(get_general_settings)],
     repo: Annotated[UserRepository, Depends(get_repository)],
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
     try:
+        if if_none_match is not None:
+            version = await asyncio.wait_for(repo.get_user_version(user_id), settings.request_timeout_in_s)
+            if version is not None and is_not_modified(if_none_match, version):
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(version, settings.cache_control)
+                )
+
         user = await asyncio.wait_for(repo.get_user(user_id), settings.request_timeout_in_s)
         if user is not None:
+            headers = cache_headers(user.version, settings.cache_control)
+            if settings.use_fast_responses:
+                return ModelResponse(user, headers=headers)
+            response.headers.update(headers)
             return user.__dict__
         else:
-            logger.error(f"User with id={user_id}) not found.")
+            logger.error("User with id=%s not found.", user_id, extra={"user_id": user_id})
             response.status_code = status.HTTP_404_NOT_FOUND
     except asyncio.TimeoutError:
-        logger.error(f"Timeout while calling get_user(id={user_id}).")
+        logger.error("Timeout while calling get_user(id=%s).", user_id, extra={"user_id": user_id})
+        response.status_code = status.HTTP_408_REQUEST_TIMEOUT
+
+
+@router.patch(
+    "/update_user/{user_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_204_NO_CONTENT: {"description": "User successfully updated, with its new version as ETag."},
+        status.HTTP_404_NOT_FOUND: {"description": "User not found."},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+        status.HTTP_412_PRECONDITION_FAILED: {"description": "User modified since the version in If-Match."},
+        status.HTTP_428_PRECONDITION_REQUIRED: {"description": "If-Match with the ETag of the user required."},
+    },
+)
+async def update_user(
+    user_id: UserId,
+    user: UserUpdate,
+    response: Response,
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[UserRepository, Depends(get_repository)],
+    if_match: Annotated[str | None, Header()] = None,
+):
+    version = to_version(if_match) if if_match is not None else None
+    if version is None:
+        logger.error("Missing version to update user id=%s.", user_id, extra={"user_id": user_id})
+        response.status_code = status.HTTP_428_PRECONDITION_REQUIRED
+        return
+
+    try:
+        new_version = await asyncio.wait_for(
+            repo.update_user(user_id, user, version=version), settings.request_timeout_in_s
+        )
+        if new_version is not None:
+            logger.info("Updated user at id=%s.", user_id, extra={"user_id": user_id})
+            response.headers["ETag"] = to_etag(new_version)
+        elif await asyncio.wait_for(repo.get_user_version(user_id), settings.request_timeout_in_s) is None:
+            logger.error("Invalid user id=%s.", user_id, extra={"user_id": user_id})
+            response.status_code = status.HTTP_404_NOT_FOUND
+        else:
+            logger.warning("Version conflict while updating user id=%s.", user_id, extra={"user_id": user_id})
+            response.status_code = status.HTTP_412_PRECONDITION_FAILED
+    except asyncio.TimeoutError:
+        logger.error("Timeout while calling update_user(id=%s).", user_id, extra={"user_id": user_id})
+        response.status_code = status.HTTP_408_REQUEST_TIMEOUT
+
+
+@router.get(
+    "/get_users",
+    status_code=status.HTTP_200_OK,
+    response_model=list[UserWithId] | None,
+    responses={
+        status.HTTP_200_OK: {"description": "Users successfully fetched."},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+    },
+)
+async def get_users(
+    ids: Annotated[list[UserId], Query()],
+    response: Response,
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[UserRepository, Depends(get_repository)],
+):
+    try:
+        users = await asyncio.wait_for(repo.get_users(ids), settings.request_timeout_in_s)
+        if settings.use_fast_responses:
+            return ModelResponse(users)
+        return [user.__dict__ for user in users]
+    except asyncio.TimeoutError:
+        logger.error("Timeout while calling get_users(ids=%s).", ids)
+        response.status_code = status.HTTP_408_REQUEST_TIMEOUT
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "All users as newline delimited JSON, one user per line.",
+            "content": {"application/x-ndjson": {}},
+        },
+    },
+)
+async def export_users(
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[UserRepository, Depends(get_repository)],
+):
+    async def lines() -> AsyncIterator[str]:
+        count = 0
+        async for users in repo.iterate_users(chunk_size=settings.export_chunk_size):
+            yield "".join(user.model_dump_json() + "\n" for user in users)
+            count += len(users)
+        logger.info("Exported %d users.", count)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get(
+    "/{user_id}/events",
+    status_code=status.HTTP_200_OK,
+    response_model=list[EventWithId] | None,
+    responses={
+        status.HTTP_200_OK: {"description": "Events of user successfully fetched."},
+        status.HTTP_408_REQUEST_TIMEOUT: {"description": "Request timed out."},
+    },
+)
+async def get_events_for_user(
+    user_id: UserId,
+    response: Response,
+    settings: Annotated[GeneralSettings, Depends(get_general_settings)],
+    repo: Annotated[EventRepository, Depends(get_event_repository)],
+    after: Annotated[EventId | None, Query(description="Id of the last event of the previous page.")] = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    try:
+        events = await asyncio.wait_for(
+            repo.get_events_for_user(user_id, after=after, limit=limit), settings.request_timeout_in_s
+        )
+        if settings.use_fast_responses:
+            return ModelResponse(events)
+        return [event.__dict__ for event in events]
+    except asyncio.TimeoutError:
+        logger.error("Timeout while calling get_events_for_user(id=%s).", user_id, extra={"user_id": user_id})
         response.status_code = status.HTTP_408_REQUEST_TIMEOUT
 
 
@@ -89,5 +276,5 @@ async def delete_user(
     try:
         await asyncio.wait_for(repo.delete_user(user_id), settings.request_timeout_in_s)
     except asyncio.TimeoutError:
-        logger.error(f"Timeout while calling delete_user(id={user_id}).")
+        logger.error("Timeout while calling delete_user(id=%s).", user_id, extra={"user_id": user_id})
         response.status_code = status.HTTP_408_REQUEST_TIMEOUT
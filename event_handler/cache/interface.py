@@ -0,0 +1,79 @@
+from abc import ABCMeta, abstractmethod
+from typing import Any, Hashable
+
+from pydantic import BaseModel
+
+CacheKey = Hashable
+CacheGeneration = int
+
+
+class CacheStats(BaseModel):
+    """The counters of a cache used to size it."""
+
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+    max_size: int
+
+
+class Cache(metaclass=ABCMeta):  # skip: coverage
+    """An abstract base class for an in-process cache of database reads."""
+
+    @property
+    @abstractmethod
+    def generation(self) -> CacheGeneration:
+        """Returns a counter that changes whenever an entry is invalidated.
+
+        A reader takes the generation before reading from the database and passes it to set(),
+        so a value read before a concurrent write is not cached after the write invalidated it.
+        """
+        ...
+
+    @abstractmethod
+    def get(self, key: CacheKey) -> Any | None:
+        """Gets a value from the cache.
+
+        Args:
+            key (CacheKey): The key of the value.
+
+        Returns:
+            Any | None: The cached value, or None if it is missing or expired.
+        """
+        ...
+
+    @abstractmethod
+    def set(self, key: CacheKey, value: Any, generation: CacheGeneration | None = None):
+        """Stores a value in the cache.
+
+        Args:
+            key (CacheKey): The key of the value.
+            value (Any): The value to store. Cached values are shared and must not be mutated.
+            generation (CacheGeneration | None): The generation taken before the value was read.
+                The value is discarded if an entry was invalidated since.
+        """
+        ...
+
+    @abstractmethod
+    def invalidate(self, key: CacheKey):
+        """Removes a value from the cache.
+
+        Args:
+            key (CacheKey): The key of the value.
+        """
+        ...
+
+    @abstractmethod
+    def clear(self):
+        """Removes all values from the cache."""
+        ...
+
+    @abstractmethod
+    def stats(self) -> CacheStats:
+        """Returns the counters of the cache.
+
+        Returns:
+            CacheStats: The hit, miss and eviction counters.
+        """
+        ...
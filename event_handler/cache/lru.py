@@ -0,0 +1,73 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+from event_handler.cache.interface import Cache, CacheGeneration, CacheKey, CacheStats
+
+
+class LruCache(Cache):
+    """A class that represents a least recently used cache whose entries expire after a time to live."""
+
+    def __init__(self, max_size: int, ttl_in_s: float):
+        """Initialize an empty cache holding at most max_size entries for ttl_in_s seconds each."""
+        self._max_size = max_size
+        self._ttl_in_s = ttl_in_s
+        self._entries: OrderedDict[CacheKey, tuple[float, Any]] = OrderedDict()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def generation(self) -> CacheGeneration:
+        return self._generation
+
+    def get(self, key: CacheKey) -> Any | None:
+        """Return the value and mark it as most recently used, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._expirations += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def set(self, key: CacheKey, value: Any, generation: CacheGeneration | None = None):
+        """Store the value and evict the least recently used entries beyond the maximum size."""
+        if generation is not None and generation != self._generation:
+            return
+
+        self._entries[key] = (time.monotonic() + self._ttl_in_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, key: CacheKey):
+        """Remove the value if it is cached."""
+        self._generation += 1
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all values."""
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            expirations=self._expirations,
+            size=len(self._entries),
+            max_size=self._max_size,
+        )
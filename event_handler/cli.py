@@ -1,13 +1,20 @@
 """Console script for event_handler"""
+import asyncio
 import os
 import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
 
 import click
 import uvicorn
 from fastapi import FastAPI
 
-from event_handler.api import config, events, users
-from event_handler.logger import logger
+from event_handler import tracing
+from event_handler.api import config, events, internal, metrics, users
+from event_handler.api.tracing import TracingMiddleware
+from event_handler.importer import ImportProgress, InvalidRowError, import_file
+from event_handler.logger import configure_logging, logger
+from event_handler.repositories import migrations
 
 
 def print_environment():
@@ -38,25 +45,144 @@ def set_environment():
     sqlite_settings.db_path = os.environ.get("SQLITE_PATH", ":memory:")
 
 
-def start_server():
-    app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connects, migrates and warms up the database once at startup and disconnects it at shutdown.
+
+    The server only runs the shutdown part after in-flight requests have been drained.
+    """
+    tracing.configure_tracing(config.get_general_settings().trace_path)
+    database = config.get_database()
+    await database.connect()
+    version = await migrations.migrate(database)
+    logger.info(f"Database connected at schema version {version}.")
+    yield
+    await database.disconnect()
+    logger.info("Database disconnected.")
+    tracing.configure_tracing(None)
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(metrics.MetricsMiddleware)
 
     app.include_router(events.router)
     app.include_router(users.router)
+    app.include_router(internal.router)
+    app.include_router(metrics.router)
+    return app
+
+
+def create_worker_app() -> FastAPI:
+    """Creates the app in a worker process of the server.
+
+    Workers are started as new processes that only inherit the environment, so the settings are set
+    from it again. Each worker connects its own database in the lifespan.
+    """
+    set_environment()
+    settings = config.get_general_settings()
+    configure_logging(settings.log_level, settings.log_sampling_rates)
+    return create_app()
 
-    uvicorn.run(
-        app, host=os.environ.get("API_HOST", "localhost"), port=int(os.environ.get("API_PORT", 8000)), log_config=None
-    )
 
+async def migrate_database():
+    """Migrates the configured database once, before the workers connect to it."""
+    database = config.get_database()
+    await database.connect()
+    try:
+        version = await migrations.migrate(database)
+        logger.info(f"Database migrated to schema version {version}.")
+    finally:
+        await database.disconnect()
 
-@click.command()
-def main():
-    """Console script for event_handler"""
+
+def start_server():
+    settings = config.get_general_settings()
+    options = dict(
+        host=os.environ.get("API_HOST", "localhost"),
+        port=int(os.environ.get("API_PORT", 8000)),
+        log_config=None,
+        loop=settings.loop,
+        http=settings.http,
+        backlog=settings.backlog,
+        timeout_keep_alive=settings.keep_alive_timeout_in_s,
+    )
+    if settings.workers == 1:
+        uvicorn.run(create_app(), **options)
+        return
+
+    if not settings.use_postgres and config.get_sqlite_settings().db_path == ":memory:":
+        logger.warning("Every worker uses its own in-memory SQLite database, set SQLITE_PATH to share one.")
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        logger.warning("Metrics are reported per worker, set PROMETHEUS_MULTIPROC_DIR to aggregate them.")
+    if config.get_cache_settings().use_cache:
+        # A write only invalidates the cache of the worker handling it, the others would keep serving the old
+        # row and answer If-None-Match with its version. Workers only inherit the environment, so it is set there.
+        logger.warning("The cache is disabled, as workers cannot invalidate the caches of each other.")
+        os.environ["USE_CACHE"] = "false"
+        config.get_cache_settings().use_cache = False
+    # Workers migrating concurrently would apply the same migration twice
+    asyncio.run(migrate_database())
+    logger.info(f"Starting {settings.workers} workers.")
+    uvicorn.run("event_handler.cli:create_worker_app", factory=True, workers=settings.workers, **options)
+
+
+@click.group(invoke_without_command=True)
+@click.pass_context
+def main(ctx: click.Context):
+    """Console script for event_handler. Starts the server if no command is given."""
+    settings = config.get_general_settings()
+    configure_logging(settings.log_level, settings.log_sampling_rates)
     print_environment()
     set_environment()
-    start_server()
+    if ctx.invoked_subcommand is None:
+        start_server()
     return 0
 
 
+async def import_files(files: list[tuple[str, Path]], batch_size: int):
+    """Imports the files in order into the configured database."""
+    database = config.get_database()
+    await database.connect()
+    try:
+        await migrations.migrate(database)
+        for kind, path in files:
+
+            def report(progress: ImportProgress):
+                click.echo(f"{path.name}: {progress.rows} rows, {progress.rows_per_s:.0f} rows/s", err=True)
+
+            progress = await import_file(database, kind, path, batch_size=batch_size, on_progress=report)
+            logger.info(f"Imported {progress.rows} rows of {kind} from {path} in {progress.elapsed_in_s:.1f}s.")
+    finally:
+        await database.disconnect()
+
+
+@main.command(name="import")
+@click.option("--users", type=click.Path(exists=True, dir_okay=False, path_type=Path), help="CSV or NDJSON of users.")
+@click.option("--events", type=click.Path(exists=True, dir_okay=False, path_type=Path), help="CSV or NDJSON of events.")
+@click.option(
+    "--attendance",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="CSV or NDJSON of event_id and user_id pairs.",
+)
+@click.option(
+    "--batch-size", type=click.IntRange(min=1), default=10000, show_default=True, help="Rows per transaction."
+)
+def import_command(users: Path | None, events: Path | None, attendance: Path | None, batch_size: int):
+    """Imports users, events and attendance from CSV or NDJSON files.
+
+    Rows keep the ids given in the files and existing rows are skipped, so an interrupted import is
+    resumed by running the same command again.
+    """
+    files = [(kind, path) for kind, path in [("users", users), ("events", events), ("attendance", attendance)] if path]
+    try:
+        asyncio.run(import_files(files, batch_size=batch_size))
+    except InvalidRowError as error:
+        raise click.ClickException(f"{error}\nThe rows before it were imported, rerun the command to resume.")
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+import aiosqlite
+
+Operation = Callable[[aiosqlite.Connection], Awaitable[Any]]
+
+
+class GroupCommit:
+    """A class that coalesces writes of concurrent callers into a single SQLite transaction.
+
+    Operations are queued and executed by a background task. A batch is committed once it holds
+    max_batch_size operations or max_delay_in_s after its first operation arrived, whichever comes
+    first. Every operation runs in its own savepoint, so a failing operation is rolled back and
+    reported to its caller without affecting the others in the batch.
+
+    An operation whose caller is cancelled, e.g. after a timeout, before or while it runs is rolled back
+    to its savepoint. A caller cancelled while the batch is being committed is not, so its write may be
+    committed although the caller saw it fail.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, max_delay_in_s: float, max_batch_size: int):
+        """Initialize the group commit for the given writer connection."""
+        self._conn = conn
+        self._max_delay_in_s = max_delay_in_s
+        self._max_batch_size = max_batch_size
+        self._queue: asyncio.Queue[tuple[Operation, asyncio.Future]] = asyncio.Queue()
+        self._task: asyncio.Task = None
+
+    def start(self):
+        """Start the background task committing the batches."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Commit the queued operations and stop the background task."""
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def submit(self, operation: Operation) -> Any:
+        """Queue an operation and wait until the batch containing it is committed.
+
+        Args:
+            operation (Operation): The statements to execute on the writer connection.
+
+        Returns:
+            Any: The result of the operation.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    async def _run(self):
+        """Collect the queued operations into batches and commit them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_delay_in_s
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._commit(batch)
+            except Exception as error:  # skip: coverage
+                await self._conn.rollback()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit(self, batch: list[tuple[Operation, asyncio.Future]]):
+        """Execute a batch of operations in one transaction and resolve their futures."""
+        results = []
+        await self._conn.execute("BEGIN;")
+        for operation, future in batch:
+            if future.cancelled():  # the caller is gone, e.g. after a timeout
+                continue
+
+            await self._conn.execute("SAVEPOINT operation;")
+            try:
+                result = await operation(self._conn)
+            except Exception as error:
+                await self._conn.execute("ROLLBACK TO operation;")
+                await self._conn.execute("RELEASE operation;")
+                if not future.done():
+                    future.set_exception(error)
+            else:
+                if future.cancelled():  # the caller left while the operation ran
+                    await self._conn.execute("ROLLBACK TO operation;")
+                    await self._conn.execute("RELEASE operation;")
+                    continue
+
+                await self._conn.execute("RELEASE operation;")
+                results.append((future, result))
+
+        try:
+            await self._conn.commit()
+        except Exception as error:  # skip: coverage
+            await self._conn.rollback()
+            for future, _ in results:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
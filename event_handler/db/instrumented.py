@@ -0,0 +1,220 @@
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterator
+
+from prometheus_client import Histogram
+
+from event_handler import tracing
+from event_handler.db.interface import (
+    Database,
+    DatabaseEntry,
+    DatabaseEntryKey,
+    DatabaseRow,
+    Dependents,
+    Increment,
+    PoolStats,
+    Reference,
+)
+from event_handler.logger import logger
+
+DATABASE_LATENCY = Histogram(
+    "event_handler_database_duration_seconds",
+    "Latency of the calls to the database by method and table.",
+    ["method", "table"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class InstrumentedDatabase(Database):
+    """A class that wraps a database and measures every call.
+
+    Each call records its latency in a histogram and runs in a tracing span, which the backends annotate
+    with the shape of the executed SQL statement. Calls slower than the slow-query threshold are logged.
+    Connection management is passed through unmeasured. Iterations are measured per fetched chunk,
+    excluding the time the caller spends between chunks.
+    """
+
+    def __init__(self, db: Database, slow_query_threshold_in_s: float | None = None):
+        """Initialize the wrapper around the given database, logging calls slower than the threshold if given."""
+        self._db = db
+        self._slow_query_threshold_in_s = slow_query_threshold_in_s
+
+    @contextmanager
+    def _measure(self, method: str, table_name: str) -> Iterator[None]:
+        """Measure a call to the database in a histogram and a span and log it if it is slow."""
+        with tracing.start_span(
+            f"Database.{method}", **{"db.operation": method, "db.sql.table": table_name}
+        ) as current:
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                duration_in_s = time.perf_counter() - start
+                DATABASE_LATENCY.labels(method, table_name).observe(duration_in_s)
+                if self._slow_query_threshold_in_s is not None and duration_in_s >= self._slow_query_threshold_in_s:
+                    statement = current.attributes.get("db.statement")
+                    duration_in_ms = round(duration_in_s * 1000, 1)
+                    logger.warning(
+                        "Slow query: %s on %s took %.1fms, statement: %s",
+                        method,
+                        table_name,
+                        duration_in_ms,
+                        statement,
+                        extra={"db_method": method, "db_table": table_name, "duration_in_ms": duration_in_ms},
+                    )
+
+    async def connect(self):
+        await self._db.connect()
+
+    def is_connected(self) -> bool:
+        return self._db.is_connected()
+
+    async def disconnect(self):
+        await self._db.disconnect()
+
+    def pool_stats(self) -> PoolStats | None:
+        return self._db.pool_stats()
+
+    async def create_table_if_not_exists(self, table_name: str, schema: str):
+        with self._measure("create_table_if_not_exists", table_name):
+            await self._db.create_table_if_not_exists(table_name, schema)
+
+    async def create_index_if_not_exists(self, table_name: str, index_name: str, columns: list[str]):
+        with self._measure("create_index_if_not_exists", table_name):
+            await self._db.create_index_if_not_exists(table_name, index_name, columns)
+
+    async def create_search_index_if_not_exists(self, table_name: str, key: str, columns: list[str]):
+        with self._measure("create_search_index_if_not_exists", table_name):
+            await self._db.create_search_index_if_not_exists(table_name, key, columns)
+
+    async def get_column_names(self, table_name: str) -> list[str]:
+        with self._measure("get_column_names", table_name):
+            return await self._db.get_column_names(table_name)
+
+    async def add_column(self, table_name: str, column: str, definition: str):
+        with self._measure("add_column", table_name):
+            await self._db.add_column(table_name, column, definition)
+
+    async def rename_column(self, table_name: str, column: str, new_name: str):
+        with self._measure("rename_column", table_name):
+            await self._db.rename_column(table_name, column, new_name)
+
+    async def drop_column(self, table_name: str, column: str):
+        with self._measure("drop_column", table_name):
+            await self._db.drop_column(table_name, column)
+
+    async def insert_data(
+        self, table_name: str, data: DatabaseEntry, key: str | None = "id"
+    ) -> DatabaseEntryKey | None:
+        with self._measure("insert_data", table_name):
+            return await self._db.insert_data(table_name, data, key=key)
+
+    async def insert_many(
+        self,
+        table_name: str,
+        data: list[DatabaseEntry],
+        ignore_duplicates: bool = False,
+        increment: Increment | None = None,
+    ) -> list[DatabaseEntryKey]:
+        with self._measure("insert_many", table_name):
+            return await self._db.insert_many(
+                table_name, data, ignore_duplicates=ignore_duplicates, increment=increment
+            )
+
+    async def bulk_insert(
+        self, table_name: str, data: list[DatabaseEntry], key: str | None = "id", dependents: Dependents | None = None
+    ) -> list[DatabaseEntryKey]:
+        with self._measure("bulk_insert", table_name):
+            return await self._db.bulk_insert(table_name, data, key=key, dependents=dependents)
+
+    async def advance_key_sequence(self, table_name: str, key: str = "id"):
+        with self._measure("advance_key_sequence", table_name):
+            await self._db.advance_key_sequence(table_name, key=key)
+
+    async def replace_data(self, table_name: str, data: DatabaseEntry):
+        with self._measure("replace_data", table_name):
+            await self._db.replace_data(table_name, data)
+
+    async def update_data(
+        self,
+        table_name: str,
+        key: str,
+        value: Any,
+        data: DatabaseEntry,
+        version_key: str | None = None,
+        version: int | None = None,
+    ) -> bool:
+        with self._measure("update_data", table_name):
+            return await self._db.update_data(table_name, key, value, data, version_key=version_key, version=version)
+
+    async def increment_by_keys(self, table_name: str, key: str, values: list[Any], column: str, chunk_size: int = 500):
+        with self._measure("increment_by_keys", table_name):
+            await self._db.increment_by_keys(table_name, key, values, column, chunk_size=chunk_size)
+
+    async def delete_data_by_key_and_value(
+        self, table_name: str, key: str, value: Any, referencing: Reference | None = None
+    ):
+        with self._measure("delete_data_by_key_and_value", table_name):
+            await self._db.delete_data_by_key_and_value(table_name, key, value, referencing=referencing)
+
+    async def select_all_data(self, table_name: str) -> list[DatabaseRow]:
+        with self._measure("select_all_data", table_name):
+            return await self._db.select_all_data(table_name)
+
+    async def iterate_data(self, table_name: str, chunk_size: int = 1000) -> AsyncIterator[list[DatabaseRow]]:
+        chunks = self._db.iterate_data(table_name, chunk_size=chunk_size)
+        try:
+            while True:
+                with self._measure("iterate_data", table_name):
+                    try:
+                        chunk = await anext(chunks)
+                    except StopAsyncIteration:
+                        return
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def select_all_data_by_key_and_value(self, table_name: str, key: str, value: Any) -> list[DatabaseRow]:
+        with self._measure("select_all_data_by_key_and_value", table_name):
+            return await self._db.select_all_data_by_key_and_value(table_name, key, value)
+
+    async def select_by_keys(
+        self, table_name: str, key: str, values: list[Any], chunk_size: int = 500
+    ) -> list[DatabaseRow]:
+        with self._measure("select_by_keys", table_name):
+            return await self._db.select_by_keys(table_name, key, values, chunk_size=chunk_size)
+
+    async def select_page_by_key_and_value(
+        self, table_name: str, key: str, value: Any, order_key: str, after: Any | None = None, limit: int = 100
+    ) -> list[DatabaseRow]:
+        with self._measure("select_page_by_key_and_value", table_name):
+            return await self._db.select_page_by_key_and_value(
+                table_name, key, value, order_key, after=after, limit=limit
+            )
+
+    async def select_page_by_range(
+        self,
+        table_name: str,
+        key: str,
+        lower: Any,
+        upper: Any,
+        tiebreak_key: str,
+        after: tuple[Any, Any] | None = None,
+        limit: int = 100,
+    ) -> list[DatabaseRow]:
+        with self._measure("select_page_by_range", table_name):
+            return await self._db.select_page_by_range(
+                table_name, key, lower, upper, tiebreak_key, after=after, limit=limit
+            )
+
+    async def select_page_by_search(
+        self,
+        table_name: str,
+        key: str,
+        columns: list[str],
+        text: str,
+        after: tuple[float, Any] | None = None,
+        limit: int = 100,
+    ) -> list[DatabaseRow]:
+        with self._measure("select_page_by_search", table_name):
+            return await self._db.select_page_by_search(table_name, key, columns, text, after=after, limit=limit)
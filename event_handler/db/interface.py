@@ -1,8 +1,54 @@
 from abc import ABCMeta, abstractmethod
-from typing import Any
+from typing import Any, AsyncIterator, NamedTuple
+
+from pydantic import BaseModel
 
 DatabaseEntry = dict[str, Any]
 DatabaseEntryKey = int
+DatabaseRow = tuple[Any, ...]
+"""A row read from a table, a named tuple whose columns can be read by position or by name, e.g. row.id."""
+
+
+class Dependents(NamedTuple):
+    """The rows of another table that reference the rows inserted by Database.bulk_insert by their key."""
+
+    table_name: str
+    foreign_key: str
+    """The column of the dependent rows that is set to the key of the row they belong to."""
+    data: list[list[DatabaseEntry]]
+    """The dependent rows of each inserted row in the order of the inserted rows, all with the same columns."""
+
+
+class Increment(NamedTuple):
+    """The rows whose integer column is incremented in the transaction of Database.insert_many."""
+
+    table_name: str
+    key: str
+    values: list[Any]
+    """The values of the key of the rows to increment."""
+    column: str
+
+
+class Reference(NamedTuple):
+    """The rows of another table that reference the rows deleted by Database.delete_data_by_key_and_value."""
+
+    table_name: str
+    foreign_key: str
+    """The column of the referencing rows that holds the value of the deleted rows' key."""
+
+
+class PoolStats(BaseModel):
+    """The state and counters of a connection pool used to size it."""
+
+    min_size: int
+    max_size: int
+    size: int
+    in_use: int
+    waiting: int
+    requests: int
+    queued_requests: int
+    failed_requests: int
+    average_wait_in_ms: float
 
 
 class Database(metaclass=ABCMeta):  # skip: coverage
@@ -23,6 +69,14 @@ class Database(metaclass=ABCMeta):  # skip: coverage
         """Disconnects from the database."""
         ...
 
+    def pool_stats(self) -> PoolStats | None:
+        """Returns the state and counters of the connection pool.
+
+        Returns:
+            PoolStats | None: The pool stats, or None if the database does not use a connection pool.
+        """
+        return None
+
     @abstractmethod
     async def create_table_if_not_exists(self, table_name: str, schema: str):
         """Creates a table in the database if it does not exist.
@@ -34,15 +88,150 @@ class Database(metaclass=ABCMeta):  # skip: coverage
         ...
 
     @abstractmethod
-    async def insert_data(self, table_name: str, data: DatabaseEntry) -> DatabaseEntryKey:
+    async def create_index_if_not_exists(self, table_name: str, index_name: str, columns: list[str]):
+        """Creates an index on a table in the database if it does not exist.
+
+        Args:
+            table_name (str): The name of the table to index.
+            index_name (str): The name of the index to create.
+            columns (list[str]): The indexed columns in order.
+        """
+        ...
+
+    @abstractmethod
+    async def create_search_index_if_not_exists(self, table_name: str, key: str, columns: list[str]):
+        """Creates a full-text index over text columns of a table if it does not exist.
+
+        The database keeps the index in sync with the table, so rows written by any method are searchable.
+        Rows that exist when the index is created are indexed as well.
+
+        Args:
+            table_name (str): The name of the table to index.
+            key (str): The integer primary key of the table.
+            columns (list[str]): The text columns to index.
+        """
+        ...
+
+    @abstractmethod
+    async def get_column_names(self, table_name: str) -> list[str]:
+        """Returns the names of the columns of a table in the database.
+
+        Args:
+            table_name (str): The name of the table to inspect.
+
+        Returns:
+            list[str]: The column names in the order of the table definition.
+        """
+        ...
+
+    @abstractmethod
+    async def add_column(self, table_name: str, column: str, definition: str):
+        """Adds a column to a table in the database.
+
+        Args:
+            table_name (str): The name of the table to alter.
+            column (str): The name of the column to add.
+            definition (str): The type and constraints of the column, e.g. "integer NOT NULL DEFAULT 1".
+                Existing rows take the default of the column.
+        """
+        ...
+
+    @abstractmethod
+    async def rename_column(self, table_name: str, column: str, new_name: str):
+        """Renames a column of a table in the database.
+
+        Args:
+            table_name (str): The name of the table to alter.
+            column (str): The name of the column to rename.
+            new_name (str): The new name of the column.
+        """
+        ...
+
+    @abstractmethod
+    async def drop_column(self, table_name: str, column: str):
+        """Drops a column from a table in the database.
+
+        Args:
+            table_name (str): The name of the table to alter.
+            column (str): The name of the column to drop.
+        """
+        ...
+
+    @abstractmethod
+    async def insert_data(
+        self, table_name: str, data: DatabaseEntry, key: str | None = "id"
+    ) -> DatabaseEntryKey | None:
         """Inserts data into a table in the database.
 
         Args:
             table_name (str): The name of the table to insert data into.
             data (DatabaseEntry): The data to insert as a DatabaseEntry object.
+            key (str | None): The name of the generated key column, or None if the table has none.
+
+        Returns:
+            DatabaseEntryKey | None: The associated database key, or None if the table has no generated key.
+        """
+        ...
+
+    @abstractmethod
+    async def insert_many(
+        self,
+        table_name: str,
+        data: list[DatabaseEntry],
+        ignore_duplicates: bool = False,
+        increment: Increment | None = None,
+    ) -> list[DatabaseEntryKey]:
+        """Inserts multiple rows into a table in the database within a single transaction.
+
+        All entries must share the same set of keys. Either every row is inserted or, on error,
+        none of them are.
+
+        Args:
+            table_name (str): The name of the table to insert data into.
+            data (list[DatabaseEntry]): The rows to insert as DatabaseEntry objects.
+            ignore_duplicates (bool): Skip rows violating a unique constraint instead of failing.
+                No keys are returned in this mode.
+            increment (Increment | None): The rows whose column is incremented in the same transaction,
+                e.g. the versions of the rows the inserted rows belong to, or None.
+
+        Returns:
+            list[DatabaseEntryKey]: The associated database keys in the order of the given rows.
+        """
+        ...
+
+    @abstractmethod
+    async def bulk_insert(
+        self, table_name: str, data: list[DatabaseEntry], key: str | None = "id", dependents: Dependents | None = None
+    ) -> list[DatabaseEntryKey]:
+        """Loads multiple rows of data into a table in one transaction using the fastest path of the backend.
+
+        Unlike insert_many, duplicates cannot be ignored, so it is meant for rows with generated keys.
+        Rows of another table referencing the inserted rows are loaded in the same transaction, so either
+        all rows are inserted or, on error, none of them are.
+
+        Args:
+            table_name (str): The name of the table to insert data into.
+            data (list[DatabaseEntry]): The rows to insert, all with the same columns.
+            key (str | None): The name of the generated key column, or None if the table has none.
+            dependents (Dependents | None): The rows referencing the key of each inserted row, or None.
+                Requires a generated key.
 
         Returns:
-            Any: The associated database key
+            list[DatabaseEntryKey]: The keys of the inserted rows in the order of the data, or an empty
+                list if the table has no generated key.
+        """
+        ...
+
+    @abstractmethod
+    async def advance_key_sequence(self, table_name: str, key: str = "id"):
+        """Advances the sequence generating the keys of a table past its largest key.
+
+        Must be called after rows were inserted with explicit keys, so that later inserts without a key
+        do not reuse one of them.
+
+        Args:
+            table_name (str): The name of the table.
+            key (str): The name of the generated key column.
         """
         ...
 
@@ -57,18 +246,67 @@ class Database(metaclass=ABCMeta):  # skip: coverage
         ...
 
     @abstractmethod
-    async def delete_data_by_key_and_value(self, table_name: str, key: str, value: Any):
+    async def update_data(
+        self,
+        table_name: str,
+        key: str,
+        value: Any,
+        data: DatabaseEntry,
+        version_key: str | None = None,
+        version: int | None = None,
+    ) -> bool:
+        """Updates columns of the row matching a key and value in a single statement.
+
+        Only the given columns are written, so the other columns and the indexes not covering them are
+        left untouched.
+
+        Args:
+            table_name (str): The name of the table to update.
+            key (str): The key to filter the row by.
+            value (Any): The value to filter the row by.
+            data (DatabaseEntry): The columns to update and their new values. Must not be empty unless
+                a version key is given.
+            version_key (str | None): An integer column incremented by the update, or None.
+            version (int | None): The version the row is expected to have, or None to update it regardless.
+                A row updated by someone else in the meantime has another version and is left untouched.
+
+        Returns:
+            bool: True if the row was updated, False if no row matches the key or the version.
+        """
+        ...
+
+    @abstractmethod
+    async def increment_by_keys(self, table_name: str, key: str, values: list[Any], column: str, chunk_size: int = 500):
+        """Increments an integer column of the rows whose key matches one of the given values.
+
+        The column is incremented by the database in a single transaction, so concurrent increments are not lost.
+
+        Args:
+            table_name (str): The name of the table to update.
+            key (str): The key to filter the rows by.
+            values (list[Any]): The values to filter the rows by.
+            column (str): The integer column to increment by one.
+            chunk_size (int): The maximum number of values bound to a single statement.
+        """
+        ...
+
+    @abstractmethod
+    async def delete_data_by_key_and_value(
+        self, table_name: str, key: str, value: Any, referencing: Reference | None = None
+    ):
         """Deletes data from a table in the database by key and value.
 
         Args:
             table_name (str): The name of the table to select data from.
             key (str): The key to filter data by.
             value (Any): The value to filter data by.
+            referencing (Reference | None): The rows referencing the value that are deleted first in the
+                same transaction, so either all rows are deleted or, on error, none of them are, or None.
         """
         ...
 
     @abstractmethod
-    async def select_all_data(self, table_name: str) -> list[DatabaseEntry]:
+    async def select_all_data(self, table_name: str) -> list[DatabaseRow]:
         """Selects all data from a table in the database.
 
         Args:
@@ -77,12 +315,27 @@ class Database(metaclass=ABCMeta):  # skip: coverage
             value (Any): The value to filter data by.
 
         Returns:
-            list[DatabaseEntry]: A list of DatabaseEntry objects
+            list[DatabaseRow]: A list of rows
         """
         ...
 
     @abstractmethod
-    async def select_all_data_by_key_and_value(self, table_name: str, key: str, value: Any) -> DatabaseEntry:
+    def iterate_data(self, table_name: str, chunk_size: int = 1000) -> AsyncIterator[list[DatabaseRow]]:
+        """Iterates over all data of a table in the database in chunks of rows.
+
+        Only one chunk is held in memory at a time, so tables of any size can be streamed.
+
+        Args:
+            table_name (str): The name of the table to select data from.
+            chunk_size (int): The maximum number of rows per chunk.
+
+        Returns:
+            AsyncIterator[list[DatabaseRow]]: An async iterator over lists of rows.
+        """
+        ...
+
+    @abstractmethod
+    async def select_all_data_by_key_and_value(self, table_name: str, key: str, value: Any) -> list[DatabaseRow]:
         """Selects data from a table in the database by key and value.
 
         Args:
@@ -91,6 +344,106 @@ class Database(metaclass=ABCMeta):  # skip: coverage
             value (Any): The value to filter data by.
 
         Returns:
-            list[DatabaseEntry]: A list of DatabaseEntry objects that match the filter criteria.
+            list[DatabaseRow]: A list of rows that match the filter criteria.
+        """
+        ...
+
+    @abstractmethod
+    async def select_by_keys(
+        self, table_name: str, key: str, values: list[Any], chunk_size: int = 500
+    ) -> list[DatabaseRow]:
+        """Selects all data from a table in the database whose key matches one of the given values.
+
+        One query is issued per chunk of values instead of one query per value.
+
+        Args:
+            table_name (str): The name of the table to select data from.
+            key (str): The key to filter data by.
+            values (list[Any]): The values to filter data by.
+            chunk_size (int): The maximum number of values bound to a single query.
+
+        Returns:
+            list[DatabaseRow]: A list of rows that match one of the values.
+        """
+        ...
+
+    @abstractmethod
+    async def select_page_by_key_and_value(
+        self, table_name: str, key: str, value: Any, order_key: str, after: Any | None = None, limit: int = 100
+    ) -> list[DatabaseRow]:
+        """Selects a page of data from a table in the database by key and value.
+
+        Rows are ordered by order_key and the page starts after the given order key value, so an
+        index on (key, order_key) serves the query without scanning skipped rows.
+
+        Args:
+            table_name (str): The name of the table to select data from.
+            key (str): The key to filter data by.
+            value (Any): The value to filter data by.
+            order_key (str): The key to order data by.
+            after (Any | None): The order key value of the last row of the previous page.
+            limit (int): The maximum number of rows to return.
+
+        Returns:
+            list[DatabaseRow]: A list of rows that match the filter criteria.
+        """
+        ...
+
+    @abstractmethod
+    async def select_page_by_range(
+        self,
+        table_name: str,
+        key: str,
+        lower: Any,
+        upper: Any,
+        tiebreak_key: str,
+        after: tuple[Any, Any] | None = None,
+        limit: int = 100,
+    ) -> list[DatabaseRow]:
+        """Selects a page of data from a table in the database whose key lies in the range [lower, upper).
+
+        Rows are ordered by (key, tiebreak_key) and the page starts after the given (key, tiebreak_key)
+        values, so an index on (key, tiebreak_key) serves the query without scanning skipped rows.
+
+        Args:
+            table_name (str): The name of the table to select data from.
+            key (str): The key to filter and order data by.
+            lower (Any): The inclusive lower bound of the key.
+            upper (Any): The exclusive upper bound of the key.
+            tiebreak_key (str): The unique key to order rows with equal keys by.
+            after (tuple[Any, Any] | None): The (key, tiebreak_key) values of the last row of the previous page.
+            limit (int): The maximum number of rows to return.
+
+        Returns:
+            list[DatabaseRow]: A list of rows within the range.
+        """
+        ...
+
+    @abstractmethod
+    async def select_page_by_search(
+        self,
+        table_name: str,
+        key: str,
+        columns: list[str],
+        text: str,
+        after: tuple[float, Any] | None = None,
+        limit: int = 100,
+    ) -> list[DatabaseRow]:
+        """Selects a page of data from a table whose full-text index matches all words of a text.
+
+        Words are matched by their stem, e.g. "dancing" matches "dance". Rows are ordered by their rank,
+        the best match first, and by key, and the page starts after the given (rank, key) values. The
+        rank of a row is only comparable within the same search.
+
+        Args:
+            table_name (str): The name of the table to select data from.
+            key (str): The integer primary key of the table.
+            columns (list[str]): The indexed text columns, as passed to create_search_index_if_not_exists.
+            text (str): The words to search for.
+            after (tuple[float, Any] | None): The (rank, key) values of the last row of the previous page.
+            limit (int): The maximum number of rows to return.
+
+        Returns:
+            list[DatabaseRow]: A list of rows with an additional rank column, where lower is better.
         """
         ...
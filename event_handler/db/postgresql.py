@@ -1,22 +1,69 @@
-from typing import Any
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 
+import psycopg
 import psycopg_pool
+from psycopg.rows import namedtuple_row
 
-from event_handler.db.interface import Database, DatabaseEntry, DatabaseEntryKey
+from event_handler import tracing
+from event_handler.db.interface import (
+    Database,
+    DatabaseEntry,
+    DatabaseEntryKey,
+    DatabaseRow,
+    Dependents,
+    Increment,
+    PoolStats,
+    Reference,
+)
+from event_handler.db.query_builder import PostgresQueryBuilder
 
 
 class Postgresql(Database):  # skip: coverage
     """A class that represents a PostgreSQL database connection."""
 
-    def __init__(self, host: str, port: int, db_name: str, user_name: str, password: str):
-        """Initialize the connection pool with the given parameters."""
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        db_name: str,
+        user_name: str,
+        password: str,
+        min_pool_size: int = 4,
+        max_pool_size: int | None = None,
+        max_waiting: int = 0,
+        max_idle_in_s: float = 600,
+        max_lifetime_in_s: float = 3600,
+        acquire_timeout_in_s: float = 30,
+    ):
+        """Initialize the connection pool with the given connection and sizing parameters.
+
+        Rows are returned as named tuples, so their columns can be read by name.
+
+        The pool holds between min_pool_size and max_pool_size connections, the latter defaulting to the
+        former. At most max_waiting requests queue for a connection, 0 meaning unlimited, and each waits
+        at most acquire_timeout_in_s. Connections are closed after being idle for max_idle_in_s and
+        replaced after max_lifetime_in_s.
+        """
         conninfo = f"host={host} port={port} dbname={db_name} user={user_name} password={password}"
-        self._pool = psycopg_pool.AsyncConnectionPool(conninfo=conninfo, open=False)
+        self._pool = psycopg_pool.AsyncConnectionPool(
+            conninfo=conninfo,
+            kwargs={"row_factory": namedtuple_row},
+            open=False,
+            min_size=min_pool_size,
+            max_size=max_pool_size,
+            max_waiting=max_waiting,
+            max_idle=max_idle_in_s,
+            max_lifetime=max_lifetime_in_s,
+            timeout=acquire_timeout_in_s,
+        )
+        self._queries = PostgresQueryBuilder()
+        self._column_types: dict[tuple[str, tuple[str, ...]], list[int]] = {}
         self._is_connected = False
 
     async def connect(self):
-        """Open the connection pool and return self."""
-        await self._pool.open()
+        """Open the connection pool and wait until its minimum number of connections is established."""
+        await self._pool.open(wait=True)
         self._is_connected = True
 
     def is_connected(self) -> bool:
@@ -27,52 +74,352 @@ class Postgresql(Database):  # skip: coverage
         await self._pool.close()
         self._is_connected = False
 
+    @asynccontextmanager
+    async def _connection(self, timeout: float | None = None) -> AsyncIterator[psycopg.AsyncConnection]:
+        """Borrow a connection from the pool for one transaction, tracing the time spent waiting for it.
+
+        The transaction is committed when the block exits without an error and rolled back otherwise.
+        """
+        with tracing.start_span("Postgresql.acquire_connection"):
+            conn = await self._pool.getconn(timeout=timeout)
+        try:
+            async with conn:
+                yield conn
+        finally:
+            await self._pool.putconn(conn)
+
+    def pool_stats(self) -> PoolStats:
+        """Return the state of the pool and its counters since the pool was opened."""
+        stats = self._pool.get_stats()
+        queued_requests = stats.get("requests_queued", 0)
+        return PoolStats(
+            min_size=stats["pool_min"],
+            max_size=stats["pool_max"],
+            size=stats["pool_size"],
+            in_use=stats["pool_size"] - stats["pool_available"],
+            waiting=stats["requests_waiting"],
+            requests=stats.get("requests_num", 0),
+            queued_requests=queued_requests,
+            failed_requests=stats.get("requests_errors", 0),
+            average_wait_in_ms=stats.get("requests_wait_ms", 0) / queued_requests if queued_requests else 0.0,
+        )
+
     async def create_table_if_not_exists(self, table_name: str, schema: str):
         """Create a table with the given name and schema if it does not exist."""
-        query = f"CREATE TABLE IF NOT EXISTS {table_name} ({schema});"
+        query = self._queries.create_table(table_name, schema)
+
+        async with self._connection(timeout=5) as conn:
+            await conn.execute(query)
+
+    async def create_index_if_not_exists(self, table_name: str, index_name: str, columns: list[str]):
+        """Create an index with the given name on the columns of the table if it does not exist."""
+        query = self._queries.create_index(table_name, index_name, tuple(columns))
+
+        async with self._connection() as conn:
+            await conn.execute(query)
+
+    async def create_search_index_if_not_exists(self, table_name: str, key: str, columns: list[str]):
+        """Create a GIN index on the text search vector of the columns if it does not exist."""
+        query = self._queries.create_search_index(table_name, key, tuple(columns))
+
+        async with self._connection() as conn:
+            await conn.execute(query)
+
+    async def get_column_names(self, table_name: str) -> list[str]:
+        """Return the names of the columns of the table."""
+        query = self._queries.column_names()
+
+        async with self._connection() as conn:
+            cursor = await conn.execute(query, (table_name,))
+            return [column[0] for column in await cursor.fetchall()]
+
+    async def add_column(self, table_name: str, column: str, definition: str):
+        """Add a column with the given definition to the table."""
+        query = self._queries.add_column(table_name, column, definition)
 
-        async with self._pool.connection(timeout=5) as conn:
+        async with self._connection() as conn:
             await conn.execute(query)
 
-    async def insert_data(self, table_name: str, data: DatabaseEntry) -> DatabaseEntryKey:
+    async def rename_column(self, table_name: str, column: str, new_name: str):
+        """Rename a column of the table."""
+        query = self._queries.rename_column(table_name, column, new_name)
+
+        async with self._connection() as conn:
+            await conn.execute(query)
+
+    async def drop_column(self, table_name: str, column: str):
+        """Drop a column from the table."""
+        query = self._queries.drop_column(table_name, column)
+
+        async with self._connection() as conn:
+            await conn.execute(query)
+
+    async def insert_data(
+        self, table_name: str, data: DatabaseEntry, key: str | None = "id"
+    ) -> DatabaseEntryKey | None:
         """Insert a row of data into the table and return the primary key."""
-        placeholders = ", ".join(["?" for _ in data.keys()])
-        columns = ", ".join(data.keys())
+        query = self._queries.insert(table_name, tuple(data.keys()), returning=key)
         values = tuple(data.values())
-        query = f"INSERT INTO {table_name} ({columns}) VALUES({placeholders}) RETURNING id;"
 
-        async with self._pool.connection() as conn:
-            return await conn.execute(query, values)
+        async with self._connection() as conn:
+            cursor = await conn.execute(query, values)
+            return await cursor.fetchone() if key is not None else None
+
+    async def insert_many(
+        self,
+        table_name: str,
+        data: list[DatabaseEntry],
+        ignore_duplicates: bool = False,
+        increment: Increment | None = None,
+    ) -> list[DatabaseEntryKey]:
+        """Insert multiple rows of data into the table in one transaction and return their primary keys."""
+        if len(data) == 0 and increment is None:
+            return []
+
+        # The pool commits the transaction when the connection is returned
+        keys = []
+        async with self._connection() as conn:
+            if data:
+                keys = await self._insert_rows(conn, table_name, data, ignore_duplicates)
+            if increment is not None:
+                await self._increment_rows(conn, *increment)
+        return keys
+
+    async def _insert_rows(
+        self, conn: psycopg.AsyncConnection, table_name: str, data: list[DatabaseEntry], ignore_duplicates: bool
+    ) -> list[DatabaseEntryKey]:
+        """Insert rows with the same columns on the connection and return their primary keys."""
+        values = [tuple(entry.values()) for entry in data]
+        columns = tuple(data[0].keys())
+
+        keys = []
+        async with conn.cursor() as cursor:
+            if ignore_duplicates:
+                await cursor.executemany(self._queries.insert(table_name, columns, ignore_duplicates=True), values)
+                return keys
+
+            await cursor.executemany(self._queries.insert(table_name, columns, returning="id"), values, returning=True)
+            while True:
+                row = await cursor.fetchone()
+                keys.append(row[0])
+                if not cursor.nextset():
+                    break
+        return keys
+
+    async def bulk_insert(
+        self, table_name: str, data: list[DatabaseEntry], key: str | None = "id", dependents: Dependents | None = None
+    ) -> list[DatabaseEntryKey]:
+        """Load rows of data and their dependent rows with a binary COPY per table and return their primary keys.
+
+        COPY cannot return the generated keys, so they are allocated from the sequence of the key column
+        first and copied together with the rows and, as foreign key, with the dependent rows.
+        """
+        if len(data) == 0:
+            return []
+
+        columns = tuple(data[0].keys())
+        values = [tuple(entry.values()) for entry in data]
+
+        # The pool commits the transaction when the connection is returned
+        keys = []
+        async with self._connection() as conn:
+            if key is not None:
+                cursor = await conn.execute(self._queries.allocate_keys(table_name, key), (len(data),))
+                keys = [row[0] for row in await cursor.fetchall()]
+                columns = (key,) + columns
+                values = [(k,) + entry for k, entry in zip(keys, values)]
 
-    async def replace_data(self, table_name: str, data: DatabaseEntry) -> DatabaseEntryKey:
-        """Replace a row of data into the table and return the primary key."""
-        placeholders = ", ".join(["?" for _ in data.keys()])
-        columns = ", ".join(data.keys())
+            await self._copy(conn, table_name, columns, values)
+
+            if dependents is not None:
+                rows = [
+                    {dependents.foreign_key: id, **row}
+                    for id, dependent_rows in zip(keys, dependents.data)
+                    for row in dependent_rows
+                ]
+                if rows:
+                    await self._copy(
+                        conn, dependents.table_name, tuple(rows[0].keys()), [tuple(row.values()) for row in rows]
+                    )
+        return keys
+
+    async def _copy(
+        self, conn: psycopg.AsyncConnection, table_name: str, columns: tuple[str, ...], values: list[tuple]
+    ):
+        """Copy rows of values of the columns into the table on the connection with a binary COPY."""
+        types = await self._get_column_types(conn, table_name, columns)
+        async with conn.cursor() as cursor:
+            async with cursor.copy(self._queries.copy_from_stdin(table_name, columns)) as copy:
+                copy.set_types(types)
+                for entry in values:
+                    await copy.write_row(entry)
+
+    async def _get_column_types(
+        self, conn: psycopg.AsyncConnection, table_name: str, columns: tuple[str, ...]
+    ) -> list[int]:
+        """Return the type oids of the columns, which a binary COPY needs to encode the values."""
+        types = self._column_types.get((table_name, columns))
+        if types is None:
+            cursor = await conn.execute(self._queries.select_no_rows(table_name, columns))
+            types = self._column_types[(table_name, columns)] = [column.type_code for column in cursor.description]
+        return types
+
+    async def advance_key_sequence(self, table_name: str, key: str = "id"):
+        """Set the identity sequence of the key column to the largest key of the table."""
+        query = self._queries.advance_key_sequence(table_name, key)
+
+        async with self._connection() as conn:
+            await conn.execute(query)
+
+    async def replace_data(self, table_name: str, data: DatabaseEntry):
+        """Replace a row of data into the table."""
+        query = self._queries.replace(table_name, tuple(data.keys()))
         values = tuple(data.values())
-        query = f"REPLACE INTO {table_name} ({columns}) VALUES({placeholders});"
 
-        async with self._pool.connection() as conn:
-            return await conn.execute(query, values)
+        async with self._connection() as conn:
+            await conn.execute(query, values)
 
-    async def delete_data_by_key_and_value(self, table_name: str, key: str, value: Any):
-        query = f"DELETE FROM {table_name} WHERE {key}='{value}';"
+    async def update_data(
+        self,
+        table_name: str,
+        key: str,
+        value: Any,
+        data: DatabaseEntry,
+        version_key: str | None = None,
+        version: int | None = None,
+    ) -> bool:
+        """Update columns of the row of the table matching the key and value, and its version if it is given."""
+        query = self._queries.update(table_name, key, tuple(data.keys()), version_key, has_version=version is not None)
+        values = (*data.values(), value) if version is None else (*data.values(), value, version)
 
-        async with self._pool.connection() as conn:
-            cursor = await conn.execute(query)
-            return await cursor.fetchall()
+        async with self._connection() as conn:
+            cursor = await conn.execute(query, values)
+            return cursor.rowcount == 1
+
+    async def increment_by_keys(self, table_name: str, key: str, values: list[Any], column: str, chunk_size: int = 500):
+        """Increment a column of the rows of the table whose key matches one of the values in one transaction."""
+        if len(values) == 0:
+            return
+
+        async with self._connection() as conn:
+            await self._increment_rows(conn, table_name, key, values, column, chunk_size)
+
+    async def _increment_rows(
+        self,
+        conn: psycopg.AsyncConnection,
+        table_name: str,
+        key: str,
+        values: list[Any],
+        column: str,
+        chunk_size: int = 500,
+    ):
+        """Increment a column of the rows of the table whose key matches one of the values on the connection."""
+        query = self._queries.increment_in(table_name, key, column)
+
+        for start in range(0, len(values), chunk_size):
+            end = start + chunk_size
+            await conn.execute(query, (list(values[start:end]),))
+
+    async def delete_data_by_key_and_value(
+        self, table_name: str, key: str, value: Any, referencing: Reference | None = None
+    ):
+        """Delete the rows of data from the table that match the given key and value, and the rows referencing them."""
+        query = self._queries.delete_by(table_name, key)
+
+        async with self._connection() as conn:
+            if referencing is not None:
+                await conn.execute(self._queries.delete_by(referencing.table_name, referencing.foreign_key), (value,))
+            await conn.execute(query, (value,))
 
-    async def select_all_data(self, table_name: str) -> list[DatabaseEntry]:
+    async def select_all_data(self, table_name: str) -> list[DatabaseRow]:
         """Select all rows of data from the table and return a list of entries."""
-        query = f"SELECT FROM {table_name}'"
+        query = self._queries.select_all(table_name)
 
-        async with self._pool.connection() as conn:
+        async with self._connection() as conn:
             cursor = await conn.execute(query)
             return await cursor.fetchall()
 
-    async def select_all_data_by_key_and_value(self, table_name: str, key: str, value: Any) -> list[DatabaseEntry]:
+    async def iterate_data(self, table_name: str, chunk_size: int = 1000) -> AsyncIterator[list[DatabaseRow]]:
+        """Iterate over all rows of data from the table in chunks fetched from a server-side cursor."""
+        query = self._queries.select_all(table_name)
+
+        async with self._connection() as conn:
+            async with conn.cursor(name=f"iterate_{table_name}") as cursor:
+                cursor.itersize = chunk_size
+                await cursor.execute(query)
+                while rows := await cursor.fetchmany(chunk_size):
+                    yield rows
+
+    async def select_all_data_by_key_and_value(self, table_name: str, key: str, value: Any) -> list[DatabaseRow]:
         """Select all rows from the table that match the given key and value and return a list of entries."""
-        query = f"SELECT FROM {table_name} WHERE {key}='{value}';"
+        query = self._queries.select_by(table_name, key)
 
-        async with self._pool.connection() as conn:
-            cursor = await conn.execute(query)
+        async with self._connection() as conn:
+            cursor = await conn.execute(query, (value,))
+            return await cursor.fetchall()
+
+    async def select_by_keys(
+        self, table_name: str, key: str, values: list[Any], chunk_size: int = 500
+    ) -> list[DatabaseRow]:
+        """Select all rows from the table whose key matches one of the values and return a list of entries."""
+        query = self._queries.select_in(table_name, key)
+
+        data = []
+        async with self._connection() as conn:
+            for start in range(0, len(values), chunk_size):
+                end = start + chunk_size
+                cursor = await conn.execute(query, (list(values[start:end]),))
+                data.extend(await cursor.fetchall())
+        return data
+
+    async def select_page_by_key_and_value(
+        self, table_name: str, key: str, value: Any, order_key: str, after: Any | None = None, limit: int = 100
+    ) -> list[DatabaseRow]:
+        """Select a page of rows from the table that match the given key and value and return a list of entries."""
+        query = self._queries.select_page_by(table_name, key, order_key, has_after=after is not None)
+        parameters = (value, limit) if after is None else (value, after, limit)
+
+        async with self._connection() as conn:
+            cursor = await conn.execute(query, parameters)
+            return await cursor.fetchall()
+
+    async def select_page_by_range(
+        self,
+        table_name: str,
+        key: str,
+        lower: Any,
+        upper: Any,
+        tiebreak_key: str,
+        after: tuple[Any, Any] | None = None,
+        limit: int = 100,
+    ) -> list[DatabaseRow]:
+        """Select a page of rows from the table whose key lies in [lower, upper) and return a list of entries."""
+        query = self._queries.select_page_by_range(table_name, key, tiebreak_key, has_after=after is not None)
+        if after is None:
+            parameters = (lower, upper, limit)
+        else:
+            parameters = (max(lower, after[0]), upper, after[0], after[1], limit)
+
+        async with self._connection() as conn:
+            cursor = await conn.execute(query, parameters)
+            return await cursor.fetchall()
+
+    async def select_page_by_search(
+        self,
+        table_name: str,
+        key: str,
+        columns: list[str],
+        text: str,
+        after: tuple[float, Any] | None = None,
+        limit: int = 100,
+    ) -> list[DatabaseRow]:
+        """Select a page of rows from the table matching all words of the text ranked by ts_rank."""
+        if not text.strip():
+            return []
+
+        query = self._queries.select_page_by_search(table_name, key, tuple(columns), has_after=after is not None)
+        parameters = (text, limit) if after is None else (text, after[0], after[1], limit)
+
+        async with self._connection() as conn:
+            cursor = await conn.execute(query, parameters)
             return await cursor.fetchall()
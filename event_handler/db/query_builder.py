@@ -0,0 +1,382 @@
+import re
+from typing import Callable
+
+from event_handler import tracing
+
+Query = str
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class QueryBuilder:
+    """A class that builds parameterized SQL statements for a database backend.
+
+    Values are always bound as parameters using the placeholder style of the backend, never
+    interpolated into the statement. Table and column names cannot be bound, so they are validated
+    as plain identifiers instead. Statements are cached per (operation, table, column set), which
+    keeps their text stable for the statement cache of SQLite and the prepared statements of psycopg.
+    """
+
+    placeholder = "?"
+    """The placeholder for a bound parameter."""
+
+    def __init__(self):
+        """Initialize an empty statement cache."""
+        self._statements: dict[tuple, Query] = {}
+
+    def _cached(self, key: tuple, build: Callable[[], Query]) -> Query:
+        """Return the cached statement for the key, building it on first use.
+
+        The statement is recorded in the current tracing span. It never contains values, so it is safe to log.
+        """
+        statement = self._statements.get(key)
+        if statement is None:
+            for identifier in key[1:]:
+                self._validate(identifier)
+            statement = self._statements[key] = build()
+        tracing.set_attribute("db.statement", statement)
+        return statement
+
+    @staticmethod
+    def _validate(identifier: str | tuple[str, ...] | bool | int | None):
+        """Raise a ValueError if a table or column name is not a plain identifier."""
+        if isinstance(identifier, tuple):
+            for name in identifier:
+                QueryBuilder._validate(name)
+        elif isinstance(identifier, str) and not _IDENTIFIER.match(identifier):
+            raise ValueError(f"Invalid identifier: {identifier!r}")
+
+    def _placeholders(self, count: int) -> str:
+        """Return a comma-separated list of count placeholders."""
+        return ", ".join([self.placeholder] * count)
+
+    def create_table(self, table_name: str, schema: str) -> Query:
+        """Build a statement creating a table if it does not exist. The schema is trusted SQL."""
+        self._validate(table_name)
+        statement = f"CREATE TABLE IF NOT EXISTS {table_name} ({schema});"
+        tracing.set_attribute("db.statement", statement)
+        return statement
+
+    def create_index(self, table_name: str, index_name: str, columns: tuple[str, ...]) -> Query:
+        """Build a statement creating an index if it does not exist."""
+        return self._cached(
+            ("create_index", table_name, index_name, columns),
+            lambda: f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(columns)});",
+        )
+
+    def add_column(self, table_name: str, column: str, definition: str) -> Query:
+        """Build a statement adding a column to a table. The definition is trusted SQL."""
+        self._validate((table_name, column))
+        statement = f"ALTER TABLE {table_name} ADD COLUMN {column} {definition};"
+        tracing.set_attribute("db.statement", statement)
+        return statement
+
+    def rename_column(self, table_name: str, column: str, new_name: str) -> Query:
+        """Build a statement renaming a column of a table."""
+        return self._cached(
+            ("rename_column", table_name, column, new_name),
+            lambda: f"ALTER TABLE {table_name} RENAME COLUMN {column} TO {new_name};",
+        )
+
+    def drop_column(self, table_name: str, column: str) -> Query:
+        """Build a statement dropping a column from a table."""
+        return self._cached(
+            ("drop_column", table_name, column), lambda: f"ALTER TABLE {table_name} DROP COLUMN {column};"
+        )
+
+    def insert(
+        self, table_name: str, columns: tuple[str, ...], returning: str | None = None, ignore_duplicates: bool = False
+    ) -> Query:
+        """Build a statement inserting a row, optionally returning a column or skipping duplicates."""
+        return self._cached(
+            ("insert", table_name, columns, returning, ignore_duplicates),
+            lambda: self._build_insert(table_name, columns, returning, ignore_duplicates),
+        )
+
+    def _build_insert(
+        self, table_name: str, columns: tuple[str, ...], returning: str | None, ignore_duplicates: bool
+    ) -> Query:
+        verb = "INSERT OR IGNORE" if ignore_duplicates else "INSERT"
+        query = f"{verb} INTO {table_name} ({', '.join(columns)}) VALUES({self._placeholders(len(columns))})"
+        if returning is not None:
+            query += f" RETURNING {returning}"
+        return query + ";"
+
+    def replace(self, table_name: str, columns: tuple[str, ...], key: str = "id") -> Query:
+        """Build a statement inserting a row or replacing the row with the same key."""
+        return self._cached(
+            ("replace", table_name, columns, key),
+            lambda: f"REPLACE INTO {table_name} ({', '.join(columns)}) VALUES({self._placeholders(len(columns))});",
+        )
+
+    def increment_in(self, table_name: str, key: str, column: str, count: int) -> Query:
+        """Build a statement incrementing a column of the rows whose key matches one of count values."""
+        return self._cached(
+            ("increment_in", table_name, key, column, count),
+            lambda: f"UPDATE {table_name} SET {column} = {column} + 1 WHERE {key} IN ({self._placeholders(count)});",
+        )
+
+    def update(
+        self,
+        table_name: str,
+        key: str,
+        columns: tuple[str, ...],
+        version_key: str | None = None,
+        has_version: bool = False,
+    ) -> Query:
+        """Build a statement updating columns of the row matching a key, optionally incrementing and checking a version.
+
+        The parameters are the values of the columns, the key and, if has_version is set, the expected version.
+        """
+        return self._cached(
+            ("update", table_name, key, columns, version_key, has_version),
+            lambda: self._build_update(table_name, key, columns, version_key, has_version),
+        )
+
+    def _build_update(
+        self, table_name: str, key: str, columns: tuple[str, ...], version_key: str | None, has_version: bool
+    ) -> Query:
+        assignments = [f"{column} = {self.placeholder}" for column in columns]
+        if version_key is not None:
+            assignments.append(f"{version_key} = {version_key} + 1")
+        query = f"UPDATE {table_name} SET {', '.join(assignments)} WHERE {key} = {self.placeholder}"
+        if has_version:
+            query += f" AND {version_key} = {self.placeholder}"
+        return query + ";"
+
+    def delete_by(self, table_name: str, key: str) -> Query:
+        """Build a statement deleting the rows matching a key."""
+        return self._cached(
+            ("delete_by", table_name, key), lambda: f"DELETE FROM {table_name} WHERE {key} = {self.placeholder};"
+        )
+
+    def select_all(self, table_name: str) -> Query:
+        """Build a statement selecting all rows of a table."""
+        return self._cached(("select_all", table_name), lambda: f"SELECT * FROM {table_name};")
+
+    def select_by(self, table_name: str, key: str) -> Query:
+        """Build a statement selecting the rows matching a key."""
+        return self._cached(
+            ("select_by", table_name, key), lambda: f"SELECT * FROM {table_name} WHERE {key} = {self.placeholder};"
+        )
+
+    def select_in(self, table_name: str, key: str, count: int) -> Query:
+        """Build a statement selecting the rows whose key matches one of count values."""
+        return self._cached(
+            ("select_in", table_name, key, count),
+            lambda: f"SELECT * FROM {table_name} WHERE {key} IN ({self._placeholders(count)});",
+        )
+
+    def select_page_by(self, table_name: str, key: str, order_key: str, has_after: bool) -> Query:
+        """Build a statement selecting a page of the rows matching a key, ordered by order_key."""
+        return self._cached(
+            ("select_page_by", table_name, key, order_key, has_after),
+            lambda: (
+                f"SELECT * FROM {table_name} WHERE {key} = {self.placeholder}"
+                + (f" AND {order_key} > {self.placeholder}" if has_after else "")
+                + f" ORDER BY {order_key} LIMIT {self.placeholder};"
+            ),
+        )
+
+    def select_page_by_range(self, table_name: str, key: str, tiebreak_key: str, has_after: bool) -> Query:
+        """Build a statement selecting a page of the rows whose key lies in a range, ordered by (key, tiebreak_key).
+
+        The parameters are the lower and upper bound and, if has_after is set, the key and tiebreak key
+        of the last row of the previous page followed by the limit. The lower bound must not be smaller
+        than the key of the last row, so the range scan on the key starts at the previous page.
+        """
+        return self._cached(
+            ("select_page_by_range", table_name, key, tiebreak_key, has_after),
+            lambda: (
+                f"SELECT * FROM {table_name} WHERE {key} >= {self.placeholder} AND {key} < {self.placeholder}"
+                + (f" AND ({key} > {self.placeholder} OR {tiebreak_key} > {self.placeholder})" if has_after else "")
+                + f" ORDER BY {key}, {tiebreak_key} LIMIT {self.placeholder};"
+            ),
+        )
+
+
+class SqliteQueryBuilder(QueryBuilder):
+    """A class that builds parameterized SQL statements for SQLite."""
+
+    placeholder = "?"
+
+    def create_search_index(self, table_name: str, key: str, columns: tuple[str, ...]) -> tuple[Query, ...]:
+        """Build the statements creating an FTS5 index of the columns, the triggers keeping it in sync with
+        the table and filling it with the existing rows.
+
+        The index only references the rows of the table instead of storing a copy of the columns.
+        """
+        return self._cached(
+            ("create_search_index", table_name, key, columns),
+            lambda: self._build_create_search_index(table_name, key, columns),
+        )
+
+    @staticmethod
+    def _build_create_search_index(table_name: str, key: str, columns: tuple[str, ...]) -> tuple[Query, ...]:
+        index = f"{table_name}Search"
+        names = ", ".join(columns)
+        insert = f"INSERT INTO {index}(rowid, {names}) VALUES (new.{key}, {', '.join(f'new.{c}' for c in columns)});"
+        delete = (
+            f"INSERT INTO {index}({index}, rowid, {names}) "
+            f"VALUES ('delete', old.{key}, {', '.join(f'old.{c}' for c in columns)});"
+        )
+        return (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5({names}, content='{table_name}', "
+            f"content_rowid='{key}', tokenize='porter unicode61');",
+            f"CREATE TRIGGER IF NOT EXISTS {index}Insert AFTER INSERT ON {table_name} BEGIN {insert} END;",
+            f"CREATE TRIGGER IF NOT EXISTS {index}Delete AFTER DELETE ON {table_name} BEGIN {delete} END;",
+            # Updates of columns that are not indexed, e.g. versions, leave the index untouched
+            f"CREATE TRIGGER IF NOT EXISTS {index}Update AFTER UPDATE OF {key}, {names} ON {table_name} "
+            f"BEGIN {delete} {insert} END;",
+            f"INSERT INTO {index}({index}) VALUES ('rebuild');",
+        )
+
+    def select_page_by_search(self, table_name: str, key: str, has_after: bool) -> Query:
+        """Build a statement selecting a page of the rows matching an FTS5 query, ordered by (rank, key).
+
+        The parameters are the query and, if has_after is set, the rank and key of the last row of the
+        previous page followed by the limit. The rank is the BM25 score, where lower is better.
+        """
+        index = f"{table_name}Search"
+        return self._cached(
+            ("select_page_by_search", table_name, key, has_after),
+            lambda: (
+                f"SELECT * FROM (SELECT {table_name}.*, bm25({index}) AS rank FROM {index} "
+                f"JOIN {table_name} ON {table_name}.{key} = {index}.rowid WHERE {index} MATCH ?)"
+                + (f" WHERE (rank, {key}) > (?, ?)" if has_after else "")
+                + f" ORDER BY rank, {key} LIMIT ?;"
+            ),
+        )
+
+    def table_info(self, table_name: str) -> Query:
+        """Build a statement listing the columns of a table."""
+        return self._cached(("table_info", table_name), lambda: f"PRAGMA table_info({table_name});")
+
+
+class PostgresQueryBuilder(QueryBuilder):
+    """A class that builds parameterized SQL statements for PostgreSQL using psycopg placeholders."""
+
+    placeholder = "%s"
+
+    _AUTOINCREMENT = re.compile(r"integer\s+NOT\s+NULL\s+PRIMARY\s+KEY\s+AUTOINCREMENT", re.IGNORECASE)
+    _DATETIME = re.compile(r"\bDATETIME\b", re.IGNORECASE)
+
+    def create_table(self, table_name: str, schema: str) -> Query:
+        """Build a statement creating a table, translating the SQLite types used by the repositories."""
+        schema = self._AUTOINCREMENT.sub("integer GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY", schema)
+        schema = self._DATETIME.sub("TIMESTAMP", schema)
+        return super().create_table(table_name, schema)
+
+    def drop_column(self, table_name: str, column: str) -> Query:
+        return self._cached(
+            ("drop_column", table_name, column), lambda: f"ALTER TABLE {table_name} DROP COLUMN IF EXISTS {column};"
+        )
+
+    def _build_insert(
+        self, table_name: str, columns: tuple[str, ...], returning: str | None, ignore_duplicates: bool
+    ) -> Query:
+        query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES({self._placeholders(len(columns))})"
+        if ignore_duplicates:
+            query += " ON CONFLICT DO NOTHING"
+        if returning is not None:
+            query += f" RETURNING {returning}"
+        return query + ";"
+
+    def replace(self, table_name: str, columns: tuple[str, ...], key: str = "id") -> Query:
+        """Build an upsert statement, as PostgreSQL has no REPLACE INTO."""
+        return self._cached(
+            ("replace", table_name, columns, key),
+            lambda: (
+                f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES({self._placeholders(len(columns))}) "
+                f"ON CONFLICT ({key}) DO UPDATE SET "
+                + ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column != key)
+                + ";"
+            ),
+        )
+
+    def increment_in(self, table_name: str, key: str, column: str, count: int = 1) -> Query:
+        """Build a statement incrementing a column of the rows whose key matches one of the values bound as an array."""
+        return self._cached(
+            ("increment_in", table_name, key, column),
+            lambda: f"UPDATE {table_name} SET {column} = {column} + 1 WHERE {key} = ANY({self.placeholder});",
+        )
+
+    def select_in(self, table_name: str, key: str, count: int = 1) -> Query:
+        """Build a statement selecting the rows whose key matches one of the values bound as one array."""
+        return self._cached(
+            ("select_in", table_name, key),
+            lambda: f"SELECT * FROM {table_name} WHERE {key} = ANY({self.placeholder});",
+        )
+
+    def allocate_keys(self, table_name: str, key: str) -> Query:
+        """Build a statement drawing as many keys from the sequence of a generated key column as bound."""
+        return self._cached(
+            ("allocate_keys", table_name, key),
+            lambda: f"SELECT nextval(pg_get_serial_sequence('{table_name}', '{key}')) FROM generate_series(1, %s);",
+        )
+
+    def copy_from_stdin(self, table_name: str, columns: tuple[str, ...]) -> Query:
+        """Build a statement copying rows in binary format into the columns of a table."""
+        return self._cached(
+            ("copy_from_stdin", table_name, columns),
+            lambda: f"COPY {table_name} ({', '.join(columns)}) FROM STDIN (FORMAT BINARY);",
+        )
+
+    def select_no_rows(self, table_name: str, columns: tuple[str, ...]) -> Query:
+        """Build a statement selecting no rows, which describes the types of the columns."""
+        return self._cached(
+            ("select_no_rows", table_name, columns),
+            lambda: f"SELECT {', '.join(columns)} FROM {table_name} LIMIT 0;",
+        )
+
+    def advance_key_sequence(self, table_name: str, key: str) -> Query:
+        """Build a statement setting the sequence of a generated key column to the largest key of the table."""
+        return self._cached(
+            ("advance_key_sequence", table_name, key),
+            lambda: (
+                f"SELECT setval(pg_get_serial_sequence('{table_name}', '{key}'), max({key})) FROM {table_name} "
+                f"HAVING max({key}) IS NOT NULL;"
+            ),
+        )
+
+    @staticmethod
+    def _document(columns: tuple[str, ...]) -> str:
+        """Return the expression of the text search vector of the columns, which the index is built on."""
+        text = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+        return f"to_tsvector('english', {text})"
+
+    def create_search_index(self, table_name: str, key: str, columns: tuple[str, ...]) -> Query:
+        """Build a statement creating a GIN index on the text search vector of the columns.
+
+        The index is on an expression of the columns, so PostgreSQL keeps it in sync with the table.
+        """
+        return self._cached(
+            ("create_search_index", table_name, key, columns),
+            lambda: (
+                f"CREATE INDEX IF NOT EXISTS {table_name}Search ON {table_name} USING GIN ({self._document(columns)});"
+            ),
+        )
+
+    def select_page_by_search(self, table_name: str, key: str, columns: tuple[str, ...], has_after: bool) -> Query:
+        """Build a statement selecting a page of the rows matching a text, ordered by (rank, key).
+
+        The parameters are the text and, if has_after is set, the rank and key of the last row of the
+        previous page followed by the limit. The rank is the negated ts_rank, so lower is better.
+        """
+        return self._cached(
+            ("select_page_by_search", table_name, key, columns, has_after),
+            lambda: (
+                f"SELECT * FROM (SELECT {table_name}.*, -ts_rank({self._document(columns)}, query) AS rank "
+                f"FROM {table_name}, plainto_tsquery('english', %s) AS query "
+                f"WHERE {self._document(columns)} @@ query) AS matches"
+                + (f" WHERE (rank, {key}) > (%s, %s)" if has_after else "")
+                + f" ORDER BY rank, {key} LIMIT %s;"
+            ),
+        )
+
+    def column_names(self) -> Query:
+        """Build a statement listing the columns of a table bound as parameter."""
+        return (
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = lower(%s) ORDER BY ordinal_position;"
+        )
@@ -1,86 +1,450 @@
-from typing import Any
+import asyncio
+from collections import namedtuple
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Iterable
 
 import aiosqlite
 
-from event_handler.db.interface import Database, DatabaseEntry, DatabaseEntryKey
+from event_handler import tracing
+from event_handler.db.group_commit import GroupCommit, Operation
+from event_handler.db.interface import (
+    Database,
+    DatabaseEntry,
+    DatabaseEntryKey,
+    DatabaseRow,
+    Dependents,
+    Increment,
+    Reference,
+)
+from event_handler.db.query_builder import SqliteQueryBuilder
+
+
+@lru_cache(maxsize=256)
+def _row_type(description: tuple) -> type[DatabaseRow]:
+    """Return a named tuple type with the columns of a result, invalid names being replaced by their position."""
+    return namedtuple("Row", [column[0] for column in description], rename=True)
+
+
+def _to_rows(cursor: aiosqlite.Cursor, rows: Iterable[tuple]) -> list[DatabaseRow]:
+    """Return fetched rows as named tuples, so their columns can be read by name.
+
+    The rows are converted after they were fetched, as a row factory would be called from SQLite
+    for every row and cost several times as much.
+    """
+    return list(map(partial(tuple.__new__, _row_type(cursor.description)), rows))
 
 
 class Sqlite(Database):
-    """A class that represents a SQLite database connection."""
+    """A class that represents a SQLite database connection.
+
+    By default a single connection serves all reads and writes. In WAL mode the database must be
+    file-backed; writes go through a dedicated writer connection while reads are spread over a pool
+    of read-only connections, so readers neither block nor are blocked by commits.
+
+    In group commit mode, writes of concurrent callers are coalesced into one transaction, so they
+    share a single fsync. It is best combined with WAL mode, as readers on the writer connection
+    would otherwise see the writes of a batch before it is committed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        use_wal: bool = False,
+        reader_count: int = 4,
+        use_group_commit: bool = False,
+        max_commit_delay_in_s: float = 0.002,
+        max_commit_batch_size: int = 100,
+    ):
+        """Initialize the connection object with the given path, WAL and group commit settings."""
+        if use_wal and (path == ":memory:" or "mode=memory" in path):
+            raise ValueError("WAL mode requires a file-backed database.")
 
-    def __init__(self, path: str):
-        """Initialize the connection object with the given path."""
         self._path = path
+        self._use_wal = use_wal
+        self._reader_count = reader_count
+        self._use_group_commit = use_group_commit
+        self._max_commit_delay_in_s = max_commit_delay_in_s
+        self._max_commit_batch_size = max_commit_batch_size
         self._conn: aiosqlite.Connection = None
+        self._readers: asyncio.Queue[aiosqlite.Connection] = None
+        self._group_commit: GroupCommit = None
+        self._write_lock = asyncio.Lock()
+        self._queries = SqliteQueryBuilder()
         self._is_connected = False
 
     async def connect(self):
         """Connect to the database and set the connection attribute."""
         self._conn = await aiosqlite.connect(self._path)
+        # Rows replaced by REPLACE INTO fire the delete triggers keeping the search indexes in sync
+        await self._conn.execute("PRAGMA recursive_triggers=ON;")
+        if self._use_wal:
+            await self._conn.execute("PRAGMA journal_mode=WAL;")
+            self._readers = asyncio.Queue()
+            for _ in range(self._reader_count):
+                reader = await aiosqlite.connect(f"file:{self._path}?mode=ro", uri=True)
+                self._readers.put_nowait(reader)
+        if self._use_group_commit:
+            self._group_commit = GroupCommit(
+                self._conn, max_delay_in_s=self._max_commit_delay_in_s, max_batch_size=self._max_commit_batch_size
+            )
+            self._group_commit.start()
         self._is_connected = True
 
     def is_connected(self) -> bool:
         return self._is_connected
 
     async def disconnect(self):
-        """Close the connection to the database."""
+        """Close the connections to the database."""
+        if self._group_commit is not None:
+            await self._group_commit.stop()
+            self._group_commit = None
+        if self._readers is not None:
+            for _ in range(self._reader_count):
+                reader = await self._readers.get()
+                await reader.close()
+            self._readers = None
         await self._conn.close()
         self._is_connected = False
 
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection in WAL mode, or the single connection otherwise."""
+        if self._readers is None:
+            yield self._conn
+            return
+
+        with tracing.start_span("Sqlite.acquire_reader"):
+            reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+
+    async def _write(self, operation: Operation) -> Any:
+        """Execute an operation on the writer connection and commit it.
+
+        In group commit mode the operation is committed together with the operations of concurrent
+        callers. Otherwise writes are serialized, so their transactions do not interleave.
+
+        Args:
+            operation (Operation): The statements to execute on the writer connection.
+
+        Returns:
+            Any: The result of the operation.
+        """
+        if self._group_commit is not None:
+            return await self._group_commit.submit(operation)
+
+        with tracing.start_span("Sqlite.acquire_write_lock"):
+            await self._write_lock.acquire()
+        try:
+            result = await operation(self._conn)
+        except BaseException:
+            await self._conn.rollback()
+            raise
+        else:
+            await self._conn.commit()
+            return result
+        finally:
+            self._write_lock.release()
+
     async def create_table_if_not_exists(self, table_name: str, schema: str):
         """Create a table with the given name and schema if it does not exist."""
-        query = f"CREATE TABLE IF NOT EXISTS {table_name} ({schema});"
+        query = self._queries.create_table(table_name, schema)
 
-        await self._conn.execute(query)
-        await self._conn.commit()
+        await self._write(lambda conn: conn.execute(query))
 
-    async def _get_last_rowid_and_commit(self):
-        """Get the last inserted row id and commit the changes."""
-        query = "SELECT last_insert_rowid();"
-        cursor = await self._conn.execute(query)
-        await self._conn.commit()
-        data = await cursor.fetchone()
-        return data
+    async def create_index_if_not_exists(self, table_name: str, index_name: str, columns: list[str]):
+        """Create an index with the given name on the columns of the table if it does not exist."""
+        query = self._queries.create_index(table_name, index_name, tuple(columns))
 
-    async def insert_data(self, table_name: str, data: DatabaseEntry) -> DatabaseEntryKey:
+        await self._write(lambda conn: conn.execute(query))
+
+    async def create_search_index_if_not_exists(self, table_name: str, key: str, columns: list[str]):
+        """Create an FTS5 index of the columns kept in sync with the table by triggers if it does not exist."""
+        statements = self._queries.create_search_index(table_name, key, tuple(columns))
+
+        async def create(conn: aiosqlite.Connection):
+            for statement in statements:
+                await conn.execute(statement)
+
+        await self._write(create)
+
+    async def get_column_names(self, table_name: str) -> list[str]:
+        """Return the names of the columns of the table."""
+        query = self._queries.table_info(table_name)
+
+        async with self._reader() as conn:
+            cursor = await conn.execute(query)
+            return [column.name for column in _to_rows(cursor, await cursor.fetchall())]
+
+    async def add_column(self, table_name: str, column: str, definition: str):
+        """Add a column with the given definition to the table."""
+        query = self._queries.add_column(table_name, column, definition)
+
+        await self._write(lambda conn: conn.execute(query))
+
+    async def rename_column(self, table_name: str, column: str, new_name: str):
+        """Rename a column of the table."""
+        query = self._queries.rename_column(table_name, column, new_name)
+
+        await self._write(lambda conn: conn.execute(query))
+
+    async def drop_column(self, table_name: str, column: str):
+        """Drop a column from the table."""
+        query = self._queries.drop_column(table_name, column)
+
+        await self._write(lambda conn: conn.execute(query))
+
+    async def insert_data(
+        self, table_name: str, data: DatabaseEntry, key: str | None = "id"
+    ) -> DatabaseEntryKey | None:
         """Insert a row of data into the table and return the primary key."""
-        # Insert data
-        placeholders = ", ".join(["?" for _ in data.keys()])
-        columns = ", ".join(data.keys())
+        query = self._queries.insert(table_name, tuple(data.keys()))
         values = tuple(data.values())
-        query = f"INSERT INTO {table_name} ({columns}) VALUES({placeholders});"
-        await self._conn.execute(query, values)
 
-        # Get id of inserted entry
-        return await self._get_last_rowid_and_commit()
+        async def insert(conn: aiosqlite.Connection):
+            # Insert data and get id of inserted entry
+            cursor = await conn.execute(query, values)
+            return (cursor.lastrowid,) if key is not None else None
+
+        return await self._write(insert)
+
+    async def insert_many(
+        self,
+        table_name: str,
+        data: list[DatabaseEntry],
+        ignore_duplicates: bool = False,
+        increment: Increment | None = None,
+    ) -> list[DatabaseEntryKey]:
+        """Insert multiple rows of data into the table in one transaction and return their primary keys."""
+        if len(data) == 0 and increment is None:
+            return []
+
+        # Insert all rows and increment the rows they belong to in the same transaction, so they are committed once
+        async def insert(conn: aiosqlite.Connection):
+            keys = await self._insert_rows(conn, table_name, data, ignore_duplicates) if data else []
+            if increment is not None:
+                await self._increment_rows(conn, *increment)
+            return keys
+
+        return await self._write(insert)
+
+    async def _insert_rows(
+        self, conn: aiosqlite.Connection, table_name: str, data: list[DatabaseEntry], ignore_duplicates: bool = False
+    ) -> list[DatabaseEntryKey]:
+        """Insert rows with the same columns on the connection and return their primary keys."""
+        query = self._queries.insert(table_name, tuple(data[0].keys()), ignore_duplicates=ignore_duplicates)
+        values = [tuple(entry.values()) for entry in data]
+
+        if ignore_duplicates:
+            await conn.executemany(query, values)
+            return []
+
+        keys = []
+        for entry in values:
+            cursor = await conn.execute(query, entry)
+            keys.append(cursor.lastrowid)
+        return keys
+
+    async def bulk_insert(
+        self, table_name: str, data: list[DatabaseEntry], key: str | None = "id", dependents: Dependents | None = None
+    ) -> list[DatabaseEntryKey]:
+        """Insert rows of data and their dependent rows in one transaction, as SQLite has no faster bulk load."""
+        if len(data) == 0:
+            return []
+
+        async def insert(conn: aiosqlite.Connection):
+            keys = await self._insert_rows(conn, table_name, data)
+            if dependents is not None:
+                rows = [
+                    {dependents.foreign_key: id, **row}
+                    for id, dependent_rows in zip(keys, dependents.data)
+                    for row in dependent_rows
+                ]
+                if rows:
+                    query = self._queries.insert(dependents.table_name, tuple(rows[0].keys()))
+                    await conn.executemany(query, [tuple(row.values()) for row in rows])
+            return keys
+
+        keys = await self._write(insert)
+        return keys if key is not None else []
+
+    async def advance_key_sequence(self, table_name: str, key: str = "id"):
+        """Do nothing, as AUTOINCREMENT keys already continue after the largest key inserted explicitly."""
 
     async def replace_data(self, table_name: str, data: DatabaseEntry):
         """Replace a row of data into the table and return the primary key."""
-        # Replace data
-        placeholders = ", ".join(["?" for _ in data.keys()])
-        columns = ", ".join(data.keys())
+        query = self._queries.replace(table_name, tuple(data.keys()))
         values = tuple(data.values())
-        query = f"REPLACE INTO {table_name} ({columns}) VALUES({placeholders});"
-        await self._conn.execute(query, values)
 
-    async def delete_data_by_key_and_value(self, table_name: str, key: str, value: Any):
-        """Delete a row of data from the table that matches the given key and value."""
-        query = f"DELETE FROM {table_name} WHERE {key}='{value}';"
+        await self._write(lambda conn: conn.execute(query, values))
+
+    async def update_data(
+        self,
+        table_name: str,
+        key: str,
+        value: Any,
+        data: DatabaseEntry,
+        version_key: str | None = None,
+        version: int | None = None,
+    ) -> bool:
+        """Update columns of the row of the table matching the key and value, and its version if it is given."""
+        query = self._queries.update(table_name, key, tuple(data.keys()), version_key, has_version=version is not None)
+        values = (*data.values(), value) if version is None else (*data.values(), value, version)
+
+        async def update(conn: aiosqlite.Connection):
+            cursor = await conn.execute(query, values)
+            return cursor.rowcount == 1
+
+        return await self._write(update)
+
+    async def increment_by_keys(self, table_name: str, key: str, values: list[Any], column: str, chunk_size: int = 500):
+        """Increment a column of the rows of the table whose key matches one of the values in one transaction."""
+        if len(values) == 0:
+            return
+
+        await self._write(lambda conn: self._increment_rows(conn, table_name, key, values, column, chunk_size))
+
+    async def _increment_rows(
+        self,
+        conn: aiosqlite.Connection,
+        table_name: str,
+        key: str,
+        values: list[Any],
+        column: str,
+        chunk_size: int = 500,
+    ):
+        """Increment a column of the rows of the table whose key matches one of the values on the connection."""
+        for start in range(0, len(values), chunk_size):
+            end = start + chunk_size
+            chunk = tuple(values[start:end])
+
+            # Pad the chunk like select_by_keys(), a repeated value updates its row only once
+            count = min(1 << (len(chunk) - 1).bit_length(), chunk_size)
+            query = self._queries.increment_in(table_name, key, column, count)
+
+            await conn.execute(query, chunk + (chunk[0],) * (count - len(chunk)))
+
+    async def delete_data_by_key_and_value(
+        self, table_name: str, key: str, value: Any, referencing: Reference | None = None
+    ):
+        """Delete the rows of data from the table that match the given key and value, and the rows referencing them."""
+        query = self._queries.delete_by(table_name, key)
+
+        async def delete(conn: aiosqlite.Connection):
+            if referencing is not None:
+                await conn.execute(self._queries.delete_by(referencing.table_name, referencing.foreign_key), (value,))
+            await conn.execute(query, (value,))
+
+        await self._write(delete)
+
+    async def select_all_data(self, table_name: str) -> list[DatabaseRow]:
+        """Select all rows of data from the table and return a list of rows."""
+        query = self._queries.select_all(table_name)
+
+        async with self._reader() as conn:
+            cursor = await conn.execute(query)
+            return _to_rows(cursor, await cursor.fetchall())
+
+    async def iterate_data(self, table_name: str, chunk_size: int = 1000) -> AsyncIterator[list[DatabaseRow]]:
+        """Iterate over all rows of data from the table in chunks fetched with fetchmany().
+
+        In WAL mode the iteration reads from a dedicated connection instead of borrowing one from the
+        pool, so a long export neither starves the requests of readers nor deadlocks when the consumer
+        issues its own reads between chunks.
+        """
+        query = self._queries.select_all(table_name)
+
+        if self._readers is None:
+            async with self._conn.execute(query) as cursor:
+                while rows := await cursor.fetchmany(chunk_size):
+                    yield _to_rows(cursor, rows)
+            return
+
+        async with aiosqlite.connect(f"file:{self._path}?mode=ro", uri=True) as conn:
+            async with conn.execute(query) as cursor:
+                while rows := await cursor.fetchmany(chunk_size):
+                    yield _to_rows(cursor, rows)
+
+    async def select_all_data_by_key_and_value(self, table_name: str, key: str, value: Any) -> list[DatabaseRow]:
+        """Select all rows of data from the table that match the given key and value and return a list of rows."""
+        query = self._queries.select_by(table_name, key)
+
+        async with self._reader() as conn:
+            cursor = await conn.execute(query, (value,))
+            return _to_rows(cursor, await cursor.fetchall())
+
+    async def select_by_keys(
+        self, table_name: str, key: str, values: list[Any], chunk_size: int = 500
+    ) -> list[DatabaseRow]:
+        """Select all rows of data from the table whose key matches one of the values and return a list of rows."""
+        data = []
+        async with self._reader() as conn:
+            for start in range(0, len(values), chunk_size):
+                end = start + chunk_size
+                chunk = tuple(values[start:end])
+
+                # Pad the chunk to a power of two by repeating a value, so only a few distinct
+                # statements end up in the statement cache
+                count = min(1 << (len(chunk) - 1).bit_length(), chunk_size)
+                query = self._queries.select_in(table_name, key, count)
+
+                cursor = await conn.execute(query, chunk + (chunk[0],) * (count - len(chunk)))
+                data.extend(_to_rows(cursor, await cursor.fetchall()))
+        return data
+
+    async def select_page_by_key_and_value(
+        self, table_name: str, key: str, value: Any, order_key: str, after: Any | None = None, limit: int = 100
+    ) -> list[DatabaseRow]:
+        """Select a page of rows from the table that match the given key and value and return a list of rows."""
+        query = self._queries.select_page_by(table_name, key, order_key, has_after=after is not None)
+        parameters = (value, limit) if after is None else (value, after, limit)
+
+        async with self._reader() as conn:
+            cursor = await conn.execute(query, parameters)
+            return _to_rows(cursor, await cursor.fetchall())
 
-        await self._conn.execute(query)
-        await self._conn.commit()
+    async def select_page_by_range(
+        self,
+        table_name: str,
+        key: str,
+        lower: Any,
+        upper: Any,
+        tiebreak_key: str,
+        after: tuple[Any, Any] | None = None,
+        limit: int = 100,
+    ) -> list[DatabaseRow]:
+        """Select a page of rows from the table whose key lies in [lower, upper) and return a list of rows."""
+        query = self._queries.select_page_by_range(table_name, key, tiebreak_key, has_after=after is not None)
+        if after is None:
+            parameters = (lower, upper, limit)
+        else:
+            parameters = (max(lower, after[0]), upper, after[0], after[1], limit)
 
-    async def select_all_data(self, table_name: str) -> list[DatabaseEntry]:
-        """Select all rows of data from the table and return a list of tuples."""
-        query = f"SELECT * FROM {table_name};"
+        async with self._reader() as conn:
+            cursor = await conn.execute(query, parameters)
+            return _to_rows(cursor, await cursor.fetchall())
 
-        cursor = await self._conn.execute(query)
-        return await cursor.fetchall()
+    async def select_page_by_search(
+        self,
+        table_name: str,
+        key: str,
+        columns: list[str],
+        text: str,
+        after: tuple[float, Any] | None = None,
+        limit: int = 100,
+    ) -> list[DatabaseRow]:
+        """Select a page of rows from the table matching all words of the text, ranked by BM25."""
+        # Quote every word, so characters of the FTS5 query syntax in the text are matched literally
+        match = " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+        if not match:
+            return []
 
-    async def select_all_data_by_key_and_value(self, table_name: str, key: str, value: Any) -> list[DatabaseEntry]:
-        """Select all rows of data from the table that match the given key and value and return a list of tuples."""
-        query = f"SELECT * FROM {table_name} WHERE {key}='{value}';"
+        query = self._queries.select_page_by_search(table_name, key, has_after=after is not None)
+        parameters = (match, limit) if after is None else (match, after[0], after[1], limit)
 
-        cursor = await self._conn.execute(query)
-        await self._conn.commit()
-        return await cursor.fetchall()
+        async with self._reader() as conn:
+            cursor = await conn.execute(query, parameters)
+            return _to_rows(cursor, await cursor.fetchall())
@@ -0,0 +1,150 @@
+"""Bulk import of users, events and attendance from CSV or NDJSON files"""
+import csv
+import itertools
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, Iterator, NamedTuple
+
+from pydantic import BaseModel, ValidationError
+
+from event_handler.db.interface import Database
+from event_handler.models.event import Attendance, EventWithId
+from event_handler.models.user import UserWithId
+from event_handler.repositories.event_repo import EventRepository
+from event_handler.repositories.user_repo import UserRepository
+
+ImportKind = str
+ImportFormat = str
+
+_FORMATS: dict[str, ImportFormat] = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+class InvalidRowError(ValueError):
+    """An error raised when a row of an import file cannot be validated."""
+
+
+class ImportProgress(NamedTuple):
+    """The number of rows imported from a file so far and the time it took."""
+
+    rows: int
+    elapsed_in_s: float
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.elapsed_in_s if self.elapsed_in_s > 0 else 0.0
+
+
+class _Importer(NamedTuple):
+    """The model validating the rows of a kind and the repository method writing a batch of them."""
+
+    model: type[BaseModel]
+    write: Callable[[Database, list], Awaitable[None]]
+
+
+_IMPORTERS: dict[ImportKind, _Importer] = {
+    "users": _Importer(UserWithId, lambda db, users: UserRepository(db=db).import_users(users)),
+    "events": _Importer(EventWithId, lambda db, events: EventRepository(db=db).import_events(events)),
+    "attendance": _Importer(Attendance, lambda db, attendances: EventRepository(db=db).import_attendances(attendances)),
+}
+"""The kinds of rows that can be imported. Attendance rows add users to the attendees of events."""
+
+
+def detect_format(path: Path) -> ImportFormat:
+    """Returns the format of an import file based on its suffix.
+
+    Args:
+        path (Path): The path of the file.
+
+    Returns:
+        ImportFormat: Either "csv" or "ndjson".
+
+    Raises:
+        ValueError: If the suffix is neither .csv, .ndjson nor .jsonl.
+    """
+    try:
+        return _FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown format of {path}, expected one of {', '.join(_FORMATS)}.") from None
+
+
+def read_rows(path: Path, model: type[BaseModel], format: ImportFormat) -> Iterator[BaseModel]:
+    """Reads and validates the rows of an import file one at a time.
+
+    CSV files need a header naming the fields of the model. Empty values are treated as missing and
+    the attendees of an event are separated by semicolons. NDJSON files contain one object per line,
+    as written by the export endpoints.
+
+    Args:
+        path (Path): The path of the file.
+        model (type[BaseModel]): The model validating each row.
+        format (ImportFormat): Either "csv" or "ndjson".
+
+    Returns:
+        Iterator[BaseModel]: An iterator over the validated rows.
+
+    Raises:
+        InvalidRowError: If a row does not match the model.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if format == "csv":
+            reader = csv.DictReader(file)
+            for row in reader:
+                row = {key: value for key, value in row.items() if value != ""}
+                if "attendees" in row:
+                    row["attendees"] = row["attendees"].split(";")
+                yield _validate(path, reader.line_num, lambda: model.model_validate(row))
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if line.strip():
+                    yield _validate(path, line_number, lambda: model.model_validate_json(line))
+
+
+def _validate(path: Path, line_number: int, validate: Callable[[], BaseModel]) -> BaseModel:
+    """Runs the validation of a row and names the file and line of the row if it fails."""
+    try:
+        return validate()
+    except ValidationError as error:
+        raise InvalidRowError(f"{path}:{line_number}: {error}") from error
+
+
+def _batched(rows: Iterable[BaseModel], batch_size: int) -> Iterator[list[BaseModel]]:
+    """Splits the rows into lists of at most batch_size rows."""
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, batch_size)):
+        yield batch
+
+
+async def import_file(
+    db: Database,
+    kind: ImportKind,
+    path: Path,
+    batch_size: int = 10000,
+    on_progress: Callable[[ImportProgress], None] | None = None,
+) -> ImportProgress:
+    """Streams the rows of a file into the database in batches of one transaction each.
+
+    Rows are written with the ids given in the file and rows that already exist are skipped, so an
+    interrupted import is resumed by importing the same file again without duplicating rows.
+
+    Args:
+        db (Database): The connected and migrated database.
+        kind (ImportKind): One of "users", "events" or "attendance".
+        path (Path): The path of a CSV or NDJSON file.
+        batch_size (int): The number of rows written per transaction.
+        on_progress (Callable[[ImportProgress], None] | None): Called after every committed batch.
+
+    Returns:
+        ImportProgress: The number of imported rows and the time it took.
+
+    Raises:
+        InvalidRowError: If a row does not match the model. The batches before it are committed.
+    """
+    importer = _IMPORTERS[kind]
+    start = time.perf_counter()
+    progress = ImportProgress(rows=0, elapsed_in_s=0.0)
+    for batch in _batched(read_rows(path, importer.model, detect_format(path)), batch_size):
+        await importer.write(db, batch)
+        progress = ImportProgress(rows=progress.rows + len(batch), elapsed_in_s=time.perf_counter() - start)
+        if on_progress is not None:
+            on_progress(progress)
+    return progress
@@ -1,6 +1,17 @@
+import atexit
 import json
 import logging
+import os
+import queue
+import random
+import time
 from logging import Formatter
+from logging.handlers import QueueHandler, QueueListener
+
+from event_handler import tracing
+
+# The attributes every LogRecord has, anything else was passed as a structured field with extra=
+_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
 
 
 class JsonFormatter(Formatter):
@@ -10,11 +21,96 @@ class JsonFormatter(Formatter):
     def format(self, record):
         json_record = {}
         json_record["event_handler"] = record.getMessage()
-        return json.dumps(json_record)
+        json_record["level"] = record.levelname
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                json_record[key] = value
+        return json.dumps(json_record, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """A filter that adds the path, trace id and elapsed time of the request being handled to the records.
+
+    The route template is added once the request has been routed, e.g. to the access log. The filter runs
+    on the thread that logs, since the current span is not visible to the listener thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = tracing.current_span()
+        if span is not None:
+            while span.parent is not None:
+                span = span.parent
+            record.trace_id = f"{span.trace_id:032x}"
+            record.elapsed_in_ms = round((time.time_ns() - span.start_ns) / 1e6, 3)
+            if "http.target" in span.attributes:
+                record.path = span.attributes["http.target"]
+            if "http.route" in span.attributes:
+                record.route = span.attributes["http.route"]
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """A filter that keeps only a share of the records of high-volume messages.
+
+    Messages are identified by their unformatted template, e.g. "Created new event at id=%s.", so all
+    records logged by the same call share a rate. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates: dict[str, float] | None = None):
+        """Initialize the filter with the share of records kept per message template."""
+        super().__init__()
+        self.rates = rates or {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(record.msg)
+        return rate is None or random.random() < rate
 
 
 logger = logging.root
-handler = logging.StreamHandler()
-handler.setFormatter(JsonFormatter())
-logger.handlers = [handler]
+sampling_filter = SamplingFilter()
+
+_listener: QueueListener | None = None
+
+
+def _start_listener():
+    """Routes the records through a queue to a thread that formats and writes them.
+
+    The caller only enqueues the record, so the event loop does not wait for the serialization or the write.
+    """
+    global _listener
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(sampling_filter)
+    queue_handler.addFilter(ContextFilter())
+    logger.handlers = [queue_handler]
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+
+
+def _stop_listener():
+    """Writes the queued records and stops the thread."""
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging(level: str = "INFO", sampling_rates: dict[str, float] | None = None):
+    """Sets the level of the logs and the share of records kept per message.
+
+    Args:
+        level (str): The name of the lowest level that is logged.
+        sampling_rates (dict[str, float] | None): The share of records between 0 and 1 kept per message
+            template below the warning level. Messages without a rate are always kept.
+    """
+    logger.setLevel(level)
+    sampling_filter.rates = sampling_rates or {}
+
+
+_start_listener()
 logger.setLevel(logging.INFO)
+atexit.register(_stop_listener)
+# The listener thread does not exist in a forked process
+os.register_at_fork(after_in_child=_start_listener)
@@ -1,10 +1,12 @@
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 from event_handler.models.user import UserId
 
 EventId = int
+EventVersion = int
+EventCursor = str
 
 
 class Event(BaseModel):
@@ -17,7 +19,32 @@ class Event(BaseModel):
 
 class EventWithId(Event):
     id: EventId
+    version: EventVersion = 1
+
+
+class EventUpdate(BaseModel):
+    name: str | None = None
+    time: datetime | None = None
+    location: str | None = None
+    description: str | None = None
+
+    @model_validator(mode="after")
+    def check_any_field_is_set(self) -> "EventUpdate":
+        # An update without fields would only increment the version and fail the updates of everyone else
+        if all(value is None for value in self.__dict__.values()):
+            raise ValueError("At least one field must be set.")
+        return self
 
 
 class EventKey(BaseModel):
     id: EventId
+
+
+class Attendance(BaseModel):
+    event_id: EventId
+    user_id: UserId
+
+
+class EventPage(BaseModel):
+    events: list[EventWithId]
+    next_cursor: EventCursor | None = None
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 UserId = int
+UserVersion = int
 
 
 class User(BaseModel):
@@ -11,6 +12,20 @@ class User(BaseModel):
 
 class UserWithId(User):
     id: UserId
+    version: UserVersion = 1
+
+
+class UserUpdate(BaseModel):
+    first_name: str | None = None
+    last_name: str | None = None
+    email: str | None = None
+
+    @model_validator(mode="after")
+    def check_any_field_is_set(self) -> "UserUpdate":
+        # An update without fields would only increment the version and fail the updates of everyone else
+        if all(value is None for value in self.__dict__.values()):
+            raise ValueError("At least one field must be set.")
+        return self
 
 
 class UserKey(BaseModel):
@@ -1,19 +1,79 @@
-from event_handler.db.interface import Database
-from event_handler.models.event import Event, EventId, EventWithId
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable
+
+from event_handler.cache.interface import Cache
+from event_handler.db.interface import (
+    Database,
+    DatabaseEntry,
+    DatabaseRow,
+    Dependents,
+    Increment,
+    Reference,
+)
+from event_handler.models.event import (
+    Attendance,
+    Event,
+    EventCursor,
+    EventId,
+    EventPage,
+    EventUpdate,
+    EventVersion,
+    EventWithId,
+)
 from event_handler.models.user import UserId
+from event_handler.tracing import traced
 
 Schema = str
 IsSuccessful = bool
+Timestamp = int
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MIN_TIMESTAMP = -(2**63)
+_MAX_TIMESTAMP = 2**63 - 1
+
+
+class InvalidCursorError(ValueError):
+    """An error raised when a cursor of a page of events cannot be decoded."""
+
+
+def to_timestamp(time: datetime) -> Timestamp:
+    """Converts a time into microseconds since the epoch, which sort like the times they represent.
+
+    Args:
+        time (datetime): The time to convert. Naive times are interpreted as UTC.
+
+    Returns:
+        Timestamp: The microseconds since 1970-01-01 UTC.
+    """
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    delta = time - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def from_timestamp(timestamp: Timestamp) -> datetime:
+    """Converts microseconds since the epoch into a time.
+
+    Args:
+        timestamp (Timestamp): The microseconds since 1970-01-01 UTC.
+
+    Returns:
+        datetime: The time in UTC.
+    """
+    return _EPOCH + timedelta(microseconds=timestamp)
 
 
 class EventRepository:
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, cache: Cache | None = None):
         """Initializes the EventRepository with a Database object.
 
         Args:
             db (Database): The database object that handles the connection and queries.
+            cache (Cache | None): An optional cache for events read by id. It is invalidated on every write.
         """
         self._db = db
+        self._cache = cache
 
     @property
     def _table_name(self) -> str:
@@ -24,6 +84,15 @@ class EventRepository:
         """
         return "Events"
 
+    @property
+    def _attendees_table_name(self) -> str:
+        """Returns the name of the table that stores the attendees of the Events.
+
+        Returns:
+            str: The name of the table.
+        """
+        return "EventAttendees"
+
     @property
     def _schema(self) -> Schema:
         """Returns the schema of the table that stores the Events.
@@ -34,18 +103,137 @@ class EventRepository:
         return (
             "id integer NOT NULL PRIMARY KEY AUTOINCREMENT,"
             "name TEXT NOT NULL,"
-            "time DATETIME NOT NULL,"
+            "time BIGINT NOT NULL,"  # Microseconds since the epoch in UTC, see to_timestamp()
             "location TEXT NOT NULL,"
             "description TEXT NOT NULL,"
-            "attendees TEXT"  # Use TEXT to store a list of user ids as a comma-separated string
+            "version integer NOT NULL DEFAULT 1"  # Incremented on every write of the event or its attendees
         )
 
+    @property
+    def _attendees_schema(self) -> Schema:
+        """Returns the schema of the table that stores the attendees of the Events.
+
+        The composite primary key indexes the attendees by event.
+
+        Returns:
+            Schema: The schema of the table.
+        """
+        return "event_id integer NOT NULL, user_id integer NOT NULL, PRIMARY KEY (event_id, user_id)"
+
+    @property
+    def _search_columns(self) -> list[str]:
+        """Returns the columns of the Events covered by the full-text index.
+
+        Returns:
+            list[str]: The names of the columns.
+        """
+        return ["name", "description", "location"]
+
+    @staticmethod
+    def _to_entry(event: Event) -> DatabaseEntry:
+        """Converts an event into a database entry.
+
+        Args:
+            event (Event): The event object to be converted.
+
+        Returns:
+            DatabaseEntry: The columns of the event.
+        """
+        return {
+            "name": event.name,
+            "time": to_timestamp(event.time),
+            "location": event.location,
+            "description": event.description,
+        }
+
+    @staticmethod
+    def _to_attendee_entries(id: EventId, attendees: Iterable[UserId]) -> list[DatabaseEntry]:
+        """Converts the attendees of an event into database entries.
+
+        Args:
+            id (EventId): The id of the event.
+            attendees (Iterable[UserId]): The user ids attending the event.
+
+        Returns:
+            list[DatabaseEntry]: One row per attendee.
+        """
+        return [{"event_id": id, "user_id": user_id} for user_id in attendees]
+
+    def _to_attendee_dependents(self, events: list[Event]) -> Dependents:
+        """Converts the attendees of events into rows inserted together with the events.
+
+        Args:
+            events (list[Event]): The events to be inserted.
+
+        Returns:
+            Dependents: The attendees of each event, which reference the event by its generated id.
+        """
+        return Dependents(
+            table_name=self._attendees_table_name,
+            foreign_key="event_id",
+            data=[[{"user_id": user_id} for user_id in event.attendees or ()] for event in events],
+        )
+
+    @staticmethod
+    def _to_event(row: DatabaseRow, attendees: set[UserId]) -> EventWithId:
+        """Converts a row of the events table into an event.
+
+        Args:
+            row (DatabaseRow): The columns of the event as stored in the database.
+            attendees (set[UserId]): The user ids attending the event.
+
+        Returns:
+            EventWithId: The event object.
+        """
+        return EventWithId(
+            id=row.id,
+            name=row.name,
+            time=from_timestamp(row.time),
+            location=row.location,
+            description=row.description,
+            attendees=attendees,
+            version=row.version,
+        )
+
+    def _invalidate(self, ids: Iterable[EventId]):
+        """Removes events from the cache after they have been written.
+
+        Args:
+            ids (Iterable[EventId]): The ids of the written events.
+        """
+        if self._cache is not None:
+            for id in ids:
+                self._cache.invalidate(id)
+
+    @traced
     async def create_repository(self):
-        """Creates the table for events if it does not exist in the database."""
+        """Creates the tables for events in their latest schema if they do not exist in the database.
+
+        Existing databases are upgraded by the migrations instead, see event_handler.repositories.migrations.
+        """
         await self._db.create_table_if_not_exists(table_name=self._table_name, schema=self._schema)
+        await self._db.create_table_if_not_exists(table_name=self._attendees_table_name, schema=self._attendees_schema)
+        await self._db.create_index_if_not_exists(
+            table_name=self._attendees_table_name, index_name="EventAttendeesByUser", columns=["user_id", "event_id"]
+        )
+        await self._db.create_index_if_not_exists(
+            table_name=self._table_name, index_name="EventsByTime", columns=["time", "id"]
+        )
+
+    @traced
+    async def create_search_index(self):
+        """Creates the full-text index over the events if it does not exist.
+
+        The database keeps the index in sync with the events table, so every write path, including
+        imports and deletes, updates it without the repository having to.
+        """
+        await self._db.create_search_index_if_not_exists(
+            table_name=self._table_name, key="id", columns=self._search_columns
+        )
 
+    @traced
     async def create_event(self, event: Event) -> EventId:
-        """Inserts a new event into the database and returns its id.
+        """Inserts a new event with its attendees into the database in a single transaction and returns its id.
 
         Args:
             event (Event): The event object to be inserted.
@@ -53,45 +241,132 @@ class EventRepository:
         Returns:
             EventId: The id of the inserted event.
         """
-        id = await self._db.insert_data(
+        if event.attendees:
+            (id,) = await self._db.bulk_insert(
+                table_name=self._table_name,
+                data=[self._to_entry(event)],
+                dependents=self._to_attendee_dependents([event]),
+            )
+        else:
+            (id,) = await self._db.insert_data(table_name=self._table_name, data=self._to_entry(event))
+        self._invalidate([id])
+        return id
+
+    @traced
+    async def create_events(self, events: list[Event]) -> list[EventId]:
+        """Inserts multiple events into the database in a single transaction and returns their ids.
+
+        Args:
+            events (list[Event]): The event objects to be inserted.
+
+        Returns:
+            list[EventId]: The ids of the inserted events in the order of the given events.
+        """
+        ids = await self._db.bulk_insert(
+            table_name=self._table_name,
+            data=[self._to_entry(event) for event in events],
+            dependents=self._to_attendee_dependents(events),
+        )
+        self._invalidate(ids)
+        return ids
+
+    @traced
+    async def import_events(self, events: list[EventWithId]):
+        """Inserts events with their ids and attendees, skipping events and attendees that already exist.
+
+        Importing the same events again has no effect, so an interrupted import can simply be rerun.
+
+        Args:
+            events (list[EventWithId]): The event objects to be inserted.
+        """
+        await self._db.insert_many(
             table_name=self._table_name,
-            data={
-                "name": event.name,
-                "time": event.time,
-                "location": event.location,
-                "description": event.description,
-                "attendees": ",".join(str(s) for s in event.attendees) if event.attendees is not None else "",
-            },
+            data=[{"id": event.id, **self._to_entry(event)} for event in events],
+            ignore_duplicates=True,
+        )
+        await self._db.advance_key_sequence(table_name=self._table_name)
+        await self.import_attendances(
+            [Attendance(event_id=event.id, user_id=user_id) for event in events for user_id in event.attendees or ()]
         )
-        return id[0]
+        self._invalidate(event.id for event in events)
 
+    @traced
+    async def import_attendances(self, attendances: list[Attendance]):
+        """Inserts attendees of events in a single transaction, skipping attendees that already exist.
+
+        Args:
+            attendances (list[Attendance]): The users attending an event.
+        """
+        ids = list({attendance.event_id for attendance in attendances})
+        await self._db.insert_many(
+            table_name=self._attendees_table_name,
+            data=[attendance.model_dump() for attendance in attendances],
+            ignore_duplicates=True,
+            increment=Increment(table_name=self._table_name, key="id", values=ids, column="version"),
+        )
+        self._invalidate(ids)
+
+    @traced
     async def add_attendees_to_event(self, id: EventId, attendees: list[UserId] | UserId) -> IsSuccessful:
-        """Adds one or more attendees to an existing event and returns its id.
+        """Adds one or more attendees to an existing event.
+
+        Each attendee is a single row in the attendees table, so the event itself is not rewritten, only
+        its version is incremented. Attendees that already attend the event are ignored.
 
         Args:
             id (EventId): The id of the event to be updated.
             attendees (list[UserId] | UserId): The user id or a list of user ids to be added as attendees.
+
+        Returns:
+            IsSuccessful: False if the event does not exist, True otherwise.
         """
         if not isinstance(attendees, list):  # skip: coverage
             attendees = [attendees]
 
-        event = await self.get_event(id=id)
-        if event is None:  # skip: coverage
+        event = await self._db.select_all_data_by_key_and_value(table_name=self._table_name, key="id", value=id)
+        if len(event) == 0:  # skip: coverage
             return False
 
-        await self._db.replace_data(
-            table_name=self._table_name,
-            data={
-                "id": event.id,
-                "name": event.name,
-                "time": event.time,
-                "location": event.location,
-                "description": event.description,
-                "attendees": ",".join(str(s) for s in attendees) if event.attendees is not None else "",
-            },
+        # The version is incremented in the transaction adding the attendees, so a version is never read
+        # with attendees other than the ones it was committed with
+        await self._db.insert_many(
+            table_name=self._attendees_table_name,
+            data=self._to_attendee_entries(id, attendees),
+            ignore_duplicates=True,
+            increment=Increment(table_name=self._table_name, key="id", values=[id], column="version"),
         )
+        self._invalidate([id])
         return True
 
+    @traced
+    async def update_event(self, id: EventId, event: EventUpdate, version: EventVersion) -> EventVersion | None:
+        """Updates the submitted fields of an event if it still has the given version.
+
+        The fields are written and the version is incremented and checked in a single statement, so of
+        two concurrent updates of the same version only the first one succeeds. Fields that are not
+        submitted or None are left untouched.
+
+        Args:
+            id (EventId): The id of the event to be updated.
+            event (EventUpdate): The fields to be updated.
+            version (EventVersion): The version of the event the update is based on.
+
+        Returns:
+            EventVersion | None: The new version of the event, or None if the event does not exist or has
+                another version.
+        """
+        entry = event.model_dump(exclude_unset=True, exclude_none=True)
+        if "time" in entry:
+            entry["time"] = to_timestamp(entry["time"])
+
+        is_updated = await self._db.update_data(
+            table_name=self._table_name, key="id", value=id, data=entry, version_key="version", version=version
+        )
+        if is_updated:
+            self._invalidate([id])
+            return version + 1
+
+    @traced
     async def get_event(self, id: EventId) -> EventWithId | None:
         """Retrieves a event from the database by its id.
 
@@ -101,21 +376,219 @@ class EventRepository:
         Returns:
             Event | None: The event object if found, or None otherwise.
         """
+        if self._cache is not None:
+            event = self._cache.get(id)
+            if event is not None:
+                return event
+            generation = self._cache.generation
+
         event = await self._db.select_all_data_by_key_and_value(table_name=self._table_name, key="id", value=id)
         if len(event) == 1:  # there is only one entry associated per id
-            return EventWithId(
-                id=event[0][0],
-                name=event[0][1],
-                time=event[0][2],
-                location=event[0][3],
-                description=event[0][4],
-                attendees=set((id for id in event[0][5].split(","))) if event[0][5] != "" else set(),
+            attendees = await self._db.select_all_data_by_key_and_value(
+                table_name=self._attendees_table_name, key="event_id", value=id
             )
+            event = self._to_event(event[0], attendees={attendee.user_id for attendee in attendees})
+            if self._cache is not None:
+                self._cache.set(id, event, generation=generation)
+            return event
+
+    @traced
+    async def get_event_version(self, id: EventId) -> EventVersion | None:
+        """Retrieves the version of an event without looking up its attendees.
+
+        Args:
+            id (EventId): The id of the event.
+
+        Returns:
+            EventVersion | None: The version of the event if found, or None otherwise.
+        """
+        if self._cache is not None:
+            event = self._cache.get(id)
+            if event is not None:
+                return event.version
+
+        event = await self._db.select_all_data_by_key_and_value(table_name=self._table_name, key="id", value=id)
+        if len(event) == 1:
+            return event[0].version
+
+    @traced
+    async def get_events(self, ids: list[EventId]) -> list[EventWithId]:
+        """Retrieves multiple events from the database by their ids.
+
+        Args:
+            ids (list[EventId]): The ids of the events to be retrieved.
+
+        Returns:
+            list[EventWithId]: The events found in the order of the given ids. Unknown ids are skipped.
+        """
+        events = await self._to_events(await self._db.select_by_keys(table_name=self._table_name, key="id", values=ids))
+        events_by_id = {event.id: event for event in events}
+        return [events_by_id[id] for id in ids if id in events_by_id]
+
+    @traced
+    async def _to_events(self, rows: list[DatabaseRow]) -> list[EventWithId]:
+        """Converts rows of the events table into events, looking up the attendees of all events at once.
+
+        Args:
+            rows (list[DatabaseRow]): The columns of the events as stored in the database.
+
+        Returns:
+            list[EventWithId]: The event objects in the order of the rows.
+        """
+        attendees_by_id = {row.id: set() for row in rows}
+        for attendee in await self._db.select_by_keys(
+            table_name=self._attendees_table_name, key="event_id", values=list(attendees_by_id)
+        ):
+            attendees_by_id[attendee.event_id].add(attendee.user_id)
+
+        return [self._to_event(row, attendees=attendees_by_id[row.id]) for row in rows]
 
+    async def iterate_events(self, chunk_size: int = 1000) -> AsyncIterator[list[EventWithId]]:
+        """Iterates over all events in chunks, so every event can be exported in constant memory.
+
+        The attendees are looked up once per chunk.
+
+        Args:
+            chunk_size (int): The maximum number of events per chunk.
+
+        Returns:
+            AsyncIterator[list[EventWithId]]: An async iterator over lists of events.
+        """
+        async for rows in self._db.iterate_data(table_name=self._table_name, chunk_size=chunk_size):
+            yield await self._to_events(rows)
+
+    @traced
+    async def list_events(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        cursor: EventCursor | None = None,
+        limit: int = 100,
+    ) -> EventPage:
+        """Retrieves a page of the events taking place in the time range [start, end), ordered by time and id.
+
+        Pages are addressed by an opaque cursor on the (time, id) of the last event of the previous page,
+        so each page is a range scan on the time index regardless of how many pages precede it.
+
+        Args:
+            start (datetime | None): The inclusive start of the time range, or None for no lower bound.
+            end (datetime | None): The exclusive end of the time range, or None for no upper bound.
+            cursor (EventCursor | None): The cursor returned with the previous page.
+            limit (int): The maximum number of events to be retrieved.
+
+        Returns:
+            EventPage: The events and the cursor of the next page, which is None on the last page.
+
+        Raises:
+            InvalidCursorError: If the cursor is invalid.
+        """
+        rows = await self._db.select_page_by_range(
+            table_name=self._table_name,
+            key="time",
+            lower=to_timestamp(start) if start is not None else _MIN_TIMESTAMP,
+            upper=to_timestamp(end) if end is not None else _MAX_TIMESTAMP,
+            tiebreak_key="id",
+            after=self._decode_cursor(cursor) if cursor is not None else None,
+            limit=limit,
+        )
+        next_cursor = self._encode_cursor(rows[-1].time, rows[-1].id) if len(rows) == limit else None
+        return EventPage(events=await self._to_events(rows), next_cursor=next_cursor)
+
+    @staticmethod
+    def _encode_cursor(time: Timestamp, id: EventId) -> EventCursor:
+        """Encodes the (time, id) of an event into an opaque cursor."""
+        return base64.urlsafe_b64encode(f"{time}:{id}".encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: EventCursor) -> tuple[Timestamp, EventId]:
+        """Decodes the (time, id) of an event from an opaque cursor or raises an InvalidCursorError."""
+        try:
+            time, id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+            return int(time), int(id)
+        except ValueError as error:  # includes binascii.Error and UnicodeDecodeError
+            raise InvalidCursorError(f"Invalid cursor: {cursor}") from error
+
+    @traced
+    async def search_events(self, query: str, cursor: EventCursor | None = None, limit: int = 100) -> EventPage:
+        """Retrieves a page of the events whose name, description or location contain all words of a query.
+
+        Events are ordered by relevance and id. Pages are addressed by an opaque cursor on the (rank, id)
+        of the last event of the previous page.
+
+        Args:
+            query (str): The words to search for.
+            cursor (EventCursor | None): The cursor returned with the previous page.
+            limit (int): The maximum number of events to be retrieved.
+
+        Returns:
+            EventPage: The events and the cursor of the next page, which is None on the last page.
+
+        Raises:
+            InvalidCursorError: If the cursor is invalid.
+        """
+        rows = await self._db.select_page_by_search(
+            table_name=self._table_name,
+            key="id",
+            columns=self._search_columns,
+            text=query,
+            after=self._decode_search_cursor(cursor) if cursor is not None else None,
+            limit=limit,
+        )
+        next_cursor = self._encode_search_cursor(rows[-1].rank, rows[-1].id) if len(rows) == limit else None
+        return EventPage(events=await self._to_events(rows), next_cursor=next_cursor)
+
+    @staticmethod
+    def _encode_search_cursor(rank: float, id: EventId) -> EventCursor:
+        """Encodes the (rank, id) of an event in a search into an opaque cursor."""
+        return base64.urlsafe_b64encode(f"{rank!r}:{id}".encode()).decode()
+
+    @staticmethod
+    def _decode_search_cursor(cursor: EventCursor) -> tuple[float, EventId]:
+        """Decodes the (rank, id) of an event in a search from an opaque cursor or raises an InvalidCursorError."""
+        try:
+            rank, id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+            return float(rank), int(id)
+        except ValueError as error:  # includes binascii.Error and UnicodeDecodeError
+            raise InvalidCursorError(f"Invalid cursor: {cursor}") from error
+
+    @traced
+    async def get_events_for_user(
+        self, user_id: UserId, after: EventId | None = None, limit: int = 100
+    ) -> list[EventWithId]:
+        """Retrieves a page of the events a user attends, ordered by event id.
+
+        The attendees are looked up through the index on the user id, so the cost depends on
+        the size of the page and not on the number of events.
+
+        Args:
+            user_id (UserId): The id of the attending user.
+            after (EventId | None): The id of the last event of the previous page.
+            limit (int): The maximum number of events to be retrieved.
+
+        Returns:
+            list[EventWithId]: The events attended by the user.
+        """
+        attendees = await self._db.select_page_by_key_and_value(
+            table_name=self._attendees_table_name,
+            key="user_id",
+            value=user_id,
+            order_key="event_id",
+            after=after,
+            limit=limit,
+        )
+        return await self.get_events(ids=[attendee.event_id for attendee in attendees])
+
+    @traced
     async def delete_event(self, id: EventId):
         """Deletes a event from the database by its id.
 
         Args:
             id (EventId): The id of the event to be deleted.
         """
-        await self._db.delete_data_by_key_and_value(table_name=self._table_name, key="id", value=id)
+        await self._db.delete_data_by_key_and_value(
+            table_name=self._table_name,
+            key="id",
+            value=id,
+            referencing=Reference(table_name=self._attendees_table_name, foreign_key="event_id"),
+        )
+        self._invalidate([id])
@@ -0,0 +1,143 @@
+from datetime import datetime
+from typing import Awaitable, Callable, NamedTuple
+
+from event_handler.db.interface import Database
+from event_handler.repositories.event_repo import to_timestamp
+
+SchemaVersion = int
+
+
+class Migration(NamedTuple):
+    """A versioned step of the database schema."""
+
+    version: SchemaVersion
+    description: str
+    apply: Callable[[Database], Awaitable[None]]
+
+
+async def _create_users(db: Database):
+    await db.create_table_if_not_exists(
+        table_name="Users",
+        schema=(
+            "id integer NOT NULL PRIMARY KEY AUTOINCREMENT,"
+            "first_name varchar(255) NOT NULL,"
+            "last_name varchar(255) NOT NULL,"
+            "email varchar(255) NOT NULL"
+        ),
+    )
+
+
+async def _create_events(db: Database):
+    """Creates the events and attendees tables and moves attendees stored as comma-separated string.
+
+    The move is idempotent, so it can be rerun if it is interrupted before the legacy column is dropped.
+    """
+    await db.create_table_if_not_exists(
+        table_name="Events",
+        schema=(
+            "id integer NOT NULL PRIMARY KEY AUTOINCREMENT,"
+            "name TEXT NOT NULL,"
+            "time DATETIME NOT NULL,"
+            "location TEXT NOT NULL,"
+            "description TEXT NOT NULL"
+        ),
+    )
+    await db.create_table_if_not_exists(
+        table_name="EventAttendees",
+        schema="event_id integer NOT NULL, user_id integer NOT NULL, PRIMARY KEY (event_id, user_id)",
+    )
+    await db.create_index_if_not_exists(
+        table_name="EventAttendees", index_name="EventAttendeesByUser", columns=["user_id", "event_id"]
+    )
+
+    if "attendees" in await db.get_column_names(table_name="Events"):
+        entries = []
+        for event in await db.select_all_data(table_name="Events"):
+            if event.attendees:
+                entries.extend(
+                    {"event_id": event.id, "user_id": int(user_id)} for user_id in event.attendees.split(",")
+                )
+        await db.insert_many(table_name="EventAttendees", data=entries, ignore_duplicates=True)
+        await db.drop_column(table_name="Events", column="attendees")
+
+
+async def _store_event_times_as_timestamps(db: Database):
+    """Replaces the event times by microseconds since the epoch and indexes them.
+
+    SQLite returns the times as ISO formatted text and PostgreSQL as timestamps, so the converted times are
+    written to a new column that then replaces the old one.
+    """
+    await db.add_column(table_name="Events", column="time_in_us", definition="BIGINT NOT NULL DEFAULT 0")
+    for event in await db.select_all_data(table_name="Events"):
+        time = datetime.fromisoformat(event.time) if isinstance(event.time, str) else event.time
+        await db.update_data(table_name="Events", key="id", value=event.id, data={"time_in_us": to_timestamp(time)})
+    await db.drop_column(table_name="Events", column="time")
+    await db.rename_column(table_name="Events", column="time_in_us", new_name="time")
+    await db.create_index_if_not_exists(table_name="Events", index_name="EventsByTime", columns=["time", "id"])
+
+
+async def _create_event_search_index(db: Database):
+    await db.create_search_index_if_not_exists(
+        table_name="Events", key="id", columns=["name", "description", "location"]
+    )
+
+
+async def _add_row_versions(db: Database):
+    """Adds the version that is incremented on every write to events and users and returned as their ETag."""
+    for table_name in ("Events", "Users"):
+        await db.add_column(table_name=table_name, column="version", definition="integer NOT NULL DEFAULT 1")
+
+
+MIGRATIONS = [
+    Migration(version=1, description="Create users table", apply=_create_users),
+    Migration(version=2, description="Create events and attendees tables", apply=_create_events),
+    Migration(
+        version=3, description="Store event times as sortable timestamps", apply=_store_event_times_as_timestamps
+    ),
+    Migration(version=4, description="Index events for full-text search", apply=_create_event_search_index),
+    Migration(version=5, description="Version events and users", apply=_add_row_versions),
+]
+"""The migrations in order of their versions. Migrations are applied at most once per database."""
+
+_TABLE_NAME = "SchemaVersion"
+_SCHEMA = "version integer NOT NULL PRIMARY KEY, description TEXT NOT NULL"
+
+
+async def get_schema_version(db: Database) -> SchemaVersion:
+    """Returns the version of the latest migration applied to the database.
+
+    Args:
+        db (Database): The database to inspect.
+
+    Returns:
+        SchemaVersion: The latest applied version, or 0 if no migration was applied.
+    """
+    await db.create_table_if_not_exists(table_name=_TABLE_NAME, schema=_SCHEMA)
+    versions = await db.select_all_data(table_name=_TABLE_NAME)
+    return max((version.version for version in versions), default=0)
+
+
+async def migrate(db: Database) -> SchemaVersion:
+    """Applies all migrations newer than the schema version of the database.
+
+    Databases created before the schema was versioned start at version 0. The first migrations only
+    create missing tables and move legacy columns, so they are safe to apply to such databases. Each
+    migration holds the DDL of its own step, so it keeps producing the same schema as the code evolves.
+
+    Args:
+        db (Database): The connected database to migrate.
+
+    Returns:
+        SchemaVersion: The schema version after the migration.
+    """
+    current_version = await get_schema_version(db)
+    for migration in MIGRATIONS:
+        if migration.version > current_version:
+            await migration.apply(db)
+            await db.insert_data(
+                table_name=_TABLE_NAME,
+                data={"version": migration.version, "description": migration.description},
+                key=None,
+            )
+            current_version = migration.version
+    return current_version
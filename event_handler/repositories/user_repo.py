@@ -1,5 +1,9 @@
-from event_handler.db.interface import Database
-from event_handler.models.user import User, UserId, UserWithId
+from typing import AsyncIterator, Iterable
+
+from event_handler.cache.interface import Cache
+from event_handler.db.interface import Database, DatabaseRow
+from event_handler.models.user import User, UserId, UserUpdate, UserVersion, UserWithId
+from event_handler.tracing import traced
 
 Schema = str
 
@@ -7,13 +11,15 @@ Schema = str
 class UserRepository:
     """A class that represents a repository for users in a database."""
 
-    def __init__(self, db: Database):
+    def __init__(self, db: Database, cache: Cache | None = None):
         """Initializes the UserRepository with a Database object.
 
         Args:
             db (Database): The database object that handles the connection and queries.
+            cache (Cache | None): An optional cache for users read by id. It is invalidated on every write.
         """
         self._db = db
+        self._cache = cache
 
     @property
     def _table_name(self) -> str:
@@ -35,13 +41,43 @@ class UserRepository:
             "id integer NOT NULL PRIMARY KEY AUTOINCREMENT,"
             "first_name varchar(255) NOT NULL,"
             "last_name varchar(255) NOT NULL,"
-            "email varchar(255) NOT NULL"
+            "email varchar(255) NOT NULL,"
+            "version integer NOT NULL DEFAULT 1"  # Incremented on every write of the user
+        )
+
+    @staticmethod
+    def _to_user(row: DatabaseRow) -> UserWithId:
+        """Converts a row of the users table into a user.
+
+        Args:
+            row (DatabaseRow): The columns of the user as stored in the database.
+
+        Returns:
+            UserWithId: The user object.
+        """
+        return UserWithId(
+            id=row.id, first_name=row.first_name, last_name=row.last_name, email=row.email, version=row.version
         )
 
+    def _invalidate(self, ids: Iterable[UserId]):
+        """Removes users from the cache after they have been written.
+
+        Args:
+            ids (Iterable[UserId]): The ids of the written users.
+        """
+        if self._cache is not None:
+            for id in ids:
+                self._cache.invalidate(id)
+
+    @traced
     async def create_repository(self):
-        """Creates the table for users if it does not exist in the database."""
+        """Creates the table for users in its latest schema if it does not exist in the database.
+
+        Existing databases are upgraded by the migrations instead, see event_handler.repositories.migrations.
+        """
         await self._db.create_table_if_not_exists(table_name=self._table_name, schema=self._schema)
 
+    @traced
     async def create_user(self, user: User) -> UserId:
         """Inserts a new user into the database and returns its id.
 
@@ -52,8 +88,68 @@ class UserRepository:
             UserId: The id of the inserted user.
         """
         id = await self._db.insert_data(table_name=self._table_name, data=user.__dict__)
+        self._invalidate([id[0]])
         return id[0]
 
+    @traced
+    async def create_users(self, users: list[User]) -> list[UserId]:
+        """Inserts multiple users into the database in a single transaction and returns their ids.
+
+        Args:
+            users (list[User]): The user objects to be inserted.
+
+        Returns:
+            list[UserId]: The ids of the inserted users in the order of the given users.
+        """
+        ids = await self._db.bulk_insert(table_name=self._table_name, data=[user.__dict__ for user in users])
+        self._invalidate(ids)
+        return ids
+
+    @traced
+    async def import_users(self, users: list[UserWithId]):
+        """Inserts users with their ids in a single transaction, skipping users whose id already exists.
+
+        Importing the same users again has no effect, so an interrupted import can simply be rerun.
+
+        Args:
+            users (list[UserWithId]): The user objects to be inserted.
+        """
+        await self._db.insert_many(
+            table_name=self._table_name, data=[user.model_dump() for user in users], ignore_duplicates=True
+        )
+        await self._db.advance_key_sequence(table_name=self._table_name)
+        self._invalidate(user.id for user in users)
+
+    @traced
+    async def update_user(self, id: UserId, user: UserUpdate, version: UserVersion) -> UserVersion | None:
+        """Updates the submitted fields of a user if it still has the given version.
+
+        The fields are written and the version is incremented and checked in a single statement, so of
+        two concurrent updates of the same version only the first one succeeds. Fields that are not
+        submitted or None are left untouched.
+
+        Args:
+            id (UserId): The id of the user to be updated.
+            user (UserUpdate): The fields to be updated.
+            version (UserVersion): The version of the user the update is based on.
+
+        Returns:
+            UserVersion | None: The new version of the user, or None if the user does not exist or has
+                another version.
+        """
+        is_updated = await self._db.update_data(
+            table_name=self._table_name,
+            key="id",
+            value=id,
+            data=user.model_dump(exclude_unset=True, exclude_none=True),
+            version_key="version",
+            version=version,
+        )
+        if is_updated:
+            self._invalidate([id])
+            return version + 1
+
+    @traced
     async def get_user(self, id: UserId) -> UserWithId | None:
         """Retrieves a user from the database by its id.
 
@@ -63,10 +159,65 @@ class UserRepository:
         Returns:
             User | None: The user object if found, or None otherwise.
         """
+        if self._cache is not None:
+            user = self._cache.get(id)
+            if user is not None:
+                return user
+            generation = self._cache.generation
+
         user = await self._db.select_all_data_by_key_and_value(table_name=self._table_name, key="id", value=id)
         if len(user) == 1:  # there is only one entry associated per id
-            return UserWithId(id=user[0][0], first_name=user[0][1], last_name=user[0][2], email=user[0][3])
+            user = self._to_user(user[0])
+            if self._cache is not None:
+                self._cache.set(id, user, generation=generation)
+            return user
+
+    @traced
+    async def get_user_version(self, id: UserId) -> UserVersion | None:
+        """Retrieves the version of a user.
+
+        Args:
+            id (UserId): The id of the user.
+
+        Returns:
+            UserVersion | None: The version of the user if found, or None otherwise.
+        """
+        if self._cache is not None:
+            user = self._cache.get(id)
+            if user is not None:
+                return user.version
+
+        user = await self._db.select_all_data_by_key_and_value(table_name=self._table_name, key="id", value=id)
+        if len(user) == 1:
+            return user[0].version
+
+    @traced
+    async def get_users(self, ids: list[UserId]) -> list[UserWithId]:
+        """Retrieves multiple users from the database by their ids.
+
+        Args:
+            ids (list[UserId]): The ids of the users to be retrieved.
+
+        Returns:
+            list[UserWithId]: The users found in the order of the given ids. Unknown ids are skipped.
+        """
+        users = await self._db.select_by_keys(table_name=self._table_name, key="id", values=ids)
+        users_by_id = {user.id: self._to_user(user) for user in users}
+        return [users_by_id[id] for id in ids if id in users_by_id]
+
+    async def iterate_users(self, chunk_size: int = 1000) -> AsyncIterator[list[UserWithId]]:
+        """Iterates over all users in chunks, so every user can be exported in constant memory.
+
+        Args:
+            chunk_size (int): The maximum number of users per chunk.
+
+        Returns:
+            AsyncIterator[list[UserWithId]]: An async iterator over lists of users.
+        """
+        async for rows in self._db.iterate_data(table_name=self._table_name, chunk_size=chunk_size):
+            yield [self._to_user(row) for row in rows]
 
+    @traced
     async def delete_user(self, id: UserId):
         """Deletes a user from the database by its id.
 
@@ -74,3 +225,4 @@ class UserRepository:
             id (UserId): The id of the user to be deleted.
         """
         await self._db.delete_data_by_key_and_value(table_name=self._table_name, key="id", value=id)
+        self._invalidate([id])
@@ -0,0 +1,176 @@
+"""Lightweight tracing of requests exported in the OTLP/JSON format of OpenTelemetry"""
+import functools
+import json
+import random
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, TextIO, TypeVar
+
+SpanAttributes = dict[str, Any]
+
+_SPAN_KIND_INTERNAL = 1
+_SPAN_KIND_SERVER = 2
+_STATUS_CODE_ERROR = 2
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+_exporter: "SpanExporter | None" = None
+
+T = TypeVar("T")
+
+
+class Span:
+    """A class that represents a timed operation within a trace.
+
+    Spans started while another span is current become its children. A span without a parent is the
+    root of a new trace, which is exported once the root span ends.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "attributes", "start_ns", "end_ns", "is_error", "_trace")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: SpanAttributes):
+        """Initialize a started span as a child of the parent span."""
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent is not None else random.getrandbits(128)
+        self.span_id = random.getrandbits(64)
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.is_error = False
+        self._trace: list[Span] = parent._trace if parent is not None else []
+
+    @property
+    def duration_in_s(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_otlp(self) -> dict:
+        """Return the span in the OTLP/JSON encoding."""
+        span = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "parentSpanId": f"{self.parent.span_id:016x}" if self.parent is not None else "",
+            "name": self.name,
+            "kind": _SPAN_KIND_INTERNAL if self.parent is not None else _SPAN_KIND_SERVER,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _to_otlp_value(value)} for key, value in self.attributes.items()],
+        }
+        if self.is_error:
+            span["status"] = {"code": _STATUS_CODE_ERROR}
+        return span
+
+
+def _to_otlp_value(value: Any) -> dict:
+    """Return an attribute value in the OTLP/JSON encoding."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanExporter:
+    """A class that writes every finished trace as one line of OTLP/JSON, as the OpenTelemetry file exporter does."""
+
+    def __init__(self, file: TextIO, service_name: str = "event_handler"):
+        """Initialize the exporter writing to the given file."""
+        self._file = file
+        self._resource = {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]}
+
+    def export(self, spans: list[Span]):
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": self._resource,
+                    "scopeSpans": [{"scope": {"name": "event_handler"}, "spans": [span.to_otlp() for span in spans]}],
+                }
+            ]
+        }
+        self._file.write(json.dumps(request, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+def configure_tracing(path: str | None):
+    """Exports the traces to a file, to stdout if the path is "-", or disables the export if it is None.
+
+    Args:
+        path (str | None): The path of the file the traces are appended to.
+    """
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+    if path is None:
+        _exporter = None
+    elif path == "-":
+        _exporter = SpanExporter(sys.stdout)
+    else:
+        _exporter = SpanExporter(open(path, "a", encoding="utf-8"))
+
+
+@contextmanager
+def start_span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Starts a span as a child of the current span and makes it current until it ends.
+
+    Spans are recorded even if the export is disabled, so their durations and attributes can be
+    used, e.g. for the slow-query log.
+
+    Args:
+        name (str): The name of the operation.
+        **attributes (Any): The attributes of the span.
+
+    Returns:
+        Iterator[Span]: The started span.
+    """
+    span = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException:
+        span.is_error = True
+        raise
+    finally:
+        span.end_ns = time.time_ns()
+        _current_span.reset(token)
+        span._trace.append(span)
+        if span.parent is None and _exporter is not None:
+            _exporter.export(span._trace)
+
+
+def current_span() -> Span | None:
+    """Returns the current span, or None outside of a span."""
+    return _current_span.get()
+
+
+def set_attribute(key: str, value: Any):
+    """Sets an attribute of the current span, if there is one.
+
+    Args:
+        key (str): The name of the attribute, following the OpenTelemetry conventions where possible.
+        value (Any): The value of the attribute.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.attributes[key] = value
+
+
+def traced(function: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Decorates a coroutine function to run in a span named after its qualified name."""
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs) -> T:
+        with start_span(name):
+            return await function(*args, **kwargs)
+
+    return wrapper
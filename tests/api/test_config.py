@@ -0,0 +1,21 @@
+import os
+
+from event_handler.api import config
+
+
+def test_when_process_forks_then_child_creates_own_database():
+    # Arrange
+    parent_database = config.get_database()
+    read, write = os.pipe()
+
+    # Act
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        os.write(write, b"1" if config.get_database() is not parent_database else b"0")
+        os._exit(0)
+    os.waitpid(pid, 0)
+    is_own_database = os.read(read, 1) == b"1"
+
+    # Assert
+    assert is_own_database
+    assert config.get_database() is parent_database
@@ -0,0 +1,50 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from event_handler.api.responses import (
+    ModelResponse,
+    cache_headers,
+    is_not_modified,
+    to_version,
+)
+from event_handler.models.event import EventWithId
+
+
+def test_when_models_are_returned_then_they_are_rendered_as_json():
+    # Arrange
+    event = EventWithId(
+        id=1, name="Party", time=datetime(2024, 1, 1, 20), location="Reeperbahn", description="Dance", attendees={2}
+    )
+
+    # Act
+    single = ModelResponse(event)
+    many = ModelResponse([event, event])
+
+    # Assert
+    assert json.loads(single.body) == json.loads(event.model_dump_json())
+    assert json.loads(many.body) == [json.loads(event.model_dump_json())] * 2
+    assert single.media_type == "application/json"
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [(None, False), ('"1"', False), ('"2"', True), ('W/"2"', True), ('"1", W/"2"', True), ("*", True)],
+)
+def test_when_if_none_match_is_compared_then_it_matches_the_current_version(if_none_match: str, expected: bool):
+    # Act
+    not_modified = is_not_modified(if_none_match, version=2)
+
+    # Assert
+    assert not_modified == expected
+    assert cache_headers(2, "no-cache") == {"ETag": '"2"', "Cache-Control": "no-cache"}
+
+
+@pytest.mark.parametrize("if_match, expected", [('"3"', 3), (' "12" ', 12), ('W/"3"', None), ("*", None), ('""', None)])
+def test_when_if_match_is_parsed_then_only_a_strong_etag_is_a_version(if_match: str, expected: int | None):
+    # Act
+    version = to_version(if_match)
+
+    # Assert
+    assert version == expected
@@ -0,0 +1,61 @@
+import time
+
+from event_handler.cache.lru import LruCache
+
+
+def test_when_value_is_set_then_value_is_a_hit():
+    # Arrange
+    cache = LruCache(max_size=2, ttl_in_s=60)
+
+    # Act
+    cache.set(1, "value")
+
+    # Assert
+    assert cache.get(1) == "value"
+    assert cache.get(2) is None
+    assert cache.stats().hits == 1
+    assert cache.stats().misses == 1
+
+
+def test_when_cache_is_full_then_least_recently_used_value_is_evicted():
+    # Arrange
+    cache = LruCache(max_size=2, ttl_in_s=60)
+    cache.set(1, "one")
+    cache.set(2, "two")
+
+    # Act
+    cache.get(1)
+    cache.set(3, "three")
+
+    # Assert
+    assert cache.get(1) == "one"
+    assert cache.get(2) is None
+    assert cache.get(3) == "three"
+    assert cache.stats().evictions == 1
+    assert cache.stats().size == 2
+
+
+def test_when_ttl_has_passed_then_value_is_expired():
+    # Arrange
+    cache = LruCache(max_size=2, ttl_in_s=0.01)
+    cache.set(1, "one")
+
+    # Act
+    time.sleep(0.02)
+
+    # Assert
+    assert cache.get(1) is None
+    assert cache.stats().expirations == 1
+
+
+def test_when_value_is_invalidated_after_read_started_then_stale_value_is_not_cached():
+    # Arrange
+    cache = LruCache(max_size=2, ttl_in_s=60)
+    generation = cache.generation
+
+    # Act
+    cache.invalidate(1)
+    cache.set(1, "stale", generation=generation)
+
+    # Assert
+    assert cache.get(1) is None
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from event_handler import cli
+from event_handler.api import config
+
+
+def test_when_server_starts_several_workers_then_cache_is_disabled(monkeypatch: pytest.MonkeyPatch):
+    # Arrange
+    runs = []
+
+    async def migrate_database():
+        pass
+
+    monkeypatch.setattr(config.get_general_settings(), "workers", 2)
+    monkeypatch.setattr(config.get_cache_settings(), "use_cache", True)
+    monkeypatch.setenv("USE_CACHE", "true")
+    monkeypatch.setattr(cli, "migrate_database", migrate_database)
+    monkeypatch.setattr(cli.uvicorn, "run", lambda app, **options: runs.append(options["workers"]))
+
+    # Act
+    cli.start_server()
+
+    # Assert
+    assert runs == [2]
+    assert os.environ["USE_CACHE"] == "false"
+    assert config.CacheSettings().use_cache is False
+    assert config.get_cache_settings().use_cache is False
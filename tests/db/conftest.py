@@ -12,3 +12,25 @@ async def sqlite() -> Sqlite:
     yield db
     # TearDown
     await db.disconnect()
+
+
+@pytest_asyncio.fixture
+async def sqlite_wal(tmp_path) -> Sqlite:
+    # SetUp
+    db = Sqlite(path=str(tmp_path / "test.db"), use_wal=True, reader_count=2)
+    await db.connect()
+    # Entry
+    yield db
+    # TearDown
+    await db.disconnect()
+
+
+@pytest_asyncio.fixture
+async def sqlite_group_commit(tmp_path) -> Sqlite:
+    # SetUp
+    db = Sqlite(path=str(tmp_path / "test.db"), use_wal=True, use_group_commit=True, max_commit_delay_in_s=0.01)
+    await db.connect()
+    # Entry
+    yield db
+    # TearDown
+    await db.disconnect()
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+from prometheus_client import REGISTRY
+
+from event_handler.db.instrumented import InstrumentedDatabase
+from event_handler.db.sqlite import Sqlite
+
+
+def _count(method: str, table: str) -> float:
+    labels = {"method": method, "table": table}
+    return REGISTRY.get_sample_value("event_handler_database_duration_seconds_count", labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_when_instrumented_database_is_called_then_latency_is_recorded_per_method(sqlite: Sqlite):
+    # Arrange
+    database = InstrumentedDatabase(sqlite)
+    table_name = "instrumented_table"
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+    await database.create_table_if_not_exists(table_name=table_name, schema=schema)
+    inserts, selects = _count("insert_data", table_name), _count("select_all_data", table_name)
+
+    # Act
+    key = await database.insert_data(table_name=table_name, data={"value": 42})
+    values = await database.select_all_data(table_name=table_name)
+
+    # Assert
+    assert values == [(key[0], 42)]
+    assert _count("insert_data", table_name) == inserts + 1
+    assert _count("select_all_data", table_name) == selects + 1
+
+
+@pytest.mark.asyncio
+async def test_when_instrumented_database_is_iterated_then_every_chunk_is_recorded(sqlite: Sqlite):
+    # Arrange
+    database = InstrumentedDatabase(sqlite)
+    table_name = "iterated_table"
+    await database.create_table_if_not_exists(table_name=table_name, schema="value integer")
+    await database.insert_many(table_name=table_name, data=[{"value": i} for i in range(5)])
+    chunks = _count("iterate_data", table_name)
+
+    # Act
+    values = [value async for chunk in database.iterate_data(table_name=table_name, chunk_size=2) for value in chunk]
+
+    # Assert
+    assert values == [(i,) for i in range(5)]
+    assert _count("iterate_data", table_name) == chunks + 4  # three chunks and the end of the iteration
+
+
+@pytest.mark.asyncio
+async def test_when_call_exceeds_slow_query_threshold_then_statement_is_logged(sqlite: Sqlite, caplog):
+    # Arrange
+    database = InstrumentedDatabase(sqlite, slow_query_threshold_in_s=0)
+    table_name = "slow_table"
+    await database.create_table_if_not_exists(table_name=table_name, schema="value integer")
+
+    # Act
+    await database.select_all_data_by_key_and_value(table_name=table_name, key="value", value=42)
+
+    # Assert
+    assert "SELECT * FROM slow_table WHERE value = ?;" in caplog.text
+    assert "42" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_when_slow_call_fails_then_its_error_is_raised_and_logged(sqlite: Sqlite, caplog):
+    # Arrange
+    database = InstrumentedDatabase(sqlite, slow_query_threshold_in_s=0)
+    failures = _count("select_all_data", "missing_table")
+
+    # Act
+    with pytest.raises(sqlite3.OperationalError):
+        await database.select_all_data(table_name="missing_table")
+
+    # Assert
+    assert _count("select_all_data", "missing_table") == failures + 1
+    assert "Slow query: select_all_data on missing_table" in caplog.text
@@ -0,0 +1,112 @@
+import shutil
+
+import pytest
+import pytest_asyncio
+
+from event_handler.db.postgresql import Postgresql
+from event_handler.repositories import migrations
+
+pytest.importorskip("pytest_postgresql")
+if shutil.which("pg_ctl") is None:
+    pytest.skip("PostgreSQL is not installed.", allow_module_level=True)
+
+from pytest_postgresql import factories  # noqa: E402
+
+postgresql_proc = factories.postgresql_proc(executable=shutil.which("pg_ctl"))
+postgresql = factories.postgresql("postgresql_proc")
+
+
+@pytest_asyncio.fixture
+async def postgres(postgresql) -> Postgresql:
+    # SetUp
+    info = postgresql.info
+    db = Postgresql(
+        host=info.host, port=info.port, db_name=info.dbname, user_name=info.user, password=info.password or ""
+    )
+    await db.connect()
+    # Entry
+    yield db
+    # TearDown
+    await db.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_when_rows_are_bulk_inserted_then_keys_are_returned_and_not_reused(postgres: Postgresql):
+    # Arrange
+    table_name = "test_table"
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer, name TEXT"
+    data = [{"value": i, "name": f"name{i}"} for i in range(100)]
+    await postgres.create_table_if_not_exists(table_name=table_name, schema=schema)
+
+    # Act
+    keys = await postgres.bulk_insert(table_name=table_name, data=data)
+    key = await postgres.insert_data(table_name=table_name, data={"value": 100, "name": "name100"})
+    values = await postgres.select_all_data(table_name=table_name)
+
+    # Assert
+    assert keys == list(range(1, 101))
+    assert key[0] == 101
+    assert {value[0]: (value[1], value[2]) for value in values[:100]} == {
+        key: (entry["value"], entry["name"]) for key, entry in zip(keys, data)
+    }
+
+
+@pytest.mark.asyncio
+async def test_when_rows_without_generated_key_are_bulk_inserted_then_rows_are_inserted(postgres: Postgresql):
+    # Arrange
+    table_name = "test_table"
+    schema = "event_id integer NOT NULL, user_id bigint NOT NULL, PRIMARY KEY (event_id, user_id)"
+    data = [{"event_id": 1, "user_id": i} for i in range(10)]
+    await postgres.create_table_if_not_exists(table_name=table_name, schema=schema)
+
+    # Act
+    keys = await postgres.bulk_insert(table_name=table_name, data=data, key=None)
+    values = await postgres.select_all_data(table_name=table_name)
+
+    # Assert
+    assert keys == []
+    assert sorted(values) == [(1, i) for i in range(10)]
+
+
+@pytest.mark.asyncio
+async def test_when_rows_with_keys_are_inserted_and_sequence_advanced_then_next_key_follows(postgres: Postgresql):
+    # Arrange
+    table_name = "test_table"
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+    await postgres.create_table_if_not_exists(table_name=table_name, schema=schema)
+    await postgres.insert_many(table_name=table_name, data=[{"id": 41, "value": 1}], ignore_duplicates=True)
+
+    # Act
+    await postgres.advance_key_sequence(table_name=table_name)
+    key = await postgres.insert_data(table_name=table_name, data={"value": 2})
+
+    # Assert
+    assert key[0] == 42
+
+
+@pytest.mark.asyncio
+async def test_when_connection_is_used_then_pool_stats_count_it(postgres: Postgresql):
+    # Arrange
+    table_name = "test_table"
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+
+    # Act
+    await postgres.create_table_if_not_exists(table_name=table_name, schema=schema)
+    stats = postgres.pool_stats()
+
+    # Assert
+    assert stats.size >= stats.min_size
+    assert stats.in_use == 0
+    assert stats.requests >= 1
+
+
+@pytest.mark.asyncio
+async def test_when_database_is_migrated_then_schema_version_is_latest(postgres: Postgresql):
+    # Act
+    version = await migrations.migrate(postgres)
+    await migrations.migrate(postgres)
+
+    # Assert
+    assert version == migrations.MIGRATIONS[-1].version
+    assert await migrations.get_schema_version(postgres) == version
+    assert "version" in await postgres.get_column_names(table_name="Events")
@@ -0,0 +1,96 @@
+import pytest
+
+from event_handler.db.query_builder import PostgresQueryBuilder, SqliteQueryBuilder
+
+
+def test_when_statement_is_built_twice_then_cached_statement_is_returned():
+    # Arrange
+    queries = SqliteQueryBuilder()
+
+    # Act
+    first = queries.insert("Users", ("first_name", "last_name"))
+    second = queries.insert("Users", ("first_name", "last_name"))
+
+    # Assert
+    assert first == "INSERT INTO Users (first_name, last_name) VALUES(?, ?);"
+    assert first is second
+
+
+def test_when_update_is_built_then_only_given_columns_are_set_and_version_is_checked():
+    # Arrange
+    queries = SqliteQueryBuilder()
+
+    # Act & Assert
+    assert queries.update("Users", "id", ("email",)) == "UPDATE Users SET email = ? WHERE id = ?;"
+    assert queries.update("Users", "id", ("email", "last_name"), version_key="version", has_version=True) == (
+        "UPDATE Users SET email = ?, last_name = ?, version = version + 1 WHERE id = ? AND version = ?;"
+    )
+
+
+def test_when_statements_are_built_for_postgres_then_psycopg_placeholders_are_used():
+    # Arrange
+    queries = PostgresQueryBuilder()
+
+    # Act & Assert
+    assert queries.insert("Users", ("first_name",), returning="id") == (
+        "INSERT INTO Users (first_name) VALUES(%s) RETURNING id;"
+    )
+    assert queries.delete_by("Users", "id") == "DELETE FROM Users WHERE id = %s;"
+    assert queries.select_in("Users", "id") == "SELECT * FROM Users WHERE id = ANY(%s);"
+    assert queries.increment_in("Users", "id", "version") == (
+        "UPDATE Users SET version = version + 1 WHERE id = ANY(%s);"
+    )
+    assert queries.replace("Users", ("id", "email")) == (
+        "INSERT INTO Users (id, email) VALUES(%s, %s) ON CONFLICT (id) DO UPDATE SET email = EXCLUDED.email;"
+    )
+
+
+def test_when_postgres_table_is_created_then_sqlite_types_are_translated():
+    # Arrange
+    queries = PostgresQueryBuilder()
+
+    # Act
+    query = queries.create_table("Events", "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, time DATETIME NOT NULL")
+
+    # Assert
+    assert query == (
+        "CREATE TABLE IF NOT EXISTS Events "
+        "(id integer GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, time TIMESTAMP NOT NULL);"
+    )
+
+
+def test_when_postgres_bulk_load_statements_are_built_then_keys_are_drawn_from_the_sequence():
+    # Arrange
+    queries = PostgresQueryBuilder()
+
+    # Act & Assert
+    assert queries.allocate_keys("Users", "id") == (
+        "SELECT nextval(pg_get_serial_sequence('Users', 'id')) FROM generate_series(1, %s);"
+    )
+    assert queries.copy_from_stdin("Users", ("id", "email")) == "COPY Users (id, email) FROM STDIN (FORMAT BINARY);"
+    assert queries.select_no_rows("Users", ("id", "email")) == "SELECT id, email FROM Users LIMIT 0;"
+
+
+def test_when_postgres_search_statements_are_built_then_index_and_query_share_the_document():
+    # Arrange
+    queries = PostgresQueryBuilder()
+    document = "to_tsvector('english', coalesce(name, '') || ' ' || coalesce(location, ''))"
+
+    # Act
+    index = queries.create_search_index("Events", "id", ("name", "location"))
+    query = queries.select_page_by_search("Events", "id", ("name", "location"), has_after=True)
+
+    # Assert
+    assert index == f"CREATE INDEX IF NOT EXISTS EventsSearch ON Events USING GIN ({document});"
+    assert f"WHERE {document} @@ query" in query
+    assert query.endswith("WHERE (rank, id) > (%s, %s) ORDER BY rank, id LIMIT %s;")
+
+
+@pytest.mark.parametrize("identifier", ["id='1' OR 1=1", "id;", "Users WHERE 1", ""])
+def test_when_identifier_is_not_plain_then_error_is_raised(identifier: str):
+    # Arrange
+    queries = SqliteQueryBuilder()
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        queries.select_by("Users", identifier)
@@ -1,5 +1,9 @@
+import asyncio
+import sqlite3
+
 import pytest
 
+from event_handler.db.interface import Dependents
 from event_handler.db.sqlite import Sqlite
 
 
@@ -137,3 +141,384 @@ async def test_when_database_is_connected_and_values_and_then_deleted_then_value
 
     # Assert
     assert len(values) == 0
+
+
+@pytest.mark.asyncio
+async def test_when_database_is_connected_and_many_values_inserted_then_keys_and_values_are_valid(sqlite: Sqlite):
+    # Arrange
+    table_name = "test_table"
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+    data = [{"value": 42}, {"value": 1337}, {"value": 9000}]
+    await sqlite.create_table_if_not_exists(table_name=table_name, schema=schema)
+
+    # Act
+    keys = await sqlite.insert_many(table_name=table_name, data=data)
+    values = await sqlite.select_all_data(table_name=table_name)
+
+    # Assert
+    assert keys == [1, 2, 3]
+    assert len(values) == 3
+    for i in range(0, len(data)):
+        assert values[i][0] == keys[i]
+        assert values[i][1] == data[i]["value"]
+
+
+@pytest.mark.asyncio
+async def test_when_many_values_inserted_and_one_is_invalid_then_no_value_is_inserted(sqlite: Sqlite):
+    # Arrange
+    table_name = "test_table"
+    schema = "id text PRIMARY KEY, value integer"
+    data = [{"id": "123ABC", "value": 42}, {"id": "123ABC", "value": 1337}]
+    await sqlite.create_table_if_not_exists(table_name=table_name, schema=schema)
+
+    # Act
+    with pytest.raises(Exception):
+        await sqlite.insert_many(table_name=table_name, data=data)
+    values = await sqlite.select_all_data(table_name=table_name)
+
+    # Assert
+    assert len(values) == 0
+
+
+@pytest.mark.asyncio
+async def test_when_values_inserted_then_values_can_be_fetched_by_multiple_keys_across_chunks(sqlite: Sqlite):
+    # Arrange
+    table_name = "test_table"
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+    data = [{"value": i} for i in range(10)]
+    await sqlite.create_table_if_not_exists(table_name=table_name, schema=schema)
+    keys = await sqlite.insert_many(table_name=table_name, data=data)
+
+    # Act
+    values = await sqlite.select_by_keys(table_name=table_name, key="id", values=keys[:7] + [1000], chunk_size=3)
+
+    # Assert
+    assert sorted(value[0] for value in values) == keys[:7]
+
+
+def test_when_wal_mode_is_used_with_in_memory_database_then_error_is_raised():
+    # Act & Assert
+    with pytest.raises(ValueError):
+        Sqlite(path=":memory:", use_wal=True)
+
+
+@pytest.mark.asyncio
+async def test_when_database_is_in_wal_mode_and_values_written_then_concurrent_readers_see_committed_values(
+    sqlite_wal: Sqlite,
+):
+    # Arrange
+    table_name = "test_table"
+    schema = "id text PRIMARY KEY, value integer"
+    data = [{"id": "123ABC", "value": 42}, {"id": "43123A", "value": 1337}]
+    new_data = {"id": "123ABC", "value": 9000}
+    await sqlite_wal.create_table_if_not_exists(table_name=table_name, schema=schema)
+
+    # Act
+    await sqlite_wal.insert_many(table_name=table_name, data=data)
+    await sqlite_wal.replace_data(table_name=table_name, data=new_data)
+    values = await asyncio.gather(
+        *[
+            sqlite_wal.select_all_data_by_key_and_value(table_name=table_name, key="id", value=entry["id"])
+            for entry in data * 4
+        ]
+    )
+
+    # Assert
+    assert [value[0][1] for value in values] == [9000, 1337] * 4
+
+
+@pytest.mark.asyncio
+async def test_when_values_are_inserted_concurrently_with_group_commit_then_each_caller_gets_its_key(
+    sqlite_group_commit: Sqlite,
+):
+    # Arrange
+    table_name = "test_table"
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+    await sqlite_group_commit.create_table_if_not_exists(table_name=table_name, schema=schema)
+
+    # Act
+    keys = await asyncio.gather(
+        *[sqlite_group_commit.insert_data(table_name=table_name, data={"value": i}) for i in range(50)]
+    )
+    values = await sqlite_group_commit.select_all_data(table_name=table_name)
+
+    # Assert
+    assert sorted(key[0] for key in keys) == list(range(1, 51))
+    assert {value[0]: value[1] for value in values} == {key[0]: i for i, key in enumerate(keys)}
+
+
+@pytest.mark.asyncio
+async def test_when_one_of_concurrent_writes_fails_with_group_commit_then_only_its_caller_gets_the_error(
+    sqlite_group_commit: Sqlite,
+):
+    # Arrange
+    table_name = "test_table"
+    schema = "id text PRIMARY KEY, value integer"
+    data = [{"id": "123ABC", "value": 42}, {"id": "123ABC", "value": 1337}, {"id": "43123A", "value": 9000}]
+    await sqlite_group_commit.create_table_if_not_exists(table_name=table_name, schema=schema)
+
+    # Act
+    results = await asyncio.gather(
+        *[sqlite_group_commit.insert_data(table_name=table_name, data=entry) for entry in data],
+        return_exceptions=True,
+    )
+    values = await sqlite_group_commit.select_all_data(table_name=table_name)
+
+    # Assert
+    assert not isinstance(results[0], Exception)
+    assert isinstance(results[1], Exception)
+    assert not isinstance(results[2], Exception)
+    assert sorted(values) == [("123ABC", 42), ("43123A", 9000)]
+
+
+@pytest.mark.asyncio
+async def test_when_caller_is_cancelled_during_its_write_with_group_commit_then_the_write_is_rolled_back(
+    sqlite_group_commit: Sqlite,
+):
+    # Arrange
+    table_name = "test_table"
+    schema = "id text PRIMARY KEY, value integer"
+    await sqlite_group_commit.create_table_if_not_exists(table_name=table_name, schema=schema)
+    insert = asyncio.ensure_future(sqlite_group_commit.insert_data(table_name=table_name, data={"id": "A", "value": 1}))
+
+    async def insert_and_cancel_caller(conn):
+        await conn.execute(f"INSERT INTO {table_name} (id, value) VALUES ('B', 2);")
+        cancelled.cancel()
+
+    # Act
+    cancelled = asyncio.ensure_future(sqlite_group_commit._write(insert_and_cancel_caller))
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+    await insert
+    values = await sqlite_group_commit.select_all_data(table_name=table_name)
+
+    # Assert
+    assert values == [("A", 1)]
+
+
+@pytest.mark.asyncio
+async def test_when_values_contain_quotes_then_values_are_bound_as_parameters(sqlite: Sqlite):
+    # Arrange
+    table_name = "test_table"
+    schema = "id text PRIMARY KEY, value integer"
+    data = [{"id": "O'Brien", "value": 42}, {"id": "' OR '1'='1", "value": 1337}]
+    await sqlite.create_table_if_not_exists(table_name=table_name, schema=schema)
+    await sqlite.insert_many(table_name=table_name, data=data)
+
+    # Act
+    values = await sqlite.select_all_data_by_key_and_value(table_name=table_name, key="id", value=data[1]["id"])
+    await sqlite.delete_data_by_key_and_value(table_name=table_name, key="id", value=data[0]["id"])
+
+    # Assert
+    assert values == [(data[1]["id"], data[1]["value"])]
+    assert await sqlite.select_all_data(table_name=table_name) == [(data[1]["id"], data[1]["value"])]
+
+
+@pytest.mark.asyncio
+async def test_when_values_inserted_then_values_can_be_iterated_in_chunks(sqlite: Sqlite):
+    # Arrange
+    table_name = "test_table"
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+    data = [{"value": i} for i in range(7)]
+    await sqlite.create_table_if_not_exists(table_name=table_name, schema=schema)
+    keys = await sqlite.insert_many(table_name=table_name, data=data)
+
+    # Act
+    chunks = [chunk async for chunk in sqlite.iterate_data(table_name=table_name, chunk_size=3)]
+
+    # Assert
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [value[0] for chunk in chunks for value in chunk] == keys
+
+
+@pytest.mark.asyncio
+async def test_when_database_is_in_wal_mode_and_values_iterated_then_readers_remain_available(sqlite_wal: Sqlite):
+    # Arrange
+    table_name = "test_table"
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+    await sqlite_wal.create_table_if_not_exists(table_name=table_name, schema=schema)
+    keys = await sqlite_wal.insert_many(table_name=table_name, data=[{"value": i} for i in range(5)])
+
+    # Act
+    values = []
+    async for chunk in sqlite_wal.iterate_data(table_name=table_name, chunk_size=2):
+        values.extend(await sqlite_wal.select_by_keys(table_name=table_name, key="id", values=[v[0] for v in chunk]))
+
+    # Assert
+    assert [value[0] for value in values] == keys
+
+
+@pytest.mark.asyncio
+async def test_when_values_are_bulk_inserted_then_keys_are_returned_only_for_generated_keys(sqlite: Sqlite):
+    # Arrange
+    schema = "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+    await sqlite.create_table_if_not_exists(table_name="with_key", schema=schema)
+    await sqlite.create_table_if_not_exists(table_name="without_key", schema="value integer")
+
+    # Act
+    keys = await sqlite.bulk_insert(table_name="with_key", data=[{"value": 42}, {"value": 1337}])
+    no_keys = await sqlite.bulk_insert(table_name="without_key", data=[{"value": 42}], key=None)
+
+    # Assert
+    assert keys == [1, 2]
+    assert no_keys == []
+    assert await sqlite.select_all_data(table_name="without_key") == [(42,)]
+
+
+@pytest.mark.asyncio
+async def test_when_values_are_bulk_inserted_with_dependents_then_all_or_no_rows_are_inserted(sqlite: Sqlite):
+    """Test that dependent rows reference the keys of their rows and are rolled back with them on error."""
+    # Arrange
+    await sqlite.create_table_if_not_exists(
+        table_name="parent", schema="id integer NOT NULL PRIMARY KEY AUTOINCREMENT, value integer"
+    )
+    await sqlite.create_table_if_not_exists(
+        table_name="child", schema="parent_id integer NOT NULL, value integer CHECK (value < 100)"
+    )
+
+    # Act
+    keys = await sqlite.bulk_insert(
+        table_name="parent",
+        data=[{"value": 1}, {"value": 2}],
+        dependents=Dependents(table_name="child", foreign_key="parent_id", data=[[{"value": 10}, {"value": 11}], []]),
+    )
+    with pytest.raises(sqlite3.IntegrityError):
+        await sqlite.bulk_insert(
+            table_name="parent",
+            data=[{"value": 3}],
+            dependents=Dependents(table_name="child", foreign_key="parent_id", data=[[{"value": 1000}]]),
+        )
+
+    # Assert
+    assert keys == [1, 2]
+    assert await sqlite.select_all_data(table_name="parent") == [(1, 1), (2, 2)]
+    assert await sqlite.select_all_data(table_name="child") == [(1, 10), (1, 11)]
+
+
+@pytest.mark.asyncio
+async def test_when_rows_are_selected_then_columns_can_be_read_by_name(sqlite: Sqlite):
+    """Test that selected rows are named tuples of the columns of the table."""
+    # Arrange
+    table_name = "named_table"
+    await sqlite.create_table_if_not_exists(table_name=table_name, schema="id integer PRIMARY KEY, value integer")
+    await sqlite.insert_data(table_name=table_name, data={"id": 1, "value": 42})
+
+    # Act
+    rows = await sqlite.select_all_data(table_name=table_name)
+
+    # Assert
+    assert rows == [(1, 42)]
+    assert (rows[0].id, rows[0].value) == (1, 42)
+
+
+@pytest.mark.asyncio
+async def test_when_column_is_added_and_incremented_then_only_matching_rows_are_incremented(sqlite: Sqlite):
+    """Test that an added column takes its default and is incremented for the rows matching the keys."""
+    # Arrange
+    table_name = "versioned_table"
+    await sqlite.create_table_if_not_exists(table_name=table_name, schema="id integer PRIMARY KEY")
+    await sqlite.insert_many(table_name=table_name, data=[{"id": id} for id in range(1, 8)])
+
+    # Act
+    await sqlite.add_column(table_name=table_name, column="version", definition="integer NOT NULL DEFAULT 1")
+    await sqlite.increment_by_keys(
+        table_name=table_name, key="id", values=[1, 3, 4, 5, 6], column="version", chunk_size=4
+    )
+    await sqlite.increment_by_keys(table_name=table_name, key="id", values=[1], column="version")
+
+    # Assert
+    rows = await sqlite.select_all_data(table_name=table_name)
+    assert [row.version for row in rows] == [3, 1, 2, 2, 2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_when_column_is_renamed_then_its_values_are_read_by_the_new_name(sqlite: Sqlite):
+    """Test that a renamed column keeps its values."""
+    # Arrange
+    table_name = "renamed_table"
+    await sqlite.create_table_if_not_exists(table_name=table_name, schema="id integer PRIMARY KEY, value integer")
+    await sqlite.insert_data(table_name=table_name, data={"id": 1, "value": 42})
+
+    # Act
+    await sqlite.rename_column(table_name=table_name, column="value", new_name="renamed_value")
+
+    # Assert
+    assert await sqlite.get_column_names(table_name=table_name) == ["id", "renamed_value"]
+    assert (await sqlite.select_all_data(table_name=table_name))[0].renamed_value == 42
+
+
+@pytest.mark.asyncio
+async def test_when_row_is_updated_with_version_then_only_the_expected_version_is_updated(sqlite: Sqlite):
+    """Test that an update writes only the given columns and fails if the row has another version."""
+    # Arrange
+    table_name = "updated_table"
+    await sqlite.create_table_if_not_exists(
+        table_name=table_name, schema="id integer PRIMARY KEY, name TEXT, note TEXT, version integer NOT NULL DEFAULT 1"
+    )
+    await sqlite.insert_data(table_name=table_name, data={"id": 1, "name": "first", "note": "kept"})
+
+    # Act
+    first = await sqlite.update_data(
+        table_name=table_name, key="id", value=1, data={"name": "second"}, version_key="version", version=1
+    )
+    stale = await sqlite.update_data(
+        table_name=table_name, key="id", value=1, data={"name": "stale"}, version_key="version", version=1
+    )
+    missing = await sqlite.update_data(table_name=table_name, key="id", value=2, data={"name": "missing"})
+
+    # Assert
+    assert (first, stale, missing) == (True, False, False)
+    assert await sqlite.select_all_data(table_name=table_name) == [(1, "second", "kept", 2)]
+
+
+@pytest.mark.asyncio
+async def test_when_rows_are_written_then_search_index_stays_in_sync(sqlite: Sqlite):
+    """Test that inserted, replaced, updated and deleted rows are found, updated and removed in the search index."""
+    # Arrange
+    table_name = "searched_table"
+    await sqlite.create_table_if_not_exists(
+        table_name=table_name, schema="id integer NOT NULL PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL"
+    )
+    await sqlite.insert_data(table_name=table_name, data={"title": "Dancing at the harbour"})
+    await sqlite.create_search_index_if_not_exists(table_name=table_name, key="id", columns=["title"])
+    await sqlite.insert_many(table_name=table_name, data=[{"title": "Dance night"}, {"title": "Jazz night"}])
+
+    # Act
+    await sqlite.replace_data(table_name=table_name, data={"id": 3, "title": "Jazz and dance"})
+    await sqlite.delete_data_by_key_and_value(table_name=table_name, key="id", value=2)
+    await sqlite.update_data(table_name=table_name, key="id", value=1, data={"title": "Harbour tour"})
+    dance = await sqlite.select_page_by_search(table_name=table_name, key="id", columns=["title"], text="dance")
+    night = await sqlite.select_page_by_search(table_name=table_name, key="id", columns=["title"], text="night")
+    tour = await sqlite.select_page_by_search(table_name=table_name, key="id", columns=["title"], text="tour")
+
+    # Assert
+    assert [row.id for row in dance] == [3]
+    assert night == []
+    assert [row.id for row in tour] == [1]
+
+
+@pytest.mark.asyncio
+async def test_when_search_is_paged_then_rows_are_ordered_by_rank_and_key(sqlite: Sqlite):
+    """Test that a search returns the best matches first and continues after the (rank, key) of the last row."""
+    # Arrange
+    table_name = "ranked_table"
+    await sqlite.create_table_if_not_exists(
+        table_name=table_name, schema="id integer NOT NULL PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL"
+    )
+    await sqlite.create_search_index_if_not_exists(table_name=table_name, key="id", columns=["title"])
+    titles = ["party", "party party party", "quiet evening", 'party "AND" OR', "party party"]
+    await sqlite.insert_many(table_name=table_name, data=[{"title": title} for title in titles])
+
+    # Act
+    first = await sqlite.select_page_by_search(
+        table_name=table_name, key="id", columns=["title"], text="party", limit=2
+    )
+    rest = await sqlite.select_page_by_search(
+        table_name=table_name, key="id", columns=["title"], text="party", after=(first[-1].rank, first[-1].id)
+    )
+    syntax = await sqlite.select_page_by_search(table_name=table_name, key="id", columns=["title"], text='"AND" OR')
+
+    # Assert
+    assert [row.id for row in first + rest] == [2, 5, 1, 4]
+    assert [row.rank for row in first + rest] == sorted(row.rank for row in first + rest)
+    assert [row.id for row in syntax] == [4]
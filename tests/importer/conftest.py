@@ -0,0 +1,17 @@
+import pytest_asyncio
+
+from event_handler.db.interface import Database
+from event_handler.db.sqlite import Sqlite
+from event_handler.repositories import migrations
+
+
+@pytest_asyncio.fixture
+async def database() -> Database:
+    # SetUp
+    db = Sqlite(path=":memory:")
+    await db.connect()
+    await migrations.migrate(db)
+    # Entry
+    yield db
+    # TearDown
+    await db.disconnect()
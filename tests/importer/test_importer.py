@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import pytest
+
+from event_handler.db.interface import Database
+from event_handler.importer import InvalidRowError, import_file
+from event_handler.models.user import User
+from event_handler.repositories.event_repo import EventRepository
+from event_handler.repositories.user_repo import UserRepository
+
+
+@pytest.mark.asyncio
+async def test_when_files_are_imported_twice_then_rows_are_not_duplicated(database: Database, tmp_path: Path):
+    """Test that importing the same files again, e.g. to resume an import, skips the existing rows."""
+    # Arrange
+    users = tmp_path / "users.csv"
+    users.write_text("id,first_name,last_name,email\n1,Son,Goku,goku@email.com\n2,Son,Gohan,gohan@email.com\n")
+    events = tmp_path / "events.ndjson"
+    events.write_text(
+        '{"id": 7, "name": "Party", "time": "2024-01-01T20:00:00Z", "location": "Here", "description": "Dance",'
+        ' "attendees": [1]}\n'
+    )
+    attendance = tmp_path / "attendance.csv"
+    attendance.write_text("event_id,user_id\n7,2\n")
+
+    # Act
+    for _ in range(2):
+        await import_file(database, "users", users, batch_size=1)
+        await import_file(database, "events", events)
+        progress = await import_file(database, "attendance", attendance)
+
+    # Assert
+    assert progress.rows == 1
+    assert [user.last_name for user in await UserRepository(db=database).get_users(ids=[1, 2])] == ["Goku", "Gohan"]
+    event = await EventRepository(db=database).get_event(id=7)
+    assert event.name == "Party"
+    assert event.attendees == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_when_users_are_imported_then_created_users_get_the_next_id(database: Database, tmp_path: Path):
+    """Test that users created after an import do not reuse the imported ids."""
+    # Arrange
+    users = tmp_path / "users.ndjson"
+    users.write_text('{"id": 41, "first_name": "Son", "last_name": "Goku", "email": "goku@email.com"}\n')
+    await import_file(database, "users", users)
+
+    # Act
+    id = await UserRepository(db=database).create_user(User(first_name="Son", last_name="Gohan", email="g@email.com"))
+
+    # Assert
+    assert id == 42
+
+
+@pytest.mark.asyncio
+async def test_when_row_is_invalid_then_previous_batches_are_imported(database: Database, tmp_path: Path):
+    """Test that an invalid row stops the import after the batches before it were committed."""
+    # Arrange
+    users = tmp_path / "users.csv"
+    users.write_text("id,first_name,last_name,email\n1,Son,Goku,goku@email.com\n2,Son\n")
+
+    # Act
+    with pytest.raises(InvalidRowError, match="users.csv:3"):
+        await import_file(database, "users", users, batch_size=1)
+
+    # Assert
+    assert [user.id for user in await UserRepository(db=database).get_users(ids=[1, 2])] == [1]
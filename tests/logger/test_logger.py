@@ -0,0 +1,60 @@
+import json
+import logging
+
+from event_handler import tracing
+from event_handler.logger import ContextFilter, JsonFormatter, SamplingFilter
+
+
+def _record(message: str, *args, level: int = logging.INFO, **fields) -> logging.LogRecord:
+    record = logging.LogRecord("test", level, __file__, 1, message, args, None)
+    record.__dict__.update(fields)
+    return record
+
+
+def test_when_record_has_fields_then_they_are_formatted_next_to_message():
+    # Arrange
+    record = _record("Created new event at id=%s.", 7, event_id=7)
+
+    # Act
+    line = json.loads(JsonFormatter().format(record))
+
+    # Assert
+    assert line == {"event_handler": "Created new event at id=7.", "level": "INFO", "event_id": 7}
+
+
+def test_when_logged_within_request_then_path_and_trace_are_added():
+    # Arrange
+    record = _record("Created user at id=%s.", 1)
+
+    # Act
+    with tracing.start_span("PUT /users", **{"http.target": "/users"}) as span:
+        with tracing.start_span("UserRepository.create_user"):
+            ContextFilter().filter(record)
+
+    # Assert
+    assert record.path == "/users"
+    assert record.trace_id == f"{span.trace_id:032x}"
+    assert record.elapsed_in_ms >= 0
+
+
+def test_when_message_is_sampled_then_share_of_records_is_kept():
+    # Arrange
+    sampling_filter = SamplingFilter({"Created user at id=%s.": 0.1})
+
+    # Act
+    kept = sum(sampling_filter.filter(_record("Created user at id=%s.", id)) for id in range(10000))
+
+    # Assert
+    assert 500 < kept < 1500
+    assert sampling_filter.filter(_record("Created %d users.", 10))
+
+
+def test_when_sampled_message_is_warning_then_it_is_always_kept():
+    # Arrange
+    sampling_filter = SamplingFilter({"Slow query": 0.0})
+
+    # Act
+    is_kept = sampling_filter.filter(_record("Slow query", level=logging.WARNING))
+
+    # Assert
+    assert is_kept
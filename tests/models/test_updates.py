@@ -0,0 +1,21 @@
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from event_handler.models.event import EventUpdate
+from event_handler.models.user import UserUpdate
+
+
+@pytest.mark.parametrize("model", [EventUpdate, UserUpdate])
+@pytest.mark.parametrize("body", ["{}", '{"name": null, "first_name": null}'])
+def test_when_update_has_no_field_set_then_error_is_raised(model: type[BaseModel], body: str):
+    # Act & Assert
+    with pytest.raises(ValidationError, match="At least one field must be set"):
+        model.model_validate_json(body)
+
+
+def test_when_update_has_a_field_set_then_only_that_field_is_dumped():
+    # Act
+    update = EventUpdate.model_validate_json('{"name": null, "location": "Harbour"}')
+
+    # Assert
+    assert update.model_dump(exclude_unset=True, exclude_none=True) == {"location": "Harbour"}
@@ -1,10 +1,12 @@
-from datetime import datetime
+import sqlite3
+from datetime import datetime, timezone
 
 import pytest
 
+from event_handler.cache.lru import LruCache
 from event_handler.db.interface import Database
-from event_handler.models.event import Event
-from event_handler.repositories.event_repo import EventRepository
+from event_handler.models.event import Attendance, Event, EventUpdate
+from event_handler.repositories.event_repo import EventRepository, InvalidCursorError
 
 
 @pytest.mark.asyncio
@@ -126,3 +128,375 @@ async def test_when_events_are_inserted_and_attendees_are_added_then_event_is_va
     # Assert
     event = await repo.get_event(id=id)
     assert event.attendees == set(attendees)
+
+
+@pytest.mark.asyncio
+async def test_when_events_are_inserted_in_batch_then_events_can_be_fetched_by_returned_ids(database: Database):
+    """Test that events inserted in a batch can be fetched by the returned ids."""
+    # Arrange
+    repo = EventRepository(db=database)
+    events = [
+        Event(name=f"Partytime{i}", time=datetime.now(), location="Reeperbahn", description="Dance and drink")
+        for i in range(5)
+    ]
+    await repo.create_repository()
+
+    # Act
+    ids = await repo.create_events(events=events)
+
+    # Assert
+    assert ids == [1, 2, 3, 4, 5]
+    for id, event in zip(ids, events):
+        fetched_event = await repo.get_event(id=id)
+        assert fetched_event.name == event.name
+
+
+@pytest.mark.asyncio
+async def test_when_attendees_of_event_cannot_be_inserted_then_event_is_not_inserted(database: Database):
+    """Test that an event is rolled back together with its attendees."""
+    # Arrange
+    await database.create_table_if_not_exists(
+        table_name="EventAttendees",
+        schema="event_id integer NOT NULL, user_id integer NOT NULL CHECK (user_id < 100)",
+    )
+    repo = EventRepository(db=database)
+    await repo.create_repository()
+    event = Event(name="Party", time=datetime.now(), location="Reeperbahn", description="Dancing", attendees={1, 1000})
+
+    # Act
+    with pytest.raises(sqlite3.IntegrityError):
+        await repo.create_event(event=event)
+
+    # Assert
+    assert await database.select_all_data(table_name="Events") == []
+    assert await database.select_all_data(table_name="EventAttendees") == []
+
+
+@pytest.mark.asyncio
+async def test_when_attendees_of_batch_cannot_be_inserted_then_no_event_is_inserted(database: Database):
+    """Test that events inserted in a batch are rolled back together with their attendees."""
+    # Arrange
+    await database.create_table_if_not_exists(
+        table_name="EventAttendees",
+        schema="event_id integer NOT NULL, user_id integer NOT NULL CHECK (user_id < 100)",
+    )
+    repo = EventRepository(db=database)
+    await repo.create_repository()
+    events = [
+        Event(name="Party", time=datetime.now(), location="Reeperbahn", description="Dancing", attendees={1}),
+        Event(name="Concert", time=datetime.now(), location="Harbour", description="Jazz", attendees={1000}),
+    ]
+
+    # Act
+    with pytest.raises(sqlite3.IntegrityError):
+        await repo.create_events(events=events)
+
+    # Assert
+    assert await database.select_all_data(table_name="Events") == []
+    assert await database.select_all_data(table_name="EventAttendees") == []
+
+
+@pytest.mark.asyncio
+async def test_when_version_cannot_be_incremented_then_no_attendee_is_added(database: Database):
+    """Test that attendees are rolled back together with the version of their event."""
+    # Arrange
+    repo = EventRepository(db=database)
+    await repo.create_repository()
+    event = Event(name="Party", time=datetime.now(), location="Reeperbahn", description="Dancing", attendees={1})
+    id = await repo.create_event(event=event)
+    await database._write(
+        lambda conn: conn.execute(
+            "CREATE TRIGGER FailVersion BEFORE UPDATE OF version ON Events BEGIN SELECT RAISE(ABORT, 'failed'); END;"
+        )
+    )
+
+    # Act
+    with pytest.raises(sqlite3.IntegrityError):
+        await repo.add_attendees_to_event(id=id, attendees=[2, 3])
+
+    # Assert
+    assert (await repo.get_event(id=id)).attendees == {1}
+    assert await repo.get_event_version(id=id) == 1
+
+
+@pytest.mark.asyncio
+async def test_when_event_cannot_be_deleted_then_its_attendees_are_kept(database: Database):
+    """Test that the attendees of an event are deleted in the transaction deleting the event."""
+    # Arrange
+    repo = EventRepository(db=database)
+    await repo.create_repository()
+    event = Event(name="Party", time=datetime.now(), location="Reeperbahn", description="Dancing", attendees={1, 2})
+    id = await repo.create_event(event=event)
+    await database._write(
+        lambda conn: conn.execute(
+            "CREATE TRIGGER FailDelete BEFORE DELETE ON Events BEGIN SELECT RAISE(ABORT, 'failed'); END;"
+        )
+    )
+
+    # Act
+    with pytest.raises(sqlite3.IntegrityError):
+        await repo.delete_event(id=id)
+
+    # Assert
+    assert (await repo.get_event(id=id)).attendees == {1, 2}
+
+
+@pytest.mark.asyncio
+async def test_when_events_are_fetched_by_multiple_ids_then_found_events_are_returned_in_order(database: Database):
+    """Test that fetching multiple events returns the found events in the order of the requested ids."""
+    # Arrange
+    repo = EventRepository(db=database)
+    events = [
+        Event(name=f"Partytime{i}", time=datetime.now(), location="Reeperbahn", description="Dance and drink")
+        for i in range(5)
+    ]
+    await repo.create_repository()
+    await repo.create_events(events=events)
+
+    # Act
+    fetched_events = await repo.get_events(ids=[5, 42, 1])
+
+    # Assert
+    assert [event.id for event in fetched_events] == [5, 1]
+    assert [event.name for event in fetched_events] == ["Partytime4", "Partytime0"]
+
+
+@pytest.mark.asyncio
+async def test_when_attendees_are_added_multiple_times_then_attendees_are_accumulated(database: Database):
+    """Test that adding attendees keeps the previously added attendees and ignores duplicates."""
+    # Arrange
+    repo = EventRepository(db=database)
+    event = Event(
+        name="Partytime", time=datetime.now(), location="Reeperbahn", description="Dance and drink", attendees={7}
+    )
+    await repo.create_repository()
+    id = await repo.create_event(event=event)
+
+    # Act
+    await repo.add_attendees_to_event(id=id, attendees=[1, 2])
+    await repo.add_attendees_to_event(id=id, attendees=[2, 3])
+
+    # Assert
+    event = await repo.get_event(id=id)
+    assert event.attendees == {1, 2, 3, 7}
+
+
+@pytest.mark.asyncio
+async def test_when_attendees_are_added_or_imported_then_version_of_event_is_incremented(database: Database):
+    """Test that the version of an event changes whenever its attendees change and only then."""
+    # Arrange
+    repo = EventRepository(db=database, cache=LruCache(max_size=10, ttl_in_s=60))
+    await repo.create_repository()
+    event = Event(name="Party", time=datetime.now(), location="Reeperbahn", description="Dancing")
+    ids = await repo.create_events(events=[event, event])
+
+    # Act
+    created = await repo.get_event_version(id=ids[0])
+    await repo.add_attendees_to_event(id=ids[0], attendees=[1])
+    added = await repo.get_event_version(id=ids[0])
+    await repo.import_attendances([Attendance(event_id=ids[0], user_id=2)])
+
+    # Assert
+    assert (created, added) == (1, 2)
+    assert (await repo.get_event(id=ids[0])).version == 3
+    assert await repo.get_event_version(id=ids[1]) == 1
+    assert await repo.get_event_version(id=42) is None
+
+
+@pytest.mark.asyncio
+async def test_when_event_is_updated_concurrently_then_only_the_first_update_succeeds(database: Database):
+    """Test that updates based on the same version conflict and submitted fields are the only ones changed."""
+    # Arrange
+    repo = EventRepository(db=database, cache=LruCache(max_size=10, ttl_in_s=60))
+    await repo.create_repository()
+    time = datetime(2024, 1, 1, 20, tzinfo=timezone.utc)
+    id = await repo.create_event(
+        Event(name="Party", time=time, location="Reeperbahn", description="Dancing", attendees={1})
+    )
+    await repo.get_event(id=id)
+
+    # Act
+    first = await repo.update_event(id=id, event=EventUpdate(location="Harbour", name=None), version=1)
+    second = await repo.update_event(id=id, event=EventUpdate(location="Elbe"), version=1)
+    missing = await repo.update_event(id=42, event=EventUpdate(location="Elbe"), version=1)
+
+    # Assert
+    assert (first, second, missing) == (2, None, None)
+    event = await repo.get_event(id=id)
+    assert (event.name, event.time, event.location) == ("Party", time, "Harbour")
+    assert (event.attendees, event.version) == ({1}, 2)
+
+
+@pytest.mark.asyncio
+async def test_when_user_attends_events_then_events_for_user_are_paginated_by_id(database: Database):
+    """Test that the events attended by a user are returned page by page."""
+    # Arrange
+    repo = EventRepository(db=database)
+    events = [
+        Event(name=f"Partytime{i}", time=datetime.now(), location="Reeperbahn", description="", attendees={i % 2})
+        for i in range(7)
+    ]
+    await repo.create_repository()
+    await repo.create_events(events=events)
+
+    # Act
+    first_page = await repo.get_events_for_user(user_id=0, limit=3)
+    second_page = await repo.get_events_for_user(user_id=0, after=first_page[-1].id, limit=3)
+    third_page = await repo.get_events_for_user(user_id=0, after=second_page[-1].id, limit=3)
+
+    # Assert
+    assert [event.id for event in first_page] == [1, 3, 5]
+    assert [event.id for event in second_page] == [7]
+    assert third_page == []
+
+
+@pytest.mark.asyncio
+async def test_when_cached_event_is_updated_or_deleted_then_cache_is_invalidated(database: Database):
+    """Test that writes through the repository invalidate the cached event."""
+    # Arrange
+    cache = LruCache(max_size=10, ttl_in_s=60)
+    repo = EventRepository(db=database, cache=cache)
+    event = Event(name="Partytime", time=datetime.now(), location="Reeperbahn", description="Dance and drink")
+    await repo.create_repository()
+    id = await repo.create_event(event=event)
+
+    # Act
+    await repo.get_event(id=id)
+    cached_event = await repo.get_event(id=id)
+
+    # Assert
+    assert cache.stats().hits == 1
+    assert cached_event.attendees == set()
+
+    # Act
+    await repo.add_attendees_to_event(id=id, attendees=[1])
+
+    # Assert
+    assert (await repo.get_event(id=id)).attendees == {1}
+
+    # Act
+    await repo.delete_event(id=id)
+
+    # Assert
+    assert await repo.get_event(id=id) is None
+
+
+@pytest.mark.asyncio
+async def test_when_events_are_listed_by_time_range_then_pages_are_ordered_by_time_and_id(database: Database):
+    """Test that listing events returns the events within the time range page by page."""
+    # Arrange
+    repo = EventRepository(db=database)
+    times = [datetime(2024, 1, day % 4 + 1, tzinfo=timezone.utc) for day in range(10)]
+    await repo.create_repository()
+    await repo.create_events(
+        events=[Event(name="Partytime", time=time, location="Reeperbahn", description="") for time in times]
+    )
+
+    # Act
+    events = []
+    page = await repo.list_events(start=datetime(2024, 1, 2), end=datetime(2024, 1, 4), limit=3)
+    events.extend(page.events)
+    while page.next_cursor is not None:
+        page = await repo.list_events(
+            start=datetime(2024, 1, 2), end=datetime(2024, 1, 4), cursor=page.next_cursor, limit=3
+        )
+        events.extend(page.events)
+
+    # Assert
+    assert [(event.time.day, event.id) for event in events] == [(2, 2), (2, 6), (2, 10), (3, 3), (3, 7)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cursor", ["invalid", "YWJj", "YTpi"])
+async def test_when_events_are_listed_or_searched_with_invalid_cursor_then_error_is_raised(
+    database: Database, cursor: str
+):
+    """Test that cursors that are no base64, have no separator or no numbers are rejected."""
+    # Arrange
+    repo = EventRepository(db=database)
+    await repo.create_repository()
+
+    # Act & Assert
+    with pytest.raises(InvalidCursorError):
+        await repo.list_events(cursor=cursor)
+    with pytest.raises(InvalidCursorError):
+        await repo.search_events(query="party", cursor=cursor)
+
+
+@pytest.mark.asyncio
+async def test_when_events_are_searched_then_index_follows_creates_attendees_and_deletes(database: Database):
+    """Test that searching finds created events with their attendees and no longer finds deleted events."""
+    # Arrange
+    repo = EventRepository(db=database)
+    await repo.create_repository()
+    await repo.create_search_index()
+    concert = await repo.create_event(
+        Event(name="Concert", time=datetime.now(), location="Harbour", description="Jazz by the water")
+    )
+    party = await repo.create_event(
+        Event(name="Harbour party", time=datetime.now(), location="Reeperbahn", description="Dancing")
+    )
+
+    # Act
+    await repo.add_attendees_to_event(id=concert, attendees=[1, 2])
+    before = await repo.search_events(query="harbour")
+    await repo.delete_event(id=party)
+    after = await repo.search_events(query="harbour")
+
+    # Assert
+    assert {event.id for event in before.events} == {concert, party}
+    assert [(event.id, event.attendees) for event in after.events] == [(concert, {1, 2})]
+
+
+@pytest.mark.asyncio
+async def test_when_search_is_paged_then_every_match_is_returned_once(database: Database):
+    """Test that following the cursors of a search returns each matching event exactly once."""
+    # Arrange
+    repo = EventRepository(db=database)
+    await repo.create_repository()
+    await repo.create_search_index()
+    await repo.create_events(
+        events=[
+            Event(name="Party " * (i % 3 + 1), time=datetime.now(), location="Reeperbahn", description=str(i))
+            for i in range(7)
+        ]
+    )
+
+    # Act
+    ids = []
+    page = await repo.search_events(query="parties", limit=3)
+    ids.extend(event.id for event in page.events)
+    while page.next_cursor is not None:
+        page = await repo.search_events(query="parties", cursor=page.next_cursor, limit=3)
+        ids.extend(event.id for event in page.events)
+
+    # Assert
+    assert sorted(ids) == list(range(1, 8))
+    assert (await repo.search_events(query="   ")).events == []
+
+
+@pytest.mark.asyncio
+async def test_when_events_are_iterated_then_all_events_are_returned_with_their_attendees(database: Database):
+    """Test that iterating the events returns every event in chunks together with its attendees."""
+    # Arrange
+    repo = EventRepository(db=database)
+    events = [
+        Event(
+            name=f"Partytime{i}",
+            time=datetime.now(),
+            location="Reeperbahn",
+            description="Dance and drink",
+            attendees={i, i + 1},
+        )
+        for i in range(5)
+    ]
+    await repo.create_repository()
+    ids = await repo.create_events(events=events)
+
+    # Act
+    chunks = [chunk async for chunk in repo.iterate_events(chunk_size=2)]
+
+    # Assert
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [event.id for chunk in chunks for event in chunk] == ids
+    assert [event.attendees for chunk in chunks for event in chunk] == [event.attendees for event in events]
@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from event_handler.db.interface import Database
+from event_handler.db.sqlite import Sqlite
+from event_handler.repositories import migrations
+from event_handler.repositories.event_repo import EventRepository
+from event_handler.repositories.user_repo import UserRepository
+
+
+@pytest.mark.asyncio
+async def test_when_database_is_migrated_then_schema_version_is_latest(database: Database):
+    """Test that migrating a new database applies all migrations."""
+    # Act
+    version = await migrations.migrate(database)
+
+    # Assert
+    assert version == migrations.MIGRATIONS[-1].version
+    assert await migrations.get_schema_version(database) == version
+    assert await database.get_column_names(table_name="Users") != []
+    assert await database.get_column_names(table_name="Events") != []
+
+
+@pytest.mark.asyncio
+async def test_when_database_is_migrated_then_tables_match_the_latest_schema(database: Database):
+    """Test that the migrations produce the same columns as the schema of the repositories."""
+    # Arrange
+    latest = Sqlite(path=":memory:")
+    await latest.connect()
+    await UserRepository(db=latest).create_repository()
+    await EventRepository(db=latest).create_repository()
+
+    # Act
+    await migrations.migrate(database)
+
+    # Assert
+    for table_name in ("Users", "Events", "EventAttendees"):
+        expected = await latest.get_column_names(table_name=table_name)
+        assert sorted(await database.get_column_names(table_name=table_name)) == sorted(expected)
+    await latest.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_when_database_is_migrated_twice_then_migrations_are_applied_once(database: Database):
+    """Test that migrations already applied to the database are skipped."""
+    # Arrange
+    await migrations.migrate(database)
+
+    # Act
+    await migrations.migrate(database)
+
+    # Assert
+    versions = await database.select_all_data(table_name="SchemaVersion")
+    assert [version[0] for version in versions] == [migration.version for migration in migrations.MIGRATIONS]
+
+
+@pytest.mark.asyncio
+async def test_when_database_has_legacy_events_then_attendees_and_times_are_migrated(database: Database):
+    """Test that attendees stored as comma-separated string and times stored as text are migrated."""
+    # Arrange
+    time = datetime(2023, 9, 29, 20, 15)
+    await database.create_table_if_not_exists(
+        table_name="Events",
+        schema=(
+            "id integer NOT NULL PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, time DATETIME NOT NULL,"
+            "location TEXT NOT NULL, description TEXT NOT NULL, attendees TEXT"
+        ),
+    )
+    for attendees in ["1,2,3", ""]:
+        await database.insert_data(
+            table_name="Events",
+            data={
+                "name": "Chill",
+                "time": time.isoformat(" "),
+                "location": "Home",
+                "description": "",
+                "attendees": attendees,
+            },
+        )
+
+    # Act
+    await migrations.migrate(database)
+
+    # Assert
+    repo = EventRepository(db=database)
+    assert "attendees" not in await database.get_column_names(table_name="Events")
+    assert (await repo.get_event(id=1)).attendees == {1, 2, 3}
+    assert (await repo.get_event(id=2)).attendees == set()
+    assert (await repo.get_event(id=2)).time == time.replace(tzinfo=timezone.utc)
+    assert await repo.get_event_version(id=1) == 1
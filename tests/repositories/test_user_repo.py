@@ -1,7 +1,8 @@
 import pytest
 
+from event_handler.cache.lru import LruCache
 from event_handler.db.interface import Database
-from event_handler.models.user import User
+from event_handler.models.user import User, UserUpdate
 from event_handler.repositories.user_repo import UserRepository
 
 
@@ -69,6 +70,8 @@ async def test_when_user_repository_is_created_and_users_inserted_then_users_can
     for i in range(1, number_of_users):
         user = await repo.get_user(id=i)
         assert user.id == i
+        assert user.version == await repo.get_user_version(id=i) == 1
+    assert await repo.get_user_version(id=number_of_users) is None
 
 
 @pytest.mark.asyncio
@@ -99,3 +102,93 @@ async def test_when_user_repository_is_created_and_users_deleted_then_user_is_no
     for i in range(1, number_of_users):
         user = await repo.get_user(id=i)
         assert user is None
+
+
+@pytest.mark.asyncio
+async def test_when_users_are_inserted_in_batch_then_users_can_be_fetched_by_returned_ids(database: Database):
+    """Test that users inserted in a batch can be fetched by the returned ids."""
+    # Arrange
+    repo = UserRepository(db=database)
+    users = [User(first_name="Son", last_name=f"Goku{i}", email="SonGoku@email.com") for i in range(5)]
+    await repo.create_repository()
+
+    # Act
+    ids = await repo.create_users(users=users)
+
+    # Assert
+    assert ids == [1, 2, 3, 4, 5]
+    for id, user in zip(ids, users):
+        fetched_user = await repo.get_user(id=id)
+        assert fetched_user.last_name == user.last_name
+
+
+@pytest.mark.asyncio
+async def test_when_users_are_fetched_by_multiple_ids_then_found_users_are_returned_in_order(database: Database):
+    """Test that fetching multiple users returns the found users in the order of the requested ids."""
+    # Arrange
+    repo = UserRepository(db=database)
+    users = [User(first_name="Son", last_name=f"Goku{i}", email="SonGoku@email.com") for i in range(5)]
+    await repo.create_repository()
+    await repo.create_users(users=users)
+
+    # Act
+    fetched_users = await repo.get_users(ids=[4, 42, 2])
+
+    # Assert
+    assert [user.id for user in fetched_users] == [4, 2]
+    assert [user.last_name for user in fetched_users] == ["Goku3", "Goku1"]
+
+
+@pytest.mark.asyncio
+async def test_when_cached_user_is_deleted_then_cache_is_invalidated(database: Database):
+    """Test that deleting a user through the repository invalidates the cached user."""
+    # Arrange
+    cache = LruCache(max_size=10, ttl_in_s=60)
+    repo = UserRepository(db=database, cache=cache)
+    user = User(first_name="Son", last_name="Goku", email="SonGoku@email.com")
+    await repo.create_repository()
+    id = await repo.create_user(user=user)
+
+    # Act
+    await repo.get_user(id=id)
+    await repo.get_user(id=id)
+    await repo.delete_user(id=id)
+
+    # Assert
+    assert cache.stats().hits == 1
+    assert await repo.get_user(id=id) is None
+
+
+@pytest.mark.asyncio
+async def test_when_user_is_updated_with_stale_version_then_user_is_not_changed(database: Database):
+    """Test that an update based on an outdated version of a user is rejected."""
+    # Arrange
+    repo = UserRepository(db=database)
+    await repo.create_repository()
+    id = await repo.create_user(user=User(first_name="Son", last_name="Goku", email="SonGoku@email.com"))
+
+    # Act
+    updated = await repo.update_user(id=id, user=UserUpdate(email="Kakarot@email.com"), version=1)
+    stale = await repo.update_user(id=id, user=UserUpdate(last_name="Gohan"), version=1)
+
+    # Assert
+    assert (updated, stale) == (2, None)
+    user = await repo.get_user(id=id)
+    assert (user.last_name, user.email, user.version) == ("Goku", "Kakarot@email.com", 2)
+
+
+@pytest.mark.asyncio
+async def test_when_users_are_iterated_then_all_users_are_returned_in_chunks(database: Database):
+    """Test that iterating the users returns every user in chunks of at most the chunk size."""
+    # Arrange
+    repo = UserRepository(db=database)
+    users = [User(first_name="Son", last_name=f"Goku{i}", email="SonGoku@email.com") for i in range(5)]
+    await repo.create_repository()
+    ids = await repo.create_users(users=users)
+
+    # Act
+    chunks = [chunk async for chunk in repo.iterate_users(chunk_size=2)]
+
+    # Assert
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [user.id for chunk in chunks for user in chunk] == ids
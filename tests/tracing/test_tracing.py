@@ -0,0 +1,52 @@
+import io
+import json
+
+import pytest
+
+from event_handler import tracing
+
+
+@pytest.fixture
+def exported() -> io.StringIO:
+    # SetUp
+    file = io.StringIO()
+    tracing._exporter = tracing.SpanExporter(file)
+    # Entry
+    yield file
+    # TearDown
+    tracing._exporter = None
+
+
+@pytest.mark.asyncio
+async def test_when_spans_are_nested_then_trace_is_exported_as_otlp_json_when_root_ends(exported: io.StringIO):
+    # Arrange
+    @tracing.traced
+    async def child():
+        tracing.set_attribute("db.statement", "SELECT 1;")
+
+    # Act
+    with tracing.start_span("root", **{"http.method": "GET"}):
+        await child()
+        assert exported.getvalue() == ""
+
+    # Assert
+    request = json.loads(exported.getvalue())
+    spans = request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == [child.__qualname__, "root"]
+    assert spans[0]["traceId"] == spans[1]["traceId"]
+    assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+    assert spans[1]["parentSpanId"] == ""
+    assert spans[0]["attributes"] == [{"key": "db.statement", "value": {"stringValue": "SELECT 1;"}}]
+    assert spans[1]["attributes"] == [{"key": "http.method", "value": {"stringValue": "GET"}}]
+
+
+def test_when_span_raises_then_span_is_exported_with_error_status(exported: io.StringIO):
+    # Act
+    with pytest.raises(ValueError):
+        with tracing.start_span("root"):
+            raise ValueError()
+
+    # Assert
+    span = json.loads(exported.getvalue())["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["status"] == {"code": 2}
+    assert tracing.current_span() is None